@@ -2,8 +2,12 @@ import reflex as rx
 from app.states.yak_state import YakState
 from app.components.post_card import post_card
 from app.components.create_post_dialog import create_post_dialog
-from app.db.database import create_db_and_tables
+from app.db.database import engine
+from app.db.migrations import migrate
+from app.jobs import register_jobs
+from app.metrics import EVENT_METRICS_ENABLED, DeltaSizeMiddleware, metrics_api
 from app.pages.post_detail import post_detail
+from app.scheduler import scheduler
 
 
 def header() -> rx.Component:
@@ -52,13 +56,102 @@ def sort_tabs() -> rx.Component:
     )
 
 
+def search_bar() -> rx.Component:
+    return rx.el.form(
+        rx.icon("search", class_name="h-4 w-4 text-gray-400"),
+        rx.el.input(
+            name="query",
+            placeholder="Search yaks and replies",
+            default_value=YakState.search_query,
+            max_length=100,
+            class_name="flex-1 bg-transparent text-gray-800 placeholder-gray-400 focus:outline-none",
+        ),
+        rx.cond(
+            YakState.search_query != "",
+            rx.el.button(
+                rx.icon("x", class_name="h-4 w-4 text-gray-500"),
+                type="button",
+                on_click=YakState.clear_search,
+                class_name="p-1 rounded-full hover:bg-gray-100",
+            ),
+        ),
+        on_submit=YakState.search,
+        class_name="flex items-center gap-2 w-full px-4 py-2 mb-4 bg-white rounded-full border border-gray-200 focus-within:ring-2 focus-within:ring-teal-500",
+    )
+
+
+def search_results() -> rx.Component:
+    return rx.el.div(
+        rx.el.p(
+            f'Results for "{YakState.search_query}"',
+            class_name="text-sm text-gray-500 mb-4",
+        ),
+        rx.el.div(
+            rx.foreach(YakState.search_results, lambda post: post_card(post)),
+            class_name="flex flex-col gap-4",
+        ),
+        rx.cond(
+            YakState.search_results.length() == 0,
+            rx.el.p("No yaks found.", class_name="text-center text-gray-500"),
+        ),
+        rx.cond(
+            YakState.has_more_results,
+            rx.el.div(
+                rx.el.button(
+                    "More results",
+                    on_click=YakState.load_more_results,
+                    class_name="px-4 py-2 font-semibold text-gray-600 bg-gray-100 hover:bg-gray-200 rounded-full transition-all duration-300",
+                ),
+                class_name="flex justify-center mt-6",
+            ),
+        ),
+    )
+
+
+OBSERVE_LOAD_MORE_JS = """
+const button = document.getElementById('load-more-posts');
+if (button && !button.dataset.observed) {
+    button.dataset.observed = 'true';
+    new IntersectionObserver(
+        (entries) => { if (entries[0].isIntersecting) button.click(); },
+        { rootMargin: '400px' },
+    ).observe(button);
+}
+"""
+
+
+def load_more_trigger() -> rx.Component:
+    return rx.cond(
+        YakState.has_more_posts,
+        rx.el.div(
+            rx.el.button(
+                "Load more",
+                id="load-more-posts",
+                on_click=YakState.load_more,
+                on_mount=rx.call_script(OBSERVE_LOAD_MORE_JS),
+                class_name="px-4 py-2 font-semibold text-gray-600 bg-gray-100 hover:bg-gray-200 rounded-full transition-all duration-300",
+            ),
+            class_name="flex justify-center mt-6",
+        ),
+    )
+
+
 def index() -> rx.Component:
     return rx.el.main(
         header(),
         rx.el.div(
-            rx.el.div(sort_tabs(), class_name="flex justify-center mb-6"),
-            rx.el.div(
-                rx.foreach(YakState.posts, post_card), class_name="flex flex-col gap-4"
+            search_bar(),
+            rx.cond(
+                YakState.search_query != "",
+                search_results(),
+                rx.fragment(
+                    rx.el.div(sort_tabs(), class_name="flex justify-center mb-6"),
+                    rx.el.div(
+                        rx.foreach(YakState.posts, lambda post: post_card(post)),
+                        class_name="flex flex-col gap-4",
+                    ),
+                    load_more_trigger(),
+                ),
             ),
             class_name="container mx-auto max-w-2xl px-4 py-8",
         ),
@@ -67,12 +160,6 @@ def index() -> rx.Component:
     )
 
 
-@rx.event
-def on_load_and_create_db():
-    create_db_and_tables()
-    return [YakState.load_posts, YakState.clear_post_detail]
-
-
 app = rx.App(
     theme=rx.theme(appearance="light"),
     head_components=[
@@ -83,6 +170,26 @@ app = rx.App(
             rel="stylesheet",
         ),
     ],
+    api_transformer=metrics_api,
+)
+if EVENT_METRICS_ENABLED:
+    app.add_middleware(DeltaSizeMiddleware())
+app.register_lifespan_task(migrate, engine=engine)
+if scheduler is not None:
+    register_jobs(scheduler)
+    app.register_lifespan_task(scheduler.lifespan)
+app.add_page(
+    index,
+    route="/",
+    on_load=[
+        YakState.load_posts,
+        YakState.locate,
+        YakState.clear_post_detail,
+        YakState.listen_for_changes,
+    ],
 )
-app.add_page(index, route="/", on_load=on_load_and_create_db)
-app.add_page(post_detail, route="/post/[post_id]", on_load=YakState.get_post_by_id)
\ No newline at end of file
+app.add_page(
+    post_detail,
+    route="/post/[post_id]",
+    on_load=[YakState.get_post_by_id, YakState.listen_for_changes],
+)
\ No newline at end of file
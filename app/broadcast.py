@@ -0,0 +1,255 @@
+from typing import Callable, Optional, TypedDict
+import abc
+import asyncio
+import json
+import logging
+import os
+import time
+
+BROADCAST_ENABLED = os.getenv("BROADCAST_ENABLED", "1").lower() in ("1", "true")
+BROADCAST_INTERVAL_MS = int(os.getenv("BROADCAST_INTERVAL_MS", "250"))
+BROADCAST_CLIENT_INTERVAL_MS = int(os.getenv("BROADCAST_CLIENT_INTERVAL_MS", "1000"))
+BROADCAST_MAX_CHANGES = int(os.getenv("BROADCAST_MAX_CHANGES", "100"))
+BROADCAST_IDLE_SECONDS = float(os.getenv("BROADCAST_IDLE_SECONDS", "30"))
+
+
+class Change(TypedDict, total=False):
+    id: str
+    post: dict
+    owner: str
+    votes: int
+    comment_count: int
+    deleted: bool
+
+
+COUNT_FIELDS = ("votes", "comment_count")
+
+
+def apply_counts(post: dict, change: Change) -> dict:
+    """Copy the counts in ``change`` onto ``post``, writing only what differs."""
+    for key in COUNT_FIELDS:
+        if key in change and post[key] != change[key]:
+            post[key] = change[key]
+    return post
+
+
+def apply_shown_changes(posts: list[dict], by_id: dict[str, Change]) -> set[str]:
+    """Apply count changes and deletions to ``posts`` in place.
+
+    Deleting in place matters in a background event: reassigning the list
+    from its state proxy would store proxied dicts that later handlers can't
+    edit. Returns the ids of the posts that had a change.
+    """
+    shown, deleted = set(), []
+    for index, post in enumerate(posts):
+        change = by_id.get(post["id"])
+        if change is None:
+            continue
+        shown.add(change["id"])
+        if change.get("deleted"):
+            deleted.append(index)
+        else:
+            apply_counts(post, change)
+    for index in reversed(deleted):
+        del posts[index]
+    return shown
+
+
+def coalesce(pending: dict[str, Change], change: Change) -> None:
+    """Merge ``change`` into the latest pending change for the same post.
+
+    Counts are absolute, so the newest value wins; a deletion replaces
+    whatever was pending. Re-inserting keeps ``pending`` ordered from least
+    to most recently changed.
+    """
+    post_id = change["id"]
+    previous = pending.pop(post_id, None)
+    if previous is None or change.get("deleted"):
+        pending[post_id] = change
+    else:
+        pending[post_id] = {**previous, **change}
+
+
+def take(pending: dict[str, Change], limit: int) -> tuple[list[Change], int]:
+    """Return at most ``limit`` changes and how many count updates were dropped.
+
+    New and deleted posts are always kept; when there are too many count
+    updates only the most recent survive. Dropped counts are corrected by
+    the next feed reload or reconcile.
+    """
+    changes = list(pending.values())
+    if len(changes) <= limit:
+        return changes, 0
+    structural = [c for c in changes if "post" in c or c.get("deleted")]
+    counts = [c for c in changes if "post" not in c and not c.get("deleted")]
+    keep = counts[len(counts) - max(limit - len(structural), 0) :]
+    return structural + keep, len(counts) - len(keep)
+
+
+class BroadcastBackend(abc.ABC):
+    """Carries change batches between the workers of a deployment.
+
+    ``publish`` must hand every batch to the ``deliver`` callback of every
+    started broadcaster, this worker's included, on that worker's event loop.
+    Batches are lists of JSON-serializable dicts.
+    """
+
+    @abc.abstractmethod
+    def start(self, deliver: Callable[[list[Change]], None]) -> None: ...
+
+    @abc.abstractmethod
+    async def publish(self, batch: list[Change]) -> None: ...
+
+
+class LocalBackend(BroadcastBackend):
+    """In-process backend; several broadcasters sharing one act as workers.
+
+    Batches go through a JSON round trip like they would through a broker,
+    so nothing unserializable or shared by reference slips through.
+    """
+
+    def __init__(self):
+        self._delivers: list[Callable[[list[Change]], None]] = []
+
+    def start(self, deliver: Callable[[list[Change]], None]) -> None:
+        self._delivers.append(deliver)
+
+    async def publish(self, batch: list[Change]) -> None:
+        payload = json.dumps(batch)
+        for deliver in self._delivers:
+            deliver(json.loads(payload))
+
+
+class Subscription:
+    """Changes waiting for one connected tab, coalesced until it reads them."""
+
+    def __init__(self, broadcaster: "Broadcaster", key: str):
+        self.broadcaster = broadcaster
+        self.key = key
+        self._pending: dict[str, Change] = {}
+        self._waiter: Optional[asyncio.Future] = None
+        self._last_read = 0.0
+
+    def _deliver(self, batch: list[Change]) -> None:
+        for change in batch:
+            coalesce(self._pending, change)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def next(self, timeout: float) -> list[Change]:
+        """Wait up to ``timeout`` seconds for changes; ``[]`` if none came.
+
+        Returns at most once per ``client_interval`` however many workers
+        publish, so each tab gets at most one update per interval.
+        """
+        wait = self._last_read + self.broadcaster.client_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if not self._pending:
+            # asyncio.wait rather than wait_for: on 3.11 wait_for can swallow
+            # a cancellation that races with the wakeup.
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait([self._waiter], timeout=timeout)
+            finally:
+                self._waiter = None
+            if not self._pending:
+                return []
+        self._last_read = time.monotonic()
+        changes, dropped = take(self._pending, self.broadcaster.max_changes)
+        self._pending = {}
+        self.broadcaster.dropped += dropped
+        return changes
+
+    def close(self) -> None:
+        if self.broadcaster._subscriptions.get(self.key) is self:
+            del self.broadcaster._subscriptions[self.key]
+
+
+class Broadcaster:
+    """Fan post changes out to every connected tab.
+
+    Write handlers ``publish`` compact changes; they are coalesced per post
+    and sent to the backend as one batch at most every ``interval_ms``, so
+    a burst of votes on a hot post costs one message however many clicks it
+    was. Every batch the backend delivers is merged into each local
+    ``Subscription``, which a tab drains at most every
+    ``client_interval_ms``; applying a batch locks and diffs the tab's
+    state, so this is what bounds fan-out work per worker.
+
+    Ordering holds within a worker. Across workers a late batch can briefly
+    show an older count, or a post deleted on another worker within the same
+    interval, until the next change or feed reload.
+    """
+
+    def __init__(
+        self,
+        backend: BroadcastBackend,
+        interval_ms: int,
+        client_interval_ms: int,
+        max_changes: int,
+    ):
+        self.backend = backend
+        self.interval = interval_ms / 1000
+        self.client_interval = client_interval_ms / 1000
+        self.max_changes = max_changes
+        self.batches = 0
+        self.changes = 0
+        self.dropped = 0
+        self._pending: dict[str, Change] = {}
+        self._subscriptions: dict[str, Subscription] = {}
+        self._task: Optional[asyncio.Task] = None
+        backend.start(self._deliver)
+
+    def publish(self, change: Change) -> None:
+        coalesce(self._pending, change)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._pending:
+            batch, dropped = take(self._pending, self.max_changes)
+            self._pending = {}
+            self.dropped += dropped
+            try:
+                await self.backend.publish(batch)
+                self.batches += 1
+                self.changes += len(batch)
+            except Exception:
+                logging.exception("Broadcast publish failed; dropping batch")
+            await asyncio.sleep(self.interval)
+
+    def _deliver(self, batch: list[Change]) -> None:
+        for subscription in list(self._subscriptions.values()):
+            subscription._deliver(batch)
+
+    def subscribe(self, key: str) -> Optional[Subscription]:
+        """Subscribe the tab ``key``; None if it is already listening."""
+        if key in self._subscriptions:
+            return None
+        subscription = self._subscriptions[key] = Subscription(self, key)
+        return subscription
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "batches": self.batches,
+            "changes": self.changes,
+            "dropped": self.dropped,
+            "subscribers": len(self._subscriptions),
+        }
+
+
+broadcaster: Optional[Broadcaster] = None
+if BROADCAST_ENABLED:
+    broadcaster = Broadcaster(
+        LocalBackend(),
+        BROADCAST_INTERVAL_MS,
+        BROADCAST_CLIENT_INTERVAL_MS,
+        BROADCAST_MAX_CHANGES,
+    )
+
+
+def publish(change: Change) -> None:
+    if broadcaster is not None:
+        broadcaster.publish(change)
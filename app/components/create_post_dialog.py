@@ -1,8 +1,9 @@
 import reflex as rx
-from app.states.yak_state import YakState
+from app.states.yak_state import POST_MAX_LENGTH, YakState, post_draft
 
 
 def create_post_dialog() -> rx.Component:
+    char_count = post_draft.value.to(str).length()
     return rx.radix.primitives.dialog.root(
         rx.radix.primitives.dialog.trigger(
             rx.el.button(
@@ -37,20 +38,16 @@ def create_post_dialog() -> rx.Component:
                     ),
                     rx.el.textarea(
                         placeholder="Share your anonymous thoughts...",
-                        on_change=YakState.set_new_post_content,
-                        max_length=200,
+                        on_change=lambda value: post_draft.set_value(value),
+                        max_length=POST_MAX_LENGTH,
                         class_name="w-full h-32 p-3 text-base text-gray-800 bg-gray-50 rounded-lg border border-gray-200 focus:ring-2 focus:ring-teal-500 focus:border-transparent transition-all duration-200 placeholder-gray-400 resize-none",
-                        default_value=YakState.new_post_content,
+                        value=post_draft.value,
                     ),
                     rx.el.div(
                         rx.el.p(
-                            rx.cond(
-                                YakState.char_count > 200,
-                                f"{YakState.char_count} / 200",
-                                f"{YakState.char_count} / 200",
-                            ),
+                            f"{char_count} / {POST_MAX_LENGTH}",
                             class_name=rx.cond(
-                                YakState.char_count > 200,
+                                char_count > POST_MAX_LENGTH,
                                 "text-sm font-medium text-red-500",
                                 "text-sm font-medium text-gray-500",
                             ),
@@ -58,8 +55,9 @@ def create_post_dialog() -> rx.Component:
                         rx.radix.primitives.dialog.close(
                             rx.el.button(
                                 "Post",
-                                on_click=YakState.create_post,
-                                disabled=YakState.is_post_invalid,
+                                on_click=post_draft.retrieve(YakState.create_post),
+                                disabled=(char_count == 0)
+                                | (char_count > POST_MAX_LENGTH),
                                 class_name="""
                                     px-6 py-2 bg-teal-500 text-white font-semibold rounded-full 
                                     hover:bg-teal-600 transition-colors shadow-[0px_1px_3px_rgba(0,0,0,0.12)] 
@@ -1,11 +1,34 @@
 import reflex as rx
-from app.states.yak_state import YakState, Post
+from app.states.yak_state import YakState, FeedPost, vote_overrides
 
 
-def vote_button(post_id: str, direction: int, user_vote: int) -> rx.Component:
+def relative_time(timestamp: rx.Var[int]) -> rx.Component:
+    return rx.moment(timestamp, from_now=True, interval=60000, unix=True)
+
+
+def shown_votes(post: FeedPost) -> tuple[rx.Var[int], rx.Var[int]]:
+    """The post's count and the viewer's vote, including unsettled clicks."""
+    overrides = vote_overrides.value.to(dict)
+    post_id = post["id"].to(str)
+    override = overrides[post_id].to(list)
+    is_pending = overrides.contains(post_id) & (override[1] != post["user_vote"])
+    return (
+        rx.cond(is_pending, override[0], post["votes"]).to(int),
+        rx.cond(is_pending, override[1], post["user_vote"]).to(int),
+    )
+
+
+def vote_button(
+    post_id: rx.Var[str],
+    direction: int,
+    votes: rx.Var[int],
+    user_vote: rx.Var[int],
+    disabled: rx.Var[bool] | bool = False,
+) -> rx.Component:
     is_active = user_vote == direction
     icon_name = rx.cond(direction == 1, "arrow_up", "arrow_down")
     active_color = rx.cond(direction == 1, "text-teal-500", "text-red-500")
+    vote_value = rx.cond(is_active, 0, direction).to(int)
     return rx.el.button(
         rx.icon(
             tag=icon_name,
@@ -15,12 +38,22 @@ def vote_button(post_id: str, direction: int, user_vote: int) -> rx.Component:
                 "text-gray-400 group-hover:text-gray-600 transition-colors duration-200",
             ),
         ),
-        on_click=lambda: YakState.handle_vote(post_id, direction),
-        class_name="p-2 rounded-full group transition-all duration-200",
+        on_click=[
+            rx.call_function(
+                vote_overrides.set_value(
+                    vote_overrides.value.to(dict).merge(
+                        {post_id: [votes - user_vote + vote_value, vote_value]}
+                    )
+                )
+            ),
+            YakState.set_vote(post_id, vote_value),
+        ],
+        disabled=disabled,
+        class_name="p-2 rounded-full group transition-all duration-200 disabled:opacity-50 disabled:pointer-events-none",
     )
 
 
-def post_card_menu(post: Post) -> rx.Component:
+def post_card_menu(post: FeedPost, is_archived: rx.Var[bool] | bool) -> rx.Component:
     return rx.radix.dropdown_menu.root(
         rx.radix.dropdown_menu.trigger(
             rx.el.button(
@@ -39,7 +72,7 @@ def post_card_menu(post: Post) -> rx.Component:
                 class_name="hover:bg-gray-100 cursor-pointer",
             ),
             rx.cond(
-                post["is_owner"],
+                post["is_owner"] & ~rx.Var.create(is_archived),
                 rx.radix.dropdown_menu.item(
                     rx.el.div(
                         rx.icon("trash_2", class_name="h-4 w-4 mr-2 text-red-500"),
@@ -56,14 +89,17 @@ def post_card_menu(post: Post) -> rx.Component:
     )
 
 
-def post_card(post: Post, is_link: bool = True) -> rx.Component:
+def post_card(
+    post: FeedPost, is_link: bool = True, is_archived: rx.Var[bool] | bool = False
+) -> rx.Component:
+    """A post's card; archived posts show their votes but can't be changed."""
+    post_id = post["id"].to(str)
+    votes, user_vote = shown_votes(post)
     card_content = rx.el.div(
         rx.el.div(
-            vote_button(post["id"], 1, post["user_vote"]),
-            rx.el.p(
-                post["votes"], class_name="text-lg font-bold text-gray-800 tabular-nums"
-            ),
-            vote_button(post["id"], -1, post["user_vote"]),
+            vote_button(post_id, 1, votes, user_vote, is_archived),
+            rx.el.p(votes, class_name="text-lg font-bold text-gray-800 tabular-nums"),
+            vote_button(post_id, -1, votes, user_vote, is_archived),
             class_name="flex flex-col items-center justify-center bg-gray-50 rounded-xl p-2",
         ),
         rx.el.div(
@@ -75,7 +111,7 @@ def post_card(post: Post, is_link: bool = True) -> rx.Component:
                 rx.el.div(
                     rx.icon("map_pin", class_name="h-4 w-4 text-gray-400 mr-1"),
                     rx.el.p(
-                        "South Lake Union",
+                        rx.cond(post["geohash"] == YakState.geohash, "Here", "Nearby"),
                         class_name="text-xs text-gray-500 font-semibold",
                     ),
                     class_name="flex items-center",
@@ -85,14 +121,14 @@ def post_card(post: Post, is_link: bool = True) -> rx.Component:
                         "message-square", class_name="h-4 w-4 text-gray-400 mr-1.5"
                     ),
                     rx.el.p(
-                        post["comments"].length().to_string(),
+                        post["comment_count"].to_string(),
                         class_name="text-xs text-gray-500 font-semibold",
                     ),
                     rx.el.p(
-                        post["created_at"],
+                        relative_time(post["created_at"]),
                         class_name="text-xs text-gray-500 font-semibold ml-4",
                     ),
-                    post_card_menu(post),
+                    post_card_menu(post, is_archived),
                     class_name="flex items-center gap-4",
                 ),
                 class_name="flex justify-between items-center mt-4",
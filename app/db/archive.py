@@ -0,0 +1,220 @@
+from sqlalchemy import delete
+from sqlmodel import Session, select
+from app.db import models
+from app.db.database import begin_write, get_db_session, insert_for
+from app.db.feed import COMMENT_PAGE_SIZE
+from app.db.feed_cache import feed_cache
+from app.db.peek import add_archived_points, post_points
+from typing import Optional
+import datetime
+import json
+import logging
+import os
+import time
+import zlib
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+# Each batch is one transaction holding the write lock (all of SQLite's, the
+# batch's rows on Postgres); keep it to tens of milliseconds under load.
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "200"))
+ARCHIVE_PAUSE_MS = int(os.getenv("ARCHIVE_PAUSE_MS", "200"))
+
+
+def _encode(document: dict) -> bytes:
+    return zlib.compress(json.dumps(document, separators=(",", ":")).encode())
+
+
+def _decode(data: bytes) -> dict:
+    return json.loads(zlib.decompress(data))
+
+
+def archive_batch(
+    session: Session, cutoff: datetime.datetime, batch_size: int = ARCHIVE_BATCH_SIZE
+) -> int:
+    """Move up to ``batch_size`` of the oldest posts created before ``cutoff``.
+
+    Each post becomes one ``archivedpost`` row holding the post, its comments
+    (newest first) and its votes, and leaves ``post``, ``comment``,
+    ``uservote`` and ``searchdocument`` in the caller's transaction. The
+    points it earned move to ``archivedpoints`` so Peek Scores and their
+    rebuild stay the same. Returns how many posts were moved.
+
+    The write lock is taken before anything is read, so a comment or vote
+    can't land between the reads and the deletes and be lost.
+    """
+    begin_write(session)
+    posts = session.exec(
+        select(models.Post)
+        .where(models.Post.created_at < cutoff)
+        .order_by(models.Post.created_at, models.Post.id)
+        .limit(batch_size)
+        .with_for_update()
+    ).all()
+    if not posts:
+        return 0
+    post_ids = [post.id for post in posts]
+    comments: dict[str, list[dict]] = {post_id: [] for post_id in post_ids}
+    for comment in session.exec(
+        select(models.Comment)
+        .where(models.Comment.post_id.in_(post_ids))
+        .order_by(
+            models.Comment.post_id,
+            models.Comment.created_at.desc(),
+            models.Comment.id.desc(),
+        )
+    ):
+        comments[comment.post_id].append(
+            {
+                "id": comment.id,
+                "content": comment.content,
+                "created_at": comment.created_at.isoformat(),
+                "owner_session_id": comment.owner_session_id,
+            }
+        )
+    votes: dict[str, list[tuple[str, int]]] = {post_id: [] for post_id in post_ids}
+    for post_id, session_id, vote_value in session.exec(
+        select(
+            models.UserVote.post_id,
+            models.UserVote.user_session_id,
+            models.UserVote.vote_value,
+        ).where(models.UserVote.post_id.in_(post_ids))
+    ):
+        votes[post_id].append((session_id, vote_value))
+
+    points: dict[str, int] = {}
+    rows = []
+    for post in posts:
+        for session_id, earned in post_points(
+            post.owner_session_id, votes[post.id]
+        ).items():
+            points[session_id] = points.get(session_id, 0) + earned
+        rows.append(
+            {
+                "id": post.id,
+                "created_at": post.created_at,
+                "archived_at": datetime.datetime.utcnow(),
+                "document": _encode(
+                    {
+                        "post": {
+                            "id": post.id,
+                            "content": post.content,
+                            "votes": post.votes,
+                            "hot_score": post.hot_score,
+                            "comment_count": post.comment_count,
+                            "created_at": post.created_at.isoformat(),
+                            "owner_session_id": post.owner_session_id,
+                            "geohash": post.geohash,
+                        },
+                        "comments": comments[post.id],
+                        "votes": votes[post.id],
+                    }
+                ),
+            }
+        )
+    session.exec(
+        insert_for(session)(models.ArchivedPost).on_conflict_do_nothing(
+            index_elements=["id"]
+        ),
+        params=rows,
+    )
+    add_archived_points(session, points)
+    for model, column in (
+        (models.SearchDocument, models.SearchDocument.post_id),
+        (models.UserVote, models.UserVote.post_id),
+        (models.Comment, models.Comment.post_id),
+        (models.Post, models.Post.id),
+    ):
+        session.exec(delete(model).where(column.in_(post_ids)))
+    return len(posts)
+
+
+def archive_cold_posts(
+    max_age_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    pause_ms: int = ARCHIVE_PAUSE_MS,
+    max_batches: Optional[int] = None,
+) -> int:
+    """Archive every post older than ``max_age_days``, one batch at a time.
+
+    Sleeps ``pause_ms`` between batches so live writes get the lock in
+    between, and stops after ``max_batches`` if given. Safe to stop at any
+    point and to run from several workers: each batch is its own
+    transaction. Returns how many posts were moved.
+    """
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=max_age_days)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        with get_db_session() as session:
+            count = archive_batch(session, cutoff, batch_size)
+        if not count:
+            break
+        moved += count
+        batches += 1
+        feed_cache.invalidate()
+        if count < batch_size:
+            break
+        time.sleep(pause_ms / 1000)
+    if moved:
+        logging.info(f"Archived {moved} posts older than {max_age_days} days")
+    return moved
+
+
+def load_archived_post(session: Session, post_id: str) -> Optional[dict]:
+    """The archived document of a post, or ``None`` if it was never archived."""
+    data = session.exec(
+        select(models.ArchivedPost.document).where(models.ArchivedPost.id == post_id)
+    ).first()
+    return _decode(data) if data is not None else None
+
+
+def archived_post(document: dict, session_id: str) -> tuple[models.Post, int]:
+    """The archived post and ``session_id``'s vote on it, like ``load_post``."""
+    fields = document["post"]
+    post = models.Post(
+        **{
+            **fields,
+            "created_at": datetime.datetime.fromisoformat(fields["created_at"]),
+        }
+    )
+    user_vote = next(
+        (value for voter, value in document["votes"] if voter == session_id), 0
+    )
+    return post, user_vote
+
+
+def archived_comment_page(
+    document: dict, cursor: Optional[str] = None, limit: int = COMMENT_PAGE_SIZE
+) -> tuple[list[models.Comment], Optional[str]]:
+    """One page of an archived post's comments, like ``load_comment_page``.
+
+    Archived comments never change, so the cursor is just an offset.
+    """
+    offset = int(cursor or 0)
+    page = document["comments"][offset : offset + limit]
+    comments = [
+        models.Comment(
+            **{
+                **comment,
+                "post_id": document["post"]["id"],
+                "created_at": datetime.datetime.fromisoformat(comment["created_at"]),
+            }
+        )
+        for comment in page
+    ]
+    has_more = offset + limit < len(document["comments"])
+    return comments, str(offset + limit) if has_more else None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--pause-ms", type=int, default=ARCHIVE_PAUSE_MS)
+    parser.add_argument("--max-batches", type=int)
+    args = parser.parse_args()
+    moved = archive_cold_posts(
+        args.days, args.batch_size, args.pause_ms, args.max_batches
+    )
+    print(f"Archived {moved} posts")
@@ -1,37 +1,232 @@
 import reflex as rx
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
 from sqlmodel import create_engine, Session
-from app.db import models
-from contextlib import contextmanager
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.replicas import ReadRouter, ReadTarget
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
 import os
 import logging
 
 config = rx.config.get_config()
-connect_args = (
-    {"check_same_thread": False} if config.db_url.startswith("sqlite") else {}
+POOL_SIZE = int(os.getenv("POOL_SIZE", "20"))
+MAX_OVERFLOW = int(os.getenv("MAX_OVERFLOW", "10"))
+SQLITE_READER_POOL_SIZE = int(os.getenv("SQLITE_READER_POOL_SIZE", "8"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+
+def async_db_url(db_url: str) -> str:
+    """Map a sync database URL onto the matching asyncio driver."""
+    scheme, _, rest = db_url.partition("://")
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme.startswith("postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    return db_url
+
+
+def is_sqlite_memory(db_url: str) -> bool:
+    path = db_url.partition("://")[2]
+    return path in ("", "/", "/:memory:") or "mode=memory" in path
+
+
+def insert_for(session):
+    """The dialect's ``insert``, which has ``on_conflict_do_*``."""
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def begin_write(session) -> None:
+    """Take the write lock before the transaction reads anything.
+
+    pysqlite only starts a transaction at the first write, so rows read
+    before it can change underneath the caller and ``with_for_update`` is
+    ignored. On SQLite this issues ``BEGIN IMMEDIATE`` unless a write already
+    began the transaction; elsewhere ``with_for_update`` locks the rows.
+    """
+    connection = session.connection()
+    if connection.dialect.name != "sqlite":
+        return
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _configure_sqlite_connection(readonly: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not readonly:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        if readonly:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    return on_connect
+
+
+def create_db_engine(db_url: str, readonly: bool = False, create=create_engine):
+    """Build a sync or async (``create=create_async_engine``) engine for ``db_url``.
+
+    Server databases get a shared pool sized by ``POOL_SIZE``/``MAX_OVERFLOW``.
+    A SQLite file gets WAL and the ``SQLITE_*`` pragmas on every connection,
+    and either one writer connection, so writes queue in the pool instead of
+    failing with "database is locked", or a pool of ``query_only`` readers that
+    never wait for the writer. In-memory SQLite is one connection for both.
+    """
+    if not db_url.startswith("sqlite"):
+        return create(
+            db_url, echo=False, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW
+        )
+    if is_sqlite_memory(db_url):
+        return create(
+            db_url,
+            echo=False,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    db_engine = create(
+        db_url,
+        echo=False,
+        connect_args={"check_same_thread": False},
+        pool_size=SQLITE_READER_POOL_SIZE if readonly else 1,
+        max_overflow=0,
+    )
+    event.listen(
+        getattr(db_engine, "sync_engine", db_engine),
+        "connect",
+        _configure_sqlite_connection(readonly),
+    )
+    return db_engine
+
+
+def create_read_engine(db_url: str, write_engine, create=create_engine):
+    if db_url.startswith("sqlite") and not is_sqlite_memory(db_url):
+        return create_db_engine(db_url, readonly=True, create=create)
+    return write_engine
+
+
+ASYNC_DB_URL = config.async_db_url or async_db_url(config.db_url)
+engine = create_db_engine(config.db_url)
+read_engine = create_read_engine(config.db_url, engine)
+async_engine = create_db_engine(ASYNC_DB_URL, create=create_async_engine)
+async_read_engine = create_read_engine(
+    ASYNC_DB_URL, async_engine, create=create_async_engine
 )
-engine = create_engine(
-    config.db_url,
-    echo=False,
-    connect_args=connect_args,
-    pool_size=int(os.getenv("POOL_SIZE", "20")),
-    max_overflow=int(os.getenv("MAX_OVERFLOW", "10")),
+DB_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()
+]
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+read_router = ReadRouter(
+    ReadTarget("primary", read_engine, async_read_engine),
+    [
+        ReadTarget(
+            f"replica-{i}",
+            create_db_engine(url, readonly=True),
+            create_db_engine(
+                async_db_url(url), readonly=True, create=create_async_engine
+            ),
+        )
+        for i, url in enumerate(DB_REPLICA_URLS)
+    ],
+    sticky_seconds=DB_REPLICA_STICKY_SECONDS,
+    retry_seconds=DB_REPLICA_RETRY_SECONDS,
 )
+VOTE_BUFFER_ENABLED = os.getenv("VOTE_BUFFER_ENABLED", "").lower() in ("1", "true")
+VOTE_BUFFER_FLUSH_MS = int(os.getenv("VOTE_BUFFER_FLUSH_MS", "500"))
+VOTE_BUFFER_MAX_EVENTS = int(os.getenv("VOTE_BUFFER_MAX_EVENTS", "500"))
+
+
+def _is_disconnect(error: Exception) -> bool:
+    return isinstance(error, DBAPIError) and error.connection_invalidated
 
 
-def create_db_and_tables():
-    models.SQLModel.metadata.create_all(engine)
+def _open_read_session(user_session_id: Optional[str]):
+    for target in read_router.candidates(user_session_id):
+        session = Session(target.engine)
+        try:
+            session.connection()
+            return session, target
+        except DBAPIError:
+            session.close()
+            if target is read_router.primary:
+                raise
+            read_router.mark_down(target)
 
 
 @contextmanager
-def get_db_session():
-    """Provide a transactional scope around a series of operations."""
-    session = Session(engine)
+def get_db_session(readonly: bool = False, user_session_id: Optional[str] = None):
+    """Provide a transactional scope around a series of operations.
+
+    ``readonly`` sessions are routed by ``read_router`` to a replica or the
+    reader engine and must not write. Pass the caller's ``user_session_id`` to
+    both kinds so reads right after that user's writes go to the primary.
+    """
+    if readonly:
+        session, target = _open_read_session(user_session_id)
+    else:
+        session, target = Session(engine), None
     try:
         yield session
         session.commit()
+        if not readonly:
+            read_router.record_write(user_session_id)
     except Exception as e:
         session.rollback()
+        if target is not None and _is_disconnect(e):
+            read_router.mark_down(target)
+        logging.exception(f"Error with database session: {e}")
+        raise
+    finally:
+        session.close()
+
+
+async def _open_async_read_session(user_session_id: Optional[str]):
+    for target in read_router.candidates(user_session_id):
+        session = AsyncSession(target.async_engine, expire_on_commit=False)
+        try:
+            await session.connection()
+            return session, target
+        except DBAPIError:
+            await session.close()
+            if target is read_router.primary:
+                raise
+            read_router.mark_down(target)
+
+
+@asynccontextmanager
+async def get_async_db_session(
+    readonly: bool = False, user_session_id: Optional[str] = None
+):
+    """Async counterpart of ``get_db_session`` for event handlers.
+
+    Objects stay loaded after commit so handlers can format them without
+    further IO. Reuse the sync query helpers with ``await session.run_sync``.
+    """
+    if readonly:
+        session, target = await _open_async_read_session(user_session_id)
+    else:
+        session, target = AsyncSession(async_engine, expire_on_commit=False), None
+    try:
+        yield session
+        await session.commit()
+        if not readonly:
+            read_router.record_write(user_session_id)
+    except Exception as e:
+        await session.rollback()
+        if target is not None and _is_disconnect(e):
+            read_router.mark_down(target)
         logging.exception(f"Error with database session: {e}")
         raise
     finally:
-        session.close()
\ No newline at end of file
+        await session.close()
\ No newline at end of file
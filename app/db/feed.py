@@ -0,0 +1,246 @@
+from sqlalchemy import and_, bindparam, func, tuple_, union_all
+from sqlmodel import Session, select
+from app.db import models
+from typing import Optional
+import datetime
+import functools
+import json
+
+FEED_PAGE_SIZE = 20
+COMMENT_PAGE_SIZE = 20
+FEED_RECONCILE_SECONDS = 60
+
+
+def epoch_seconds(dt: datetime.datetime) -> int:
+    """Unix time of a naive UTC timestamp, rendered relative in the browser."""
+    return int(dt.replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+def select_posts_with_user_vote(session_id: str):
+    """Select posts joined to the caller's vote.
+
+    Each row is ``(post, user_vote)``; the vote comes from the same round trip.
+    """
+    return select(models.Post, func.coalesce(models.UserVote.vote_value, 0)).outerjoin(
+        models.UserVote,
+        and_(
+            models.UserVote.post_id == models.Post.id,
+            models.UserVote.user_session_id == session_id,
+        ),
+    )
+
+
+def _sort_columns(sort_by: str):
+    if sort_by == "new":
+        return models.Post.created_at, models.Post.id
+    return models.Post.hot_score, models.Post.id
+
+
+def encode_cursor(post: models.Post, sort_by: str, as_of: datetime.datetime) -> str:
+    key = post.created_at.isoformat() if sort_by == "new" else post.hot_score
+    return json.dumps([key, post.id, as_of.isoformat()])
+
+
+def decode_cursor(cursor: str, sort_by: str):
+    key, post_id, as_of = json.loads(cursor)
+    if sort_by == "new":
+        key = datetime.datetime.fromisoformat(key)
+    return key, post_id, datetime.datetime.fromisoformat(as_of)
+
+
+@functools.lru_cache(maxsize=64)
+def _cell_page_query(sort_by: str, n_cells: int, after_cursor: bool, limit: int):
+    """Build the merged per-cell page query once for each shape.
+
+    Cells and cursor values are bound when it runs. Building the union of
+    subqueries costs several times more than running it.
+    """
+    sort_column, id_column = _sort_columns(sort_by)
+    conditions = []
+    if after_cursor:
+        conditions = [
+            tuple_(sort_column, id_column)
+            < tuple_(
+                bindparam("key", type_=sort_column.type),
+                bindparam("post_id", type_=id_column.type),
+            ),
+            models.Post.created_at
+            <= bindparam("as_of", type_=models.Post.created_at.type),
+        ]
+    order = (sort_column.desc(), id_column.desc())
+    # Only keys cross the union; full rows are read for the page alone.
+    keys = union_all(
+        *[
+            select(sort_column, id_column)
+            .where(models.Post.geohash == bindparam(f"cell_{i}"), *conditions)
+            .order_by(*order)
+            .limit(limit + 1)
+            .subquery()
+            .select()
+            for i in range(n_cells)
+        ]
+    ).subquery()
+    page_ids = (
+        select(keys.c.id)
+        .order_by(keys.c[sort_column.key].desc(), keys.c.id.desc())
+        .limit(limit + 1)
+    )
+    return select(models.Post).where(models.Post.id.in_(page_ids)).order_by(*order)
+
+
+def load_feed_page(
+    session: Session,
+    sort_by: str,
+    cursor: Optional[str] = None,
+    limit: int = FEED_PAGE_SIZE,
+    cells: Optional[list[str]] = None,
+) -> tuple[list[models.Post], Optional[str]]:
+    """Load one page of the feed after ``cursor``.
+
+    Pages are keyed on ``(sort value, id)`` and pinned to the time the first
+    page was read, so posts created mid-scroll never shift later pages. The
+    returned cursor is ``None`` once the feed is exhausted.
+
+    With ``cells`` only posts filed in those geohash cells are read. Each
+    cell's page is a seek on its ``(geohash, sort value, id)`` index and the
+    pages are merged, so the cost depends on the number of cells rather than
+    on how many posts the region holds.
+    """
+    sort_column, id_column = _sort_columns(sort_by)
+    if cursor:
+        key, post_id, as_of = decode_cursor(cursor, sort_by)
+    else:
+        as_of = datetime.datetime.utcnow()
+    if cells:
+        params = {f"cell_{i}": cell for i, cell in enumerate(cells)}
+        if cursor:
+            params.update(key=key, post_id=post_id, as_of=as_of)
+        query = _cell_page_query(sort_by, len(cells), bool(cursor), limit)
+        posts = list(session.exec(query, params=params).all())
+    else:
+        query = select(models.Post)
+        if cursor:
+            query = query.where(
+                tuple_(sort_column, id_column) < tuple_(key, post_id),
+                models.Post.created_at <= as_of,
+            )
+        # The first page needs no as_of filter: nothing is newer yet.
+        query = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+        posts = list(session.exec(query).all())
+    if len(posts) <= limit:
+        return posts, None
+    posts = posts[:limit]
+    return posts, encode_cursor(posts[-1], sort_by, as_of)
+
+
+def load_user_votes(
+    session: Session, session_id: str, post_ids: list[str]
+) -> dict[str, int]:
+    """Map each of ``post_ids`` to the caller's vote, 0 where they have none."""
+    votes = dict.fromkeys(post_ids, 0)
+    if post_ids:
+        votes.update(
+            session.exec(
+                select(models.UserVote.post_id, models.UserVote.vote_value).where(
+                    models.UserVote.user_session_id == session_id,
+                    models.UserVote.post_id.in_(post_ids),
+                )
+            ).all()
+        )
+    return votes
+
+
+def load_post(
+    session: Session, session_id: str, post_id: str
+) -> Optional[tuple[models.Post, int]]:
+    row = session.exec(
+        select_posts_with_user_vote(session_id).where(models.Post.id == post_id)
+    ).first()
+    if row is None:
+        return None
+    post, user_vote = row
+    return post, user_vote
+
+
+def load_comment_page(
+    session: Session,
+    post_id: str,
+    cursor: Optional[str] = None,
+    limit: int = COMMENT_PAGE_SIZE,
+) -> tuple[list[models.Comment], Optional[str]]:
+    """Load one page of a post's comments, newest first, after ``cursor``.
+
+    Comments posted after the first page are newer than every cursor, so later
+    pages never repeat them; the caller prepends its own new comments.
+    """
+    query = select(models.Comment).where(models.Comment.post_id == post_id)
+    if cursor:
+        created_at, comment_id = json.loads(cursor)
+        query = query.where(
+            tuple_(models.Comment.created_at, models.Comment.id)
+            < tuple_(datetime.datetime.fromisoformat(created_at), comment_id)
+        )
+    comments = list(
+        session.exec(
+            query.order_by(
+                models.Comment.created_at.desc(), models.Comment.id.desc()
+            ).limit(limit + 1)
+        ).all()
+    )
+    if len(comments) <= limit:
+        return comments, None
+    comments = comments[:limit]
+    last = comments[-1]
+    return comments, json.dumps([last.created_at.isoformat(), last.id])
+
+
+def format_shared_feed_post(post_model: models.Post) -> dict:
+    """Format the parts of a feed item that are the same for every viewer."""
+    return {
+        "id": post_model.id,
+        "content": post_model.content,
+        "votes": post_model.votes,
+        "created_at": epoch_seconds(post_model.created_at),
+        "comment_count": post_model.comment_count,
+        "geohash": post_model.geohash,
+    }
+
+
+def personalize_feed_post(
+    item: dict, owner_session_id: str, user_vote: int, session_id: str
+) -> dict:
+    return {
+        **item,
+        "user_vote": user_vote,
+        "is_owner": owner_session_id == session_id,
+    }
+
+
+def format_feed_post(post_model: models.Post, user_vote: int, session_id: str) -> dict:
+    return personalize_feed_post(
+        format_shared_feed_post(post_model),
+        post_model.owner_session_id,
+        user_vote,
+        session_id,
+    )
+
+
+def format_comment(comment_model: models.Comment) -> dict:
+    return {
+        "id": comment_model.id,
+        "content": comment_model.content,
+        "created_at": epoch_seconds(comment_model.created_at),
+    }
+
+
+def format_post_detail(
+    post_model: models.Post,
+    user_vote: int,
+    session_id: str,
+    comments: list[models.Comment],
+) -> dict:
+    return {
+        **format_feed_post(post_model, user_vote, session_id),
+        "comments": [format_comment(c) for c in comments],
+        "is_archived": False,
+    }
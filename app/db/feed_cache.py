@@ -0,0 +1,88 @@
+from typing import Any, Awaitable, Callable, Hashable
+import asyncio
+import os
+import threading
+import time
+
+FEED_CACHE_TTL_SECONDS = float(os.getenv("FEED_CACHE_TTL_SECONDS", "5"))
+FEED_CACHE_MAX_ENTRIES = int(os.getenv("FEED_CACHE_MAX_ENTRIES", "256"))
+
+
+class FeedCache:
+    """Process-wide cache of formatted feed pages shared by every session.
+
+    Entries expire after ``ttl_seconds`` and are dropped wholesale by
+    ``invalidate``, which every write path calls. Concurrent misses on the same
+    key wait for a single load instead of each querying the database. The
+    bookkeeping lock is never held across an await, so ``invalidate`` is safe
+    to call from other threads.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        self._key_locks: dict[Hashable, asyncio.Lock] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return False, None
+        self.hits += 1
+        return True, entry[1]
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        if len(self._entries) >= self.max_entries:
+            self._entries = {
+                k: entry for k, entry in self._entries.items() if entry[0] >= now
+            }
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+        self._entries[key] = (now + self.ttl_seconds, value)
+
+    async def get(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            key_lock = self._key_locks.setdefault(key, asyncio.Lock())
+        async with key_lock:
+            with self._lock:
+                found, value = self._lookup(key)
+                if found:
+                    return value
+                self.misses += 1
+                generation = self._generation
+            try:
+                value = await load()
+                with self._lock:
+                    if generation == self._generation:
+                        self._store(key, value)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+            return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
+
+
+feed_cache = FeedCache(FEED_CACHE_TTL_SECONDS, FEED_CACHE_MAX_ENTRIES)
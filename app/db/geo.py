@@ -0,0 +1,87 @@
+from typing import Optional
+import os
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Precision 5 cells are about 4.9 x 4.9 km, so a feed covers about 15 km
+# across. Posts store their cell at this precision: lowering it later is a
+# ``substr`` over ``post.geohash``, but posts cannot be moved to finer cells.
+GEOHASH_PRECISION = int(os.getenv("GEOHASH_PRECISION", "5"))
+# Where viewers are placed until their browser shares a location, and where
+# posts from before locations were recorded are filed: South Lake Union.
+DEFAULT_LATITUDE = float(os.getenv("DEFAULT_LATITUDE", "47.6256"))
+DEFAULT_LONGITUDE = float(os.getenv("DEFAULT_LONGITUDE", "-122.3344"))
+LOCATION_REFRESH_SECONDS = 600
+
+
+def encode(
+    latitude: float, longitude: float, precision: int = GEOHASH_PRECISION
+) -> str:
+    """Geohash of the cell containing a point, ``precision`` characters long."""
+    latitudes, longitudes = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, is_longitude = [], 0, 0, True
+    while len(chars) < precision:
+        interval, value = (
+            (longitudes, longitude) if is_longitude else (latitudes, latitude)
+        )
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        is_longitude = not is_longitude
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def bounds(cell: str) -> tuple[float, float, float, float]:
+    """Return ``(south, north, west, east)`` of a geohash cell."""
+    latitudes, longitudes = [-90.0, 90.0], [-180.0, 180.0]
+    is_longitude = True
+    for char in cell:
+        bits = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = longitudes if is_longitude else latitudes
+            middle = (interval[0] + interval[1]) / 2
+            interval[0 if bits >> shift & 1 else 1] = middle
+            is_longitude = not is_longitude
+    return latitudes[0], latitudes[1], longitudes[0], longitudes[1]
+
+
+def neighbors(cell: str) -> list[str]:
+    """``cell`` followed by the up to eight cells around it.
+
+    Wraps around the antimeridian; rows past a pole are left out.
+    """
+    south, north, west, east = bounds(cell)
+    height, width = north - south, east - west
+    latitude, longitude = (south + north) / 2, (west + east) / 2
+    cells: dict[str, None] = {}
+    for row in (0, 1, -1):
+        for column in (0, 1, -1):
+            y = latitude + row * height
+            if not -90 < y < 90:
+                continue
+            x = (longitude + column * width + 180) % 360 - 180
+            cells[encode(y, x, len(cell))] = None
+    return list(cells)
+
+
+def parse_location(coords) -> Optional[tuple[float, float]]:
+    """Validate a ``[latitude, longitude]`` pair sent by the browser."""
+    if not isinstance(coords, (list, tuple)) or len(coords) != 2:
+        return None
+    try:
+        latitude, longitude = float(coords[0]), float(coords[1])
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+DEFAULT_GEOHASH = encode(DEFAULT_LATITUDE, DEFAULT_LONGITUDE)
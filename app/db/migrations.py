@@ -0,0 +1,184 @@
+from sqlalchemy import func, inspect, text
+from sqlmodel import Session, select
+from app.db import models
+from app.db.geo import DEFAULT_GEOHASH
+from app.db.peek import rebuild_scores
+from app.db.ranking import recompute_hot_scores
+from app.db.search import create_search_index
+from typing import Callable, NamedTuple
+import logging
+
+ADDED_POST_COLUMNS = {
+    "hot_score": "FLOAT NOT NULL DEFAULT 0",
+    "comment_count": "INTEGER NOT NULL DEFAULT 0",
+}
+MIGRATION_LOCK_ID = 0x5E7A
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable
+
+
+def _create_indexes(connection, table, *names: str) -> None:
+    """Create the model's indexes ``names`` on ``table`` if they are missing."""
+    indexes = {index.name: index for index in table.indexes}
+    unknown = [name for name in names if name not in indexes]
+    if unknown:
+        raise ValueError(f"{table.name} defines no index {', '.join(unknown)}")
+    for name in names:
+        indexes[name].create(connection, checkfirst=True)
+
+
+def denormalize_post_counters(connection) -> None:
+    """Add the stored post counters and rebuild them from votes and comments.
+
+    Drops duplicate vote rows first so the unique vote index can be built.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("post")}
+    for name, ddl in ADDED_POST_COLUMNS.items():
+        if name not in columns:
+            connection.execute(text(f"ALTER TABLE post ADD COLUMN {name} {ddl}"))
+    connection.execute(
+        text(
+            "DELETE FROM uservote WHERE id NOT IN "
+            "(SELECT MIN(id) FROM uservote GROUP BY post_id, user_session_id)"
+        )
+    )
+    _create_indexes(connection, models.Post.__table__, "ix_post_hot_score_id")
+    _create_indexes(
+        connection, models.UserVote.__table__, "ix_uservote_post_id_user_session_id"
+    )
+    connection.execute(
+        text(
+            "UPDATE post SET votes = (SELECT COALESCE(SUM(vote_value), 0) "
+            "FROM uservote WHERE uservote.post_id = post.id), "
+            "comment_count = "
+            "(SELECT COUNT(*) FROM comment WHERE comment.post_id = post.id)"
+        )
+    )
+    recompute_hot_scores(Session(bind=connection))
+
+
+def add_feed_and_comment_indexes(connection) -> None:
+    _create_indexes(connection, models.Post.__table__, "ix_post_created_at_id")
+    _create_indexes(
+        connection, models.Comment.__table__, "ix_comment_post_id_created_at_id"
+    )
+
+
+def add_full_text_search(connection) -> None:
+    """Copy every post and comment into ``searchdocument`` and index it.
+
+    The index is built once after the copy instead of row by row.
+    """
+    models.SearchDocument.__table__.create(connection, checkfirst=True)
+    connection.execute(
+        text(
+            "INSERT INTO searchdocument (post_id, content) "
+            "SELECT id, content FROM post "
+            "UNION ALL SELECT post_id, content FROM comment"
+        )
+    )
+    create_search_index(connection)
+
+
+def add_post_geohash(connection) -> None:
+    """Add ``post.geohash`` and the per-cell feed indexes.
+
+    Posts written before locations were recorded all came from the one
+    campus feed, so they are filed in the default cell.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("post")}
+    if "geohash" not in columns:
+        connection.execute(
+            text(
+                "ALTER TABLE post ADD COLUMN geohash VARCHAR NOT NULL "
+                f"DEFAULT '{DEFAULT_GEOHASH}'"
+            )
+        )
+    _create_indexes(
+        connection,
+        models.Post.__table__,
+        "ix_post_geohash_hot_score_id",
+        "ix_post_geohash_created_at_id",
+    )
+
+
+def add_peek_scores(connection) -> None:
+    """Create ``peekscore`` and fill it from existing posts and votes."""
+    models.PeekScore.__table__.create(connection, checkfirst=True)
+    # The rebuild also counts points kept for archived posts.
+    models.ArchivedPoints.__table__.create(connection, checkfirst=True)
+    rebuild_scores(Session(bind=connection))
+
+
+def add_post_archive(connection) -> None:
+    """Create the tables old posts and the points they earned are moved to."""
+    models.ArchivedPost.__table__.create(connection, checkfirst=True)
+    models.ArchivedPoints.__table__.create(connection, checkfirst=True)
+
+
+def add_job_leases(connection) -> None:
+    models.JobLease.__table__.create(connection, checkfirst=True)
+
+
+MIGRATIONS = [
+    Migration(1, "denormalize post counters", denormalize_post_counters),
+    Migration(2, "add feed and comment indexes", add_feed_and_comment_indexes),
+    Migration(3, "add full-text search", add_full_text_search),
+    Migration(4, "add post geohash", add_post_geohash),
+    Migration(5, "add peek scores", add_peek_scores),
+    Migration(6, "add post archive", add_post_archive),
+    Migration(7, "add job leases", add_job_leases),
+]
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def migrate(engine) -> int:
+    """Create or upgrade the schema and return the version it is now at.
+
+    A fresh database gets ``create_all`` and is stamped with the latest
+    version; an existing one runs every migration newer than its stored
+    version, recording each as it completes. Migrations only add, so a run
+    interrupted part way is finished by the next one. On Postgres the run holds
+    an advisory lock so several workers starting together apply it once.
+    """
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(
+                text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID}
+            )
+        session = Session(bind=connection)
+        if not inspect(connection).has_table(models.Post.__tablename__):
+            models.SQLModel.metadata.create_all(connection)
+            # The FTS table and its triggers are not part of the metadata.
+            create_search_index(connection)
+            session.add_all(
+                models.SchemaVersion(version=migration.version, name=migration.name)
+                for migration in MIGRATIONS
+            )
+            session.flush()
+            logging.info(f"Created database schema at version {SCHEMA_VERSION}")
+            return SCHEMA_VERSION
+        models.SchemaVersion.__table__.create(connection, checkfirst=True)
+        version = session.exec(select(func.max(models.SchemaVersion.version))).one()
+        version = version or 0
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+            logging.info(f"Applying migration {migration.version}: {migration.name}")
+            migration.apply(connection)
+            session.add(
+                models.SchemaVersion(version=migration.version, name=migration.name)
+            )
+            session.flush()
+            version = migration.version
+        return version
+
+
+if __name__ == "__main__":
+    from app.db.database import engine
+
+    print(f"Schema version {migrate(engine)}")
@@ -1,21 +1,37 @@
 from sqlmodel import Field, SQLModel, Relationship
+from sqlalchemy import Index
+from app.db.geo import DEFAULT_GEOHASH
 from typing import Optional
 import datetime
 import uuid
 
 
 class Post(SQLModel, table=True):
-    id: str = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (
+        Index("ix_post_hot_score_id", "hot_score", "id"),
+        Index("ix_post_created_at_id", "created_at", "id"),
+        Index("ix_post_geohash_hot_score_id", "geohash", "hot_score", "id"),
+        Index("ix_post_geohash_created_at_id", "geohash", "created_at", "id"),
+    )
+
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     content: str
     votes: int = Field(default=1)
+    hot_score: float = Field(default=0.0)
+    comment_count: int = Field(default=0)
     created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
     owner_session_id: str = Field(index=True)
+    geohash: str = Field(default=DEFAULT_GEOHASH)
     comments: list["Comment"] = Relationship(back_populates="post")
     user_votes: list["UserVote"] = Relationship(back_populates="post")
 
 
 class Comment(SQLModel, table=True):
-    id: str = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (
+        Index("ix_comment_post_id_created_at_id", "post_id", "created_at", "id"),
+    )
+
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     content: str
     created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
     post_id: str = Field(foreign_key="post.id")
@@ -24,8 +40,70 @@ class Comment(SQLModel, table=True):
 
 
 class UserVote(SQLModel, table=True):
-    id: str = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (
+        Index(
+            "ix_uservote_post_id_user_session_id",
+            "post_id",
+            "user_session_id",
+            unique=True,
+        ),
+    )
+
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     post_id: str = Field(foreign_key="post.id")
     user_session_id: str = Field(index=True)
     vote_value: int
-    post: Post = Relationship(back_populates="user_votes")
\ No newline at end of file
+    post: Post = Relationship(back_populates="user_votes")
+
+
+class SearchDocument(SQLModel, table=True):
+    """Text of one post or comment, indexed for full-text search."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    post_id: str = Field(foreign_key="post.id", index=True)
+    content: str
+
+
+class PeekScore(SQLModel, table=True):
+    """A session's Peek Score, moved in the same transaction as its writes."""
+
+    session_id: str = Field(primary_key=True)
+    score: int
+
+
+class ArchivedPoints(SQLModel, table=True):
+    """Peek Score points a session earned on posts that have been archived."""
+
+    session_id: str = Field(primary_key=True)
+    points: int
+
+
+class ArchivedPost(SQLModel, table=True):
+    """A post moved out of the live tables along with its comments and votes.
+
+    ``document`` is the zlib-compressed JSON written by ``app.db.archive``.
+    """
+
+    id: str = Field(primary_key=True)
+    created_at: datetime.datetime
+    archived_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+    document: bytes
+
+
+class JobLease(SQLModel, table=True):
+    """When a scheduled job is next due and which worker is running it.
+
+    A worker may run the job once ``next_run_at`` has passed and no other
+    worker's lease (``holder`` until ``expires_at``) is still live.
+    """
+
+    name: str = Field(primary_key=True)
+    holder: str = ""
+    expires_at: datetime.datetime
+    next_run_at: datetime.datetime
+
+
+class SchemaVersion(SQLModel, table=True):
+    version: int = Field(primary_key=True)
+    name: str
+    applied_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
\ No newline at end of file
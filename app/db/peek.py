@@ -0,0 +1,113 @@
+from sqlalchemy import text
+from sqlmodel import Session, select
+from app.db import models
+from app.db.database import insert_for
+
+# Everyone starts here; a post is worth PEEK_POST_POINTS while it stands, and
+# each vote cast on someone else's post moves the voter's score by its value.
+# Points earned on posts since archived are kept in ``archivedpoints``.
+PEEK_BASE_SCORE = 137
+PEEK_POST_POINTS = 10
+
+REBUILD_QUERY = """
+INSERT INTO peekscore (session_id, score)
+SELECT session_id, :base + SUM(points) FROM (
+    SELECT owner_session_id AS session_id, :post_points AS points FROM post
+    UNION ALL
+    SELECT v.user_session_id, v.vote_value FROM uservote AS v
+    JOIN post AS p ON p.id = v.post_id
+    WHERE v.user_session_id != p.owner_session_id
+    UNION ALL
+    SELECT session_id, points FROM archivedpoints
+) AS earned
+GROUP BY session_id
+"""
+
+
+def _increment(session: Session, column, points: dict[str, int], start: int) -> None:
+    """Add ``points`` to ``column`` per session with one upsert.
+
+    Increments in place, so concurrent writers never lose an update; rows are
+    touched in key order to keep Postgres lock order stable.
+    """
+    rows = [
+        {"session_id": session_id, column.key: start + change}
+        for session_id, change in sorted(points.items())
+        if change
+    ]
+    if not rows:
+        return
+    insert = insert_for(session)(column.table)
+    session.exec(
+        insert.on_conflict_do_update(
+            index_elements=["session_id"],
+            set_={column.key: column + insert.excluded[column.key] - start},
+        ),
+        params=rows,
+    )
+
+
+def add_points(session: Session, points: dict[str, int]) -> None:
+    """Add ``points`` to each session's score inside the caller's transaction."""
+    _increment(session, models.PeekScore.__table__.c.score, points, PEEK_BASE_SCORE)
+
+
+def add_archived_points(session: Session, points: dict[str, int]) -> None:
+    """Record points whose posts and votes are leaving the live tables."""
+    _increment(session, models.ArchivedPoints.__table__.c.points, points, 0)
+
+
+def post_points(owner_session_id: str, votes: list[tuple[str, int]]) -> dict[str, int]:
+    """What a post and the ``(session_id, vote_value)`` votes on it earned."""
+    points = {owner_session_id: PEEK_POST_POINTS}
+    for session_id, vote_value in votes:
+        if session_id != owner_session_id:
+            points[session_id] = points.get(session_id, 0) + vote_value
+    return points
+
+
+def remove_post_points(session: Session, post_id: str, owner_session_id: str) -> None:
+    """Take back what a post earned, before its votes are deleted with it."""
+    votes = session.exec(
+        select(models.UserVote.user_session_id, models.UserVote.vote_value).where(
+            models.UserVote.post_id == post_id
+        )
+    ).all()
+    add_points(
+        session,
+        {
+            session_id: -points
+            for session_id, points in post_points(owner_session_id, votes).items()
+        },
+    )
+
+
+def load_score(session: Session, session_id: str) -> int:
+    score = session.exec(
+        select(models.PeekScore.score).where(models.PeekScore.session_id == session_id)
+    ).first()
+    return PEEK_BASE_SCORE if score is None else score
+
+
+def rebuild_scores(session: Session) -> int:
+    """Recompute every score from posts and votes in one aggregate pass.
+
+    On Postgres the table is locked against writers first, so an increment
+    committed while the aggregate runs cannot be counted twice or lost.
+    Returns how many sessions have a score.
+    """
+    connection = session.connection()
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("LOCK TABLE peekscore IN SHARE ROW EXCLUSIVE MODE"))
+    connection.execute(text("DELETE FROM peekscore"))
+    return connection.execute(
+        text(REBUILD_QUERY),
+        {"base": PEEK_BASE_SCORE, "post_points": PEEK_POST_POINTS},
+    ).rowcount
+
+
+if __name__ == "__main__":
+    from app.db.database import get_db_session
+
+    with get_db_session() as session:
+        print(f"Rebuilt {rebuild_scores(session)} Peek Scores")
@@ -0,0 +1,113 @@
+from sqlalchemy import func, or_, update
+from sqlmodel import Session, select
+from app.db import models
+import datetime
+import logging
+import math
+
+HOT_SCORE_EPOCH = datetime.datetime(2024, 1, 1)
+HOT_SCORE_DECAY_SECONDS = 45000
+BACKFILL_BATCH_SIZE = 1000
+
+
+def hot_score(votes: int, created_at: datetime.datetime) -> float:
+    """Reddit-style hot rank: log10 of the net votes plus a bonus for recency.
+
+    Every ``HOT_SCORE_DECAY_SECONDS`` of age is worth a factor of ten in votes.
+    The bonus is anchored to a fixed epoch, so a stored score only changes when
+    the post's votes do and newer posts outrank older ones without rewriting
+    rows as they age.
+    """
+    order = math.log10(max(abs(votes), 1))
+    sign = (votes > 0) - (votes < 0)
+    seconds = (created_at - HOT_SCORE_EPOCH).total_seconds()
+    return round(sign * order + seconds / HOT_SCORE_DECAY_SECONDS, 7)
+
+
+def recompute_hot_scores(
+    session: Session, batch_size: int = BACKFILL_BATCH_SIZE
+) -> int:
+    """Recompute every post's hot score in id-ordered batches."""
+    updated = 0
+    last_id = ""
+    while True:
+        rows = session.exec(
+            select(models.Post.id, models.Post.votes, models.Post.created_at)
+            .where(models.Post.id > last_id)
+            .order_by(models.Post.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        session.execute(
+            update(models.Post),
+            [
+                {"id": post_id, "hot_score": hot_score(votes, created_at)}
+                for post_id, votes, created_at in rows
+            ],
+        )
+        session.commit()
+        updated += len(rows)
+        last_id = rows[-1][0]
+
+
+def reconcile_post_counters(
+    session: Session, batch_size: int = BACKFILL_BATCH_SIZE
+) -> int:
+    """Repair stored vote and comment counts that drifted from their rows.
+
+    Walks the posts in id-ordered batches. Each batch is one UPDATE that
+    recounts ``uservote`` and ``comment`` and rewrites only the posts whose
+    counters differ, so the write lock is held briefly and a run over
+    consistent data writes nothing. Repaired posts get their hot score
+    recomputed. Returns how many posts were repaired.
+    """
+    post = models.Post.__table__
+    vote_total = (
+        select(func.coalesce(func.sum(models.UserVote.vote_value), 0))
+        .where(models.UserVote.post_id == post.c.id)
+        .scalar_subquery()
+    )
+    comment_total = (
+        select(func.count())
+        .select_from(models.Comment)
+        .where(models.Comment.post_id == post.c.id)
+        .scalar_subquery()
+    )
+    repaired = 0
+    last_id = ""
+    while True:
+        post_ids = session.exec(
+            select(models.Post.id)
+            .where(models.Post.id > last_id)
+            .order_by(models.Post.id)
+            .limit(batch_size)
+        ).all()
+        if not post_ids:
+            break
+        rows = session.execute(
+            update(post)
+            .where(post.c.id.in_(post_ids))
+            .where(
+                or_(
+                    post.c.votes != vote_total,
+                    post.c.comment_count != comment_total,
+                )
+            )
+            .values(votes=vote_total, comment_count=comment_total)
+            .returning(post.c.id, post.c.votes, post.c.created_at)
+        ).all()
+        if rows:
+            session.execute(
+                update(models.Post),
+                [
+                    {"id": post_id, "hot_score": hot_score(votes, created_at)}
+                    for post_id, votes, created_at in rows
+                ],
+            )
+        session.commit()
+        repaired += len(rows)
+        last_id = post_ids[-1]
+    if repaired:
+        logging.warning(f"Repaired vote and comment counts on {repaired} posts")
+    return repaired
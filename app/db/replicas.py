@@ -0,0 +1,78 @@
+from typing import Any, NamedTuple, Optional
+import itertools
+import logging
+import threading
+import time
+
+
+class ReadTarget(NamedTuple):
+    name: str
+    engine: Any
+    async_engine: Any
+
+
+class ReadRouter:
+    """Choose where read-only sessions run: a replica or the primary.
+
+    Healthy replicas are handed out round-robin with the primary as the last
+    resort. A replica that fails to connect is skipped for ``retry_seconds``.
+    A user who wrote within the last ``sticky_seconds`` reads from the primary,
+    so they see their own writes even while replicas lag.
+    """
+
+    def __init__(
+        self,
+        primary: ReadTarget,
+        replicas: list[ReadTarget],
+        sticky_seconds: float,
+        retry_seconds: float,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._next = itertools.count()
+        self._down_until: dict[str, float] = {}
+        self._last_write: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def candidates(self, user_session_id: Optional[str] = None) -> list[ReadTarget]:
+        if not self.replicas:
+            return [self.primary]
+        now = time.monotonic()
+        with self._lock:
+            if user_session_id is not None and now < self._last_write.get(
+                user_session_id, 0
+            ):
+                return [self.primary]
+            start = next(self._next)
+            healthy = [
+                replica
+                for replica in self.replicas
+                if self._down_until.get(replica.name, 0) <= now
+            ]
+        if healthy:
+            start %= len(healthy)
+            healthy = healthy[start:] + healthy[:start]
+        return healthy + [self.primary]
+
+    def mark_down(self, target: ReadTarget) -> None:
+        if target is self.primary:
+            return
+        logging.warning(
+            f"Read replica {target.name} unavailable; "
+            f"using other targets for {self.retry_seconds}s"
+        )
+        with self._lock:
+            self._down_until[target.name] = time.monotonic() + self.retry_seconds
+
+    def record_write(self, user_session_id: Optional[str]) -> None:
+        if not self.replicas or user_session_id is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._last_write) > 10000:
+                self._last_write = {
+                    key: until for key, until in self._last_write.items() if until > now
+                }
+            self._last_write[user_session_id] = now + self.sticky_seconds
@@ -0,0 +1,128 @@
+from sqlalchemy import text
+from sqlmodel import Session, select
+from app.db import models
+import os
+import re
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_TERMS = 8
+# Only the newest SEARCH_WINDOW matching documents are ranked, so a word in
+# half of all posts costs the same bounded scan as a rare one.
+SEARCH_WINDOW = int(os.getenv("SEARCH_WINDOW", "2000"))
+
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS searchdocument_fts USING fts5("
+    "content, content='searchdocument', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    "INSERT INTO searchdocument_fts(searchdocument_fts) VALUES ('rebuild')",
+    "CREATE TRIGGER IF NOT EXISTS searchdocument_ai AFTER INSERT ON searchdocument "
+    "BEGIN INSERT INTO searchdocument_fts(rowid, content) "
+    "VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS searchdocument_ad AFTER DELETE ON searchdocument "
+    "BEGIN INSERT INTO searchdocument_fts(searchdocument_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); END",
+)
+POSTGRES_SEARCH_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_searchdocument_content_tsv ON searchdocument "
+    "USING GIN (to_tsvector('english', content))",
+)
+
+SQLITE_SEARCH_QUERY = """
+WITH hits AS (
+    SELECT rowid, bm25(searchdocument_fts) AS score FROM searchdocument_fts
+    WHERE searchdocument_fts MATCH :query ORDER BY rowid DESC LIMIT :window
+)
+SELECT d.post_id, MIN(hits.score) AS score
+FROM hits JOIN searchdocument AS d ON d.id = hits.rowid
+GROUP BY d.post_id ORDER BY score, d.post_id LIMIT :limit OFFSET :offset
+"""
+POSTGRES_SEARCH_QUERY = """
+WITH q AS (SELECT to_tsquery('english', :query) AS query),
+recent AS (
+    SELECT d.post_id, d.content FROM searchdocument AS d, q
+    WHERE to_tsvector('english', d.content) @@ q.query
+    ORDER BY d.id DESC LIMIT :window
+)
+SELECT recent.post_id,
+    MIN(-ts_rank_cd(to_tsvector('english', recent.content), q.query)) AS score
+FROM recent, q
+GROUP BY recent.post_id ORDER BY score, recent.post_id LIMIT :limit OFFSET :offset
+"""
+
+
+def create_search_index(connection) -> None:
+    """Build the full-text index over ``searchdocument`` for this dialect.
+
+    SQLite gets an external-content FTS5 table kept in sync by triggers, so
+    inserting or deleting document rows is all the write path does. Postgres
+    gets a GIN index on the documents' ``tsvector``.
+    """
+    if connection.dialect.name == "sqlite":
+        statements = SQLITE_SEARCH_DDL
+    elif connection.dialect.name == "postgresql":
+        statements = POSTGRES_SEARCH_DDL
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def search_terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())[:SEARCH_MAX_TERMS]
+
+
+def _match_expression(terms: list[str], dialect: str) -> str:
+    """Every term must match; the last one as a prefix, for partial words.
+
+    Terms are plain word characters, so user input can never reach the
+    engine as query syntax.
+    """
+    if dialect == "postgresql":
+        return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+    return " ".join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+
+
+def search_posts(
+    session: Session,
+    query: str,
+    offset: int = 0,
+    limit: int = SEARCH_PAGE_SIZE,
+) -> tuple[list[models.Post], bool]:
+    """Return posts whose text or comments match ``query``, best first.
+
+    The newest ``SEARCH_WINDOW`` matching documents are ranked with bm25 on
+    SQLite (``ts_rank_cd`` on Postgres) and a post scores as its best
+    matching document. Pages are by offset, since ranks shift as documents
+    are added; the flag says if more follow.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], False
+    dialect = session.get_bind().dialect.name
+    statement = (
+        POSTGRES_SEARCH_QUERY if dialect == "postgresql" else SQLITE_SEARCH_QUERY
+    )
+    post_ids = list(
+        session.connection()
+        .execute(
+            text(statement),
+            {
+                "query": _match_expression(terms, dialect),
+                "window": SEARCH_WINDOW,
+                "limit": limit + 1,
+                "offset": offset,
+            },
+        )
+        .scalars()
+    )
+    has_more = len(post_ids) > limit
+    post_ids = post_ids[:limit]
+    if not post_ids:
+        return [], False
+    posts = {
+        post.id: post
+        for post in session.exec(
+            select(models.Post).where(models.Post.id.in_(post_ids))
+        )
+    }
+    return [posts[post_id] for post_id in post_ids if post_id in posts], has_more
@@ -0,0 +1,174 @@
+from sqlmodel import select
+from app.db import models
+from app.db.database import (
+    VOTE_BUFFER_ENABLED,
+    VOTE_BUFFER_FLUSH_MS,
+    VOTE_BUFFER_MAX_EVENTS,
+    get_async_db_session,
+    get_db_session,
+    read_router,
+)
+from app.db.feed_cache import feed_cache
+from app.db.votes import VoteResult, apply_vote_intents
+from typing import Optional
+import atexit
+import logging
+import threading
+
+
+def _subtract(totals: dict[str, int], flushed: dict[str, int]) -> None:
+    for key, value in flushed.items():
+        remaining = totals.get(key, 0) - value
+        if remaining:
+            totals[key] = remaining
+        else:
+            totals.pop(key, None)
+
+
+class VoteBuffer:
+    """Write-behind buffer that batches votes into periodic transactions.
+
+    Each vote records the voter's final intent for a post in memory and bumps
+    a per-post pending delta and the voter's pending Peek Score points. A
+    background thread writes all intents in one transaction every
+    ``flush_interval_ms`` or as soon as ``max_events`` votes are waiting, so
+    hot posts see one counter update per flush instead of one per click;
+    toggling back and forth between flushes writes only the last intent.
+    Pending deltas and points keep counting a flush until it has committed.
+
+    Durability: unflushed votes live only in this process. ``close`` (run at
+    interpreter exit) stops the thread and flushes what is left, so a clean
+    shutdown loses nothing, while a crash loses at most one flush interval.
+    A failed flush puts its intents back for the next attempt.
+    """
+
+    def __init__(self, flush_interval_ms: int, max_events: int):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_events = max_events
+        self.flushes = 0
+        self._intents: dict[tuple[str, str], int] = {}
+        self._in_flight: dict[tuple[str, str], int] = {}
+        self._deltas: dict[str, int] = {}
+        self._points: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="vote-buffer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    async def set_votes(
+        self, session_id: str, intents: dict[str, int]
+    ) -> dict[str, VoteResult]:
+        """Record final votes on several posts; returns the counts to show.
+
+        Posts that no longer exist are skipped, as in ``votes.set_votes``.
+        """
+        self.start()
+        async with get_async_db_session(
+            readonly=True, user_session_id=session_id
+        ) as session:
+            posts = {
+                post_id: (votes, owner_session_id)
+                for post_id, votes, owner_session_id in (
+                    await session.exec(
+                        select(
+                            models.Post.id,
+                            models.Post.votes,
+                            models.Post.owner_session_id,
+                        ).where(models.Post.id.in_(intents))
+                    )
+                ).all()
+            }
+            stored_user_votes = dict(
+                (
+                    await session.exec(
+                        select(
+                            models.UserVote.post_id, models.UserVote.vote_value
+                        ).where(
+                            models.UserVote.post_id.in_(posts),
+                            models.UserVote.user_session_id == session_id,
+                        )
+                    )
+                ).all()
+            )
+        results = {}
+        with self._lock:
+            for post_id, (votes, owner_session_id) in posts.items():
+                key, user_vote = (post_id, session_id), intents[post_id]
+                previous = self._intents.get(
+                    key, self._in_flight.get(key, stored_user_votes.get(post_id, 0))
+                )
+                delta = user_vote - previous
+                points = delta if owner_session_id != session_id else 0
+                self._intents[key] = user_vote
+                self._deltas[post_id] = self._deltas.get(post_id, 0) + delta
+                self._points[session_id] = self._points.get(session_id, 0) + points
+                results[post_id] = VoteResult(
+                    votes + self._deltas[post_id], user_vote, delta, points
+                )
+            if len(self._intents) >= self.max_events:
+                self._wakeup.set()
+        return results
+
+    def pending_delta(self, post_id: str) -> int:
+        return self._deltas.get(post_id, 0)
+
+    def pending_points(self, session_id: str) -> int:
+        return self._points.get(session_id, 0)
+
+    def flush(self) -> int:
+        """Write every pending intent in one transaction; returns how many."""
+        with self._flush_lock:
+            with self._lock:
+                intents, self._intents = self._intents, {}
+                deltas, points = dict(self._deltas), dict(self._points)
+                self._in_flight = intents
+            if not intents:
+                return 0
+            try:
+                with get_db_session() as session:
+                    apply_vote_intents(session, intents)
+            except Exception:
+                logging.exception("Vote buffer flush failed; retrying next interval")
+                with self._lock:
+                    self._intents = {**intents, **self._intents}
+                    self._in_flight = {}
+                return 0
+            with self._lock:
+                # Committed: the database now counts what this flush wrote, while
+                # votes recorded since keep their share of the pending totals.
+                _subtract(self._deltas, deltas)
+                _subtract(self._points, points)
+                self._in_flight = {}
+            self.flushes += 1
+            for _, session_id in intents:
+                read_router.record_write(session_id)
+            feed_cache.invalidate()
+            return len(intents)
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+
+vote_buffer: Optional[VoteBuffer] = None
+if VOTE_BUFFER_ENABLED:
+    vote_buffer = VoteBuffer(VOTE_BUFFER_FLUSH_MS, VOTE_BUFFER_MAX_EVENTS)
+    atexit.register(vote_buffer.close)
@@ -0,0 +1,244 @@
+from sqlalchemy import bindparam, tuple_
+from sqlmodel import Session, delete, select, update
+from app.db import models
+from app.db.database import insert_for
+from app.db.peek import add_points
+from app.db.ranking import hot_score
+from typing import NamedTuple, Optional
+import uuid
+
+
+class VoteResult(NamedTuple):
+    votes: int
+    user_vote: int
+    delta: int
+    # Change to the voter's Peek Score: the delta, unless the post is theirs.
+    points: int
+
+
+def cast_vote(
+    session: Session, post_id: str, session_id: str, vote_value: int
+) -> Optional[VoteResult]:
+    """Toggle ``session_id``'s vote on a post without read-modify-write races.
+
+    The vote row is claimed with an ``INSERT ... ON CONFLICT DO NOTHING`` on the
+    unique ``(post_id, user_session_id)`` index, so double clicks cannot create
+    duplicates, and the post counter and the voter's Peek Score move by a
+    delta computed against the locked vote row. Runs inside the caller's
+    transaction; returns ``None`` and rolls back if the post does not exist.
+    """
+    inserted = session.exec(
+        insert_for(session)(models.UserVote)
+        .values(
+            id=str(uuid.uuid4()),
+            post_id=post_id,
+            user_session_id=session_id,
+            vote_value=vote_value,
+        )
+        .on_conflict_do_nothing(index_elements=["post_id", "user_session_id"])
+        .returning(models.UserVote.vote_value)
+    ).scalar_one_or_none()
+    if inserted is not None:
+        delta, user_vote = vote_value, vote_value
+    else:
+        vote_filter = (
+            models.UserVote.post_id == post_id,
+            models.UserVote.user_session_id == session_id,
+        )
+        previous = session.exec(
+            select(models.UserVote.vote_value).where(*vote_filter).with_for_update()
+        ).one()
+        if previous == vote_value:
+            session.exec(delete(models.UserVote).where(*vote_filter))
+            delta, user_vote = -vote_value, 0
+        else:
+            session.exec(
+                update(models.UserVote)
+                .where(*vote_filter)
+                .values(vote_value=vote_value)
+            )
+            delta, user_vote = vote_value - previous, vote_value
+    row = session.exec(
+        update(models.Post)
+        .where(models.Post.id == post_id)
+        .values(votes=models.Post.votes + delta)
+        .returning(
+            models.Post.votes, models.Post.created_at, models.Post.owner_session_id
+        )
+    ).first()
+    if row is None:
+        session.rollback()
+        return None
+    votes, created_at, owner_session_id = row
+    session.exec(
+        update(models.Post)
+        .where(models.Post.id == post_id)
+        .values(hot_score=hot_score(votes, created_at))
+    )
+    points = delta if owner_session_id != session_id else 0
+    add_points(session, {session_id: points})
+    return VoteResult(votes, user_vote, delta, points)
+
+
+def apply_vote_intents(
+    session: Session, intents: dict[tuple[str, str], int]
+) -> dict[str, int]:
+    """Write a batch of final vote values keyed by ``(post_id, session_id)``.
+
+    A value of 0 removes the vote. Every row is claimed first with an
+    ``INSERT ... ON CONFLICT DO NOTHING``, as in ``cast_vote``: rows it
+    inserts had no vote before, and the rest are read under the lock that
+    insert took (all of SQLite's writes, the conflicting rows on Postgres),
+    so two writers for the same vote never diff against the same old value.
+    Counters and voters' Peek Scores move by the difference between each
+    intent and the row it replaces, one statement per kind of change, and
+    the per-post deltas that were applied are returned. Intents for posts
+    deleted or archived since are dropped.
+    """
+    live = set(
+        session.exec(
+            select(models.Post.id).where(
+                models.Post.id.in_({post_id for post_id, _ in intents})
+            )
+        ).all()
+    )
+    keys = sorted(key for key in intents if key[0] in live)
+    if not keys:
+        return {}
+    vote_key = tuple_(models.UserVote.post_id, models.UserVote.user_session_id)
+    claimed = set(
+        session.exec(
+            insert_for(session)(models.UserVote)
+            .values(
+                [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "post_id": post_id,
+                        "user_session_id": session_id,
+                        "vote_value": intents[post_id, session_id],
+                    }
+                    for post_id, session_id in keys
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["post_id", "user_session_id"])
+            .returning(models.UserVote.post_id, models.UserVote.user_session_id)
+        ).all()
+    )
+    existing = {
+        (post_id, session_id): vote_value
+        for post_id, session_id, vote_value in session.exec(
+            select(
+                models.UserVote.post_id,
+                models.UserVote.user_session_id,
+                models.UserVote.vote_value,
+            )
+            .where(vote_key.in_([key for key in keys if key not in claimed]))
+            .with_for_update()
+        ).all()
+    }
+    deltas: dict[str, int] = {}
+    changes: dict[tuple[str, str], int] = {}
+    removed, upserted = [], []
+    for post_id, session_id in keys:
+        vote_value = intents[post_id, session_id]
+        if (post_id, session_id) in claimed:
+            # Already written with its final value; a 0 is a placeholder.
+            previous = 0
+            if vote_value == 0:
+                removed.append((post_id, session_id))
+        else:
+            previous = existing.get((post_id, session_id), 0)
+            if vote_value == previous:
+                continue
+            if vote_value == 0:
+                removed.append((post_id, session_id))
+            else:
+                upserted.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "post_id": post_id,
+                        "user_session_id": session_id,
+                        "vote_value": vote_value,
+                    }
+                )
+        if vote_value != previous:
+            changes[post_id, session_id] = vote_value - previous
+            deltas[post_id] = deltas.get(post_id, 0) + vote_value - previous
+    if removed:
+        session.exec(delete(models.UserVote).where(vote_key.in_(removed)))
+    if upserted:
+        insert = insert_for(session)(models.UserVote)
+        session.exec(
+            insert.on_conflict_do_update(
+                index_elements=["post_id", "user_session_id"],
+                set_={"vote_value": insert.excluded.vote_value},
+            ),
+            params=upserted,
+        )
+    if deltas:
+        session.connection().execute(
+            update(models.Post.__table__)
+            .where(models.Post.__table__.c.id == bindparam("post_id"))
+            .values(votes=models.Post.__table__.c.votes + bindparam("delta")),
+            [{"post_id": post_id, "delta": delta} for post_id, delta in deltas.items()],
+        )
+        posts = session.exec(
+            select(
+                models.Post.id,
+                models.Post.votes,
+                models.Post.created_at,
+                models.Post.owner_session_id,
+            ).where(models.Post.id.in_(deltas))
+        ).all()
+        session.connection().execute(
+            update(models.Post.__table__)
+            .where(models.Post.__table__.c.id == bindparam("post_id"))
+            .values(hot_score=bindparam("score")),
+            [
+                {"post_id": post_id, "score": hot_score(votes, created_at)}
+                for post_id, votes, created_at, _ in posts
+            ],
+        )
+        owners = {post_id: owner for post_id, _, _, owner in posts}
+        points: dict[str, int] = {}
+        for (post_id, session_id), change in changes.items():
+            if owners.get(post_id, session_id) != session_id:
+                points[session_id] = points.get(session_id, 0) + change
+        add_points(session, points)
+    return deltas
+
+
+def set_votes(
+    session: Session, session_id: str, intents: dict[str, int]
+) -> dict[str, VoteResult]:
+    """Write ``session_id``'s final vote on each post, 0 meaning no vote.
+
+    Intents for posts that no longer exist are dropped. Returns, per post
+    written, the authoritative count along with the voter's vote and the
+    change that was applied. Runs inside the caller's transaction.
+    """
+    owners = dict(
+        session.exec(
+            select(models.Post.id, models.Post.owner_session_id).where(
+                models.Post.id.in_(intents)
+            )
+        ).all()
+    )
+    if not owners:
+        return {}
+    deltas = apply_vote_intents(
+        session,
+        {
+            (post_id, session_id): vote_value
+            for post_id, vote_value in intents.items()
+            if post_id in owners
+        },
+    )
+    results = {}
+    for post_id, votes in session.exec(
+        select(models.Post.id, models.Post.votes).where(models.Post.id.in_(owners))
+    ).all():
+        delta = deltas.get(post_id, 0)
+        points = delta if owners[post_id] != session_id else 0
+        results[post_id] = VoteResult(votes, intents[post_id], delta, points)
+    return results
@@ -0,0 +1,51 @@
+from app.db.archive import archive_cold_posts
+from app.db.database import get_db_session
+from app.db.feed_cache import feed_cache
+from app.db.peek import rebuild_scores
+from app.db.ranking import reconcile_post_counters
+from app.scheduler import Cron, Interval, Scheduler
+import functools
+import os
+
+# Archiving runs often and briefly: at most ARCHIVE_MAX_BATCHES batches a
+# run, so a backlog drains over several runs instead of one long one.
+# ARCHIVE_INTERVAL_SECONDS=0 turns it off.
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "600"))
+ARCHIVE_MAX_BATCHES = int(os.getenv("ARCHIVE_MAX_BATCHES", "50"))
+# Scores are kept in step on every write; the nightly rebuild repairs any
+# drift. An empty PEEK_REBUILD_CRON turns it off.
+PEEK_REBUILD_CRON = os.getenv("PEEK_REBUILD_CRON", "30 4 * * *")
+# Vote and comment counters are likewise kept in step by every write; this
+# recounts them from the rows and fixes the posts that drifted. An empty
+# RECONCILE_COUNTERS_CRON turns it off.
+RECONCILE_COUNTERS_CRON = os.getenv("RECONCILE_COUNTERS_CRON", "0 4 * * *")
+
+
+def rebuild_peek_scores() -> int:
+    with get_db_session() as session:
+        return rebuild_scores(session)
+
+
+def reconcile_counters() -> int:
+    with get_db_session() as session:
+        repaired = reconcile_post_counters(session)
+    if repaired:
+        feed_cache.invalidate()
+    return repaired
+
+
+def register_jobs(scheduler: Scheduler) -> None:
+    if ARCHIVE_INTERVAL_SECONDS > 0:
+        scheduler.add(
+            "archive_cold_posts",
+            Interval(ARCHIVE_INTERVAL_SECONDS),
+            functools.partial(archive_cold_posts, max_batches=ARCHIVE_MAX_BATCHES),
+        )
+    if PEEK_REBUILD_CRON:
+        scheduler.add(
+            "rebuild_peek_scores", Cron(PEEK_REBUILD_CRON), rebuild_peek_scores
+        )
+    if RECONCILE_COUNTERS_CRON:
+        scheduler.add(
+            "reconcile_counters", Cron(RECONCILE_COUNTERS_CRON), reconcile_counters
+        )
@@ -0,0 +1,326 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from reflex.middleware import Middleware
+from app.db import database
+from app.db.feed_cache import feed_cache
+from app.broadcast import broadcaster
+from contextvars import ContextVar
+from typing import Optional
+import bisect
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+
+EVENT_METRICS_ENABLED = os.getenv("EVENT_METRICS_ENABLED", "1").lower() in (
+    "1",
+    "true",
+)
+SLOW_EVENT_MS = float(os.getenv("SLOW_EVENT_MS", "0"))
+SLOW_EVENT_MAX_STATEMENTS = 10
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+JOB_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class EventStats:
+    __slots__ = ("statements", "sql_seconds", "rows", "queries", "_started")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.queries: list[tuple[float, str]] = []
+        self._started: list[float] = []
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class EventMetrics:
+    """Per-handler counters and histograms rendered in Prometheus text format."""
+
+    def __init__(self):
+        self.durations: dict[str, Histogram] = {}
+        self.delta_bytes: dict[str, Histogram] = {}
+        self.counters: dict[str, dict[str, float]] = {
+            "yak_event_sql_statements_total": {},
+            "yak_event_sql_seconds_total": {},
+            "yak_event_rows_total": {},
+            "yak_event_errors_total": {},
+        }
+        self.job_durations: dict[str, Histogram] = {}
+        self.job_counters: dict[str, dict[str, float]] = {
+            "yak_job_runs_total": {},
+            "yak_job_failures_total": {},
+            "yak_job_skipped_total": {},
+        }
+        self.job_last_success: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, counter: str, handler: str, value: float) -> None:
+        values = self.counters[counter]
+        values[handler] = values.get(handler, 0) + value
+
+    def record_event(
+        self, handler: str, seconds: float, stats: EventStats, failed: bool
+    ) -> None:
+        with self._lock:
+            self.durations.setdefault(handler, Histogram(DURATION_BUCKETS)).observe(
+                seconds
+            )
+            self._add("yak_event_sql_statements_total", handler, stats.statements)
+            self._add("yak_event_sql_seconds_total", handler, stats.sql_seconds)
+            self._add("yak_event_rows_total", handler, stats.rows)
+            self._add("yak_event_errors_total", handler, int(failed))
+
+    def record_delta(self, handler: str, size: int) -> None:
+        with self._lock:
+            self.delta_bytes.setdefault(handler, Histogram(BYTES_BUCKETS)).observe(size)
+
+    def _add_job(self, counter: str, job: str, value: float) -> None:
+        values = self.job_counters[counter]
+        values[job] = values.get(job, 0) + value
+
+    def record_job(self, job: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            self.job_durations.setdefault(job, Histogram(JOB_BUCKETS)).observe(seconds)
+            self._add_job("yak_job_runs_total", job, 1)
+            self._add_job("yak_job_failures_total", job, int(failed))
+            if not failed:
+                self.job_last_success[job] = time.time()
+
+    def record_job_skipped(self, job: str) -> None:
+        """Count a due run that another worker's lease claimed first."""
+        with self._lock:
+            self._add_job("yak_job_skipped_total", job, 1)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, key, histograms in (
+                ("yak_event_duration_seconds", "handler", self.durations),
+                ("yak_event_delta_bytes", "handler", self.delta_bytes),
+                ("yak_job_duration_seconds", "job", self.job_durations),
+            ):
+                lines.append(f"# TYPE {name} histogram")
+                for handler, histogram in sorted(histograms.items()):
+                    label = f'{key}="{handler}"'
+                    cumulative = 0
+                    for bound, count in zip(
+                        (*histogram.buckets, "+Inf"), histogram.counts
+                    ):
+                        cumulative += count
+                        lines.append(
+                            f'{name}_bucket{{{label},le="{bound}"}} {cumulative}'
+                        )
+                    lines.append(f"{name}_sum{{{label}}} {histogram.total}")
+                    lines.append(f"{name}_count{{{label}}} {cumulative}")
+            for name, values in self.counters.items():
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(
+                    f'{name}{{handler="{handler}"}} {value}'
+                    for handler, value in sorted(values.items())
+                )
+            for name, values in self.job_counters.items():
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(
+                    f'{name}{{job="{job}"}} {value}'
+                    for job, value in sorted(values.items())
+                )
+            name = "yak_job_last_success_timestamp_seconds"
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(
+                f'{name}{{job="{job}"}} {value}'
+                for job, value in sorted(self.job_last_success.items())
+            )
+        for name, value in feed_cache.stats().items():
+            kind = "gauge" if name == "entries" else "counter"
+            suffix = "" if kind == "gauge" else "_total"
+            lines.append(f"# TYPE yak_feed_cache_{name}{suffix} {kind}")
+            lines.append(f"yak_feed_cache_{name}{suffix} {value}")
+        if broadcaster is not None:
+            for name, value in broadcaster.stats().items():
+                kind = "gauge" if name == "subscribers" else "counter"
+                suffix = "" if kind == "gauge" else "_total"
+                lines.append(f"# TYPE yak_broadcast_{name}{suffix} {kind}")
+                lines.append(f"yak_broadcast_{name}{suffix} {value}")
+        return "\n".join(lines) + "\n"
+
+
+event_metrics = EventMetrics()
+_current_event: ContextVar[Optional[EventStats]] = ContextVar(
+    "current_event", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    stats = _current_event.get()
+    if stats is not None:
+        stats._started.append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    stats = _current_event.get()
+    if stats is None or not stats._started:
+        return
+    elapsed = time.perf_counter() - stats._started.pop()
+    stats.statements += 1
+    stats.sql_seconds += elapsed
+    # Selected rows are counted as they are loaded; rowcount is for DML only.
+    is_dml = context is not None and (
+        context.isinsert or context.isupdate or context.isdelete
+    )
+    if is_dml and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    if SLOW_EVENT_MS:
+        stats.queries.append((elapsed, statement))
+
+
+def _count_selected_rows(orm_execute_state):
+    stats = _current_event.get()
+    if stats is None or not orm_execute_state.is_select:
+        return None
+    frozen = orm_execute_state.invoke_statement().freeze()
+    stats.rows += len(frozen.data)
+    return frozen()
+
+
+def instrument_engine(engine) -> None:
+    engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _log_slow_event(handler: str, seconds: float, stats: EventStats) -> None:
+    slowest = sorted(stats.queries, reverse=True)[:SLOW_EVENT_MAX_STATEMENTS]
+    logging.warning(
+        f"Slow event {handler}: {seconds * 1000:.1f} ms, "
+        f"{stats.statements} statements in {stats.sql_seconds * 1000:.1f} ms, "
+        f"{stats.rows} rows"
+        + "".join(
+            f"\n  {elapsed * 1000:8.1f} ms  {' '.join(statement.split())}"
+            for elapsed, statement in slowest
+        )
+    )
+
+
+def _finish(handler: str, started: float, stats: EventStats, failed: bool) -> None:
+    seconds = time.perf_counter() - started
+    event_metrics.record_event(handler, seconds, stats, failed)
+    if SLOW_EVENT_MS and seconds * 1000 >= SLOW_EVENT_MS:
+        _log_slow_event(handler, seconds, stats)
+
+
+def instrumented(fn):
+    """Record wall time, SQL and rows for an event handler of any kind.
+
+    Keeps the handler sync, async or an (async) generator so Reflex still
+    runs it the same way. Apply below ``@rx.event``.
+    """
+    if not EVENT_METRICS_ENABLED:
+        return fn
+    handler = fn.__name__
+
+    if inspect.isasyncgenfunction(fn):
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            stats, started = EventStats(), time.perf_counter()
+            token, failed = _current_event.set(stats), True
+            try:
+                async for update in fn(*args, **kwargs):
+                    yield update
+                failed = False
+            finally:
+                _current_event.reset(token)
+                _finish(handler, started, stats, failed)
+
+    elif inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            stats, started = EventStats(), time.perf_counter()
+            token, failed = _current_event.set(stats), True
+            try:
+                result = await fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                _current_event.reset(token)
+                _finish(handler, started, stats, failed)
+
+    elif inspect.isgeneratorfunction(fn):
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            stats, started = EventStats(), time.perf_counter()
+            token, failed = _current_event.set(stats), True
+            try:
+                result = yield from fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                _current_event.reset(token)
+                _finish(handler, started, stats, failed)
+
+    else:
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            stats, started = EventStats(), time.perf_counter()
+            token, failed = _current_event.set(stats), True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                _current_event.reset(token)
+                _finish(handler, started, stats, failed)
+
+    return wrapper
+
+
+class DeltaSizeMiddleware(Middleware):
+    """Record the serialized size of every state update sent to a client."""
+
+    async def preprocess(self, app, state, event):
+        return None
+
+    async def postprocess(self, app, state, event, update):
+        event_metrics.record_delta(
+            event.name.rpartition(".")[2], len(update.json().encode())
+        )
+        return update
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(
+        event_metrics.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+metrics_api = Starlette(routes=[Route("/metrics", metrics_endpoint)])
+
+if EVENT_METRICS_ENABLED:
+    event.listen(Session, "do_orm_execute", _count_selected_rows)
+    for target in (database.read_router.primary, *database.read_router.replicas):
+        instrument_engine(target.engine)
+        instrument_engine(target.async_engine)
+    instrument_engine(database.engine)
+    instrument_engine(database.async_engine)
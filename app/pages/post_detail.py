@@ -1,6 +1,6 @@
 import reflex as rx
-from app.states.yak_state import YakState, Comment
-from app.components.post_card import post_card
+from app.states.yak_state import COMMENT_MAX_LENGTH, YakState, Comment, comment_draft
+from app.components.post_card import post_card, relative_time
 
 
 def comment_card(comment: Comment) -> rx.Component:
@@ -12,7 +12,10 @@ def comment_card(comment: Comment) -> rx.Component:
             ),
             rx.el.div(
                 rx.el.p(comment["content"], class_name="text-sm text-gray-800"),
-                rx.el.p(comment["created_at"], class_name="text-xs text-gray-500 mt-1"),
+                rx.el.p(
+                    relative_time(comment["created_at"]),
+                    class_name="text-xs text-gray-500 mt-1",
+                ),
                 class_name="flex-1",
             ),
         ),
@@ -21,27 +24,28 @@ def comment_card(comment: Comment) -> rx.Component:
 
 
 def create_comment_form() -> rx.Component:
+    char_count = comment_draft.value.to(str).length()
     return rx.el.div(
         rx.el.textarea(
             placeholder="Add a comment...",
-            on_change=YakState.set_new_comment_content,
-            max_length=150,
+            on_change=lambda value: comment_draft.set_value(value),
+            max_length=COMMENT_MAX_LENGTH,
             class_name="w-full h-24 p-3 text-sm text-gray-800 bg-white rounded-lg border border-gray-200 focus:ring-2 focus:ring-teal-500 focus:border-transparent transition-all duration-200 placeholder-gray-400 resize-none",
-            default_value=YakState.new_comment_content,
+            value=comment_draft.value,
         ),
         rx.el.div(
             rx.el.p(
-                f"{YakState.comment_char_count} / 150",
+                f"{char_count} / {COMMENT_MAX_LENGTH}",
                 class_name=rx.cond(
-                    YakState.comment_char_count > 150,
+                    char_count > COMMENT_MAX_LENGTH,
                     "text-xs font-medium text-red-500",
                     "text-xs font-medium text-gray-500",
                 ),
             ),
             rx.el.button(
                 "Comment",
-                on_click=lambda: YakState.add_comment(YakState.post_detail["id"]),
-                disabled=YakState.is_comment_invalid,
+                on_click=comment_draft.retrieve(YakState.add_comment),
+                disabled=(char_count == 0) | (char_count > COMMENT_MAX_LENGTH),
                 class_name="""
                     px-5 py-2 bg-teal-500 text-white font-semibold rounded-full text-sm
                     hover:bg-teal-600 transition-colors shadow-[0px_1px_3px_rgba(0,0,0,0.12)] 
@@ -54,18 +58,45 @@ def create_comment_form() -> rx.Component:
     )
 
 
+def archived_notice() -> rx.Component:
+    return rx.el.div(
+        rx.icon("archive", class_name="h-4 w-4"),
+        rx.el.p("This yak is archived. Comments and votes are closed."),
+        class_name="flex items-center justify-center gap-2 p-4 text-sm text-gray-500 bg-gray-50 border-t border-gray-200",
+    )
+
+
+def load_more_comments_button() -> rx.Component:
+    return rx.cond(
+        YakState.has_more_comments,
+        rx.el.div(
+            rx.el.button(
+                "Load more comments",
+                on_click=YakState.load_more_comments,
+                class_name="px-4 py-2 text-sm font-semibold text-gray-600 bg-gray-100 hover:bg-gray-200 rounded-full transition-all duration-300",
+            ),
+            class_name="flex justify-center p-4",
+        ),
+    )
+
+
 def post_detail_view() -> rx.Component:
     return rx.el.div(
         rx.cond(
             YakState.post_detail,
             rx.el.div(
-                post_card(YakState.post_detail, is_link=False),
+                post_card(
+                    YakState.post_detail,
+                    is_link=False,
+                    is_archived=YakState.post_detail["is_archived"],
+                ),
                 rx.el.div(
                     rx.el.h3(
                         "Comments",
                         class_name="text-lg font-bold text-gray-800 px-4 pt-4 pb-2",
                     ),
                     rx.foreach(YakState.post_detail["comments"], comment_card),
+                    load_more_comments_button(),
                     class_name="bg-white rounded-lg shadow-[0px_1px_3px_rgba(0,0,0,0.12)] mt-4 overflow-hidden",
                 ),
                 class_name="flex flex-col gap-4",
@@ -106,7 +137,11 @@ def post_detail() -> rx.Component:
         post_detail_view(),
         rx.cond(
             YakState.post_detail,
-            rx.el.div(create_comment_form(), class_name="sticky bottom-0 z-10"),
+            rx.cond(
+                YakState.post_detail["is_archived"],
+                archived_notice(),
+                rx.el.div(create_comment_form(), class_name="sticky bottom-0 z-10"),
+            ),
         ),
         class_name="font-['Poppins'] bg-gray-50 min-h-screen",
     )
\ No newline at end of file
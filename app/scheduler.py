@@ -0,0 +1,311 @@
+from sqlalchemy import update
+from sqlmodel import select
+from app.db import models
+from app.db.database import get_db_session, insert_for
+from app.metrics import event_metrics
+from typing import Any, Callable, NamedTuple, Optional, Union
+import asyncio
+import contextlib
+import datetime
+import inspect
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1").lower() in ("1", "true")
+# Every wait is stretched by up to this much, so workers started together
+# don't all reach for the same lease in the same instant.
+SCHEDULER_JITTER_SECONDS = float(os.getenv("SCHEDULER_JITTER_SECONDS", "30"))
+SCHEDULER_RETRY_SECONDS = float(os.getenv("SCHEDULER_RETRY_SECONDS", "60"))
+SCHEDULER_SHUTDOWN_SECONDS = float(os.getenv("SCHEDULER_SHUTDOWN_SECONDS", "30"))
+
+
+def utcnow() -> datetime.datetime:
+    return datetime.datetime.utcnow()
+
+
+class Interval:
+    """Run again ``seconds`` after the previous run finished."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def next_after(self, when: datetime.datetime) -> datetime.datetime:
+        return when + datetime.timedelta(seconds=self.seconds)
+
+    def __repr__(self) -> str:
+        return f"Interval({self.seconds})"
+
+
+class Cron:
+    """A five-field crontab schedule: minute hour day month weekday, in UTC.
+
+    Fields take ``*``, numbers, ``a-b`` ranges, ``/step`` and comma lists;
+    weekdays count from Sunday as 0 (7 is Sunday too). As in cron, when both
+    day and weekday are restricted a day matching either one runs.
+    """
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs five fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(field, low, high)
+            for field, (low, high) in zip(fields, self.RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> set[int]:
+        values = set()
+        for part in field.split(","):
+            span, _, step = part.partition("/")
+            if span == "*":
+                start, stop = low, high
+            elif "-" in span:
+                start, stop = (int(n) for n in span.split("-", 1))
+            else:
+                start = int(span)
+                stop = high if step else start
+            if not low <= start <= stop <= high:
+                raise ValueError(f"Cron field {field!r} is out of {low}-{high}")
+            values.update(range(start, stop + 1, int(step or 1)))
+        return values
+
+    def _day_matches(self, when: datetime.datetime) -> bool:
+        day = when.day in self.days
+        weekday = (when.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, when: datetime.datetime) -> datetime.datetime:
+        """The first matching minute strictly after ``when``."""
+        when = when.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        # Any schedule that matches at all does so within a few years.
+        limit = when + datetime.timedelta(days=366 * 5)
+        while when < limit:
+            if when.month not in self.months:
+                month = when.month % 12 + 1
+                when = when.replace(
+                    year=when.year + (month == 1), month=month, day=1, hour=0, minute=0
+                )
+            elif not self._day_matches(when):
+                when = when.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif when.hour not in self.hours:
+                when = when.replace(minute=0) + datetime.timedelta(hours=1)
+            elif when.minute not in self.minutes:
+                when += datetime.timedelta(minutes=1)
+            else:
+                return when
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+    def __repr__(self) -> str:
+        return f"Cron({self.expression!r})"
+
+
+Schedule = Union[Interval, Cron]
+
+
+class Job(NamedTuple):
+    name: str
+    schedule: Schedule
+    run: Callable[[], Any]
+    # How long a worker may hold the job; longer runs can overlap another.
+    lease_seconds: float
+
+
+class Scheduler:
+    """Runs periodic maintenance jobs inside the app's workers.
+
+    Each job has a ``joblease`` row saying when it is next due and which
+    worker holds it. Every worker sleeps until the job is due (plus jitter),
+    then tries to take the lease with one conditional upsert; whoever wins
+    runs the job and, when it finishes, sets the next due time from the
+    schedule and lets the lease go. Losers read the new due time and go back
+    to sleep, so a job runs once per deployment however many workers there
+    are. A worker that dies mid-run holds the lease until it expires.
+
+    Sync jobs run in a thread, async ones on the event loop. Stopping lets
+    running jobs finish for up to ``shutdown_seconds`` before cancelling.
+    """
+
+    def __init__(
+        self, jitter_seconds: float, retry_seconds: float, shutdown_seconds: float
+    ):
+        self.jitter_seconds = jitter_seconds
+        self.retry_seconds = retry_seconds
+        self.shutdown_seconds = shutdown_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: dict[str, Job] = {}
+        self._stopping: Optional[asyncio.Event] = None
+        self._tasks: list[asyncio.Task] = []
+
+    def add(
+        self,
+        name: str,
+        schedule: Schedule,
+        run: Callable[[], Any],
+        lease_seconds: float = 600,
+    ) -> None:
+        self.jobs[name] = Job(name, schedule, run, lease_seconds)
+
+    def _next_due(self, job: Job) -> datetime.datetime:
+        """Create the job's row if needed and return when it is next due.
+
+        A due time further off than the schedule allows (the schedule was
+        changed) is pulled in.
+        """
+        now = utcnow()
+        due = job.schedule.next_after(now)
+        with get_db_session() as session:
+            session.exec(
+                insert_for(session)(models.JobLease.__table__)
+                .values(name=job.name, expires_at=now, next_run_at=due)
+                .on_conflict_do_nothing(index_elements=["name"])
+            )
+            session.exec(
+                update(models.JobLease)
+                .where(models.JobLease.name == job.name)
+                .where(models.JobLease.next_run_at > due)
+                .values(next_run_at=due)
+            )
+            next_run_at, expires_at = session.exec(
+                select(models.JobLease.next_run_at, models.JobLease.expires_at).where(
+                    models.JobLease.name == job.name
+                )
+            ).one()
+        return max(next_run_at, expires_at)
+
+    def _acquire(self, job: Job) -> bool:
+        """Take the job's lease if it is due and nobody else holds it."""
+        now = utcnow()
+        table = models.JobLease.__table__
+        with get_db_session() as session:
+            insert = insert_for(session)(table).values(
+                name=job.name,
+                holder=self.holder,
+                expires_at=now + datetime.timedelta(seconds=job.lease_seconds),
+                next_run_at=now,
+            )
+            return (
+                session.exec(
+                    insert.on_conflict_do_update(
+                        index_elements=["name"],
+                        set_={
+                            "holder": insert.excluded.holder,
+                            "expires_at": insert.excluded.expires_at,
+                        },
+                        where=(table.c.expires_at <= now)
+                        & (table.c.next_run_at <= now),
+                    )
+                ).rowcount
+                == 1
+            )
+
+    def _release(self, job: Job) -> None:
+        now = utcnow()
+        with get_db_session() as session:
+            session.exec(
+                update(models.JobLease)
+                .where(models.JobLease.name == job.name)
+                .where(models.JobLease.holder == self.holder)
+                .values(
+                    holder="", expires_at=now, next_run_at=job.schedule.next_after(now)
+                )
+            )
+
+    async def _run(self, job: Job) -> None:
+        started, failed = time.perf_counter(), True
+        try:
+            if inspect.iscoroutinefunction(job.run):
+                await job.run()
+            else:
+                await asyncio.to_thread(job.run)
+            failed = False
+        except Exception:
+            logging.exception(f"Scheduled job {job.name} failed")
+        finally:
+            seconds = time.perf_counter() - started
+            event_metrics.record_job(job.name, seconds, failed)
+            if seconds > job.lease_seconds:
+                logging.warning(
+                    f"Scheduled job {job.name} ran {seconds:.0f} s, past its "
+                    f"{job.lease_seconds:.0f} s lease"
+                )
+            # Shielded so a shutdown cancel still hands the lease back.
+            await asyncio.shield(asyncio.to_thread(self._release, job))
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Wait ``seconds`` plus jitter; False if the scheduler is stopping."""
+        seconds = max(seconds, 0) + random.uniform(0, self.jitter_seconds)
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            return True
+        return False
+
+    async def _loop(self, job: Job) -> None:
+        while True:
+            try:
+                due = await asyncio.to_thread(self._next_due, job)
+            except Exception:
+                logging.exception(f"Could not schedule job {job.name}")
+                if not await self._sleep(self.retry_seconds):
+                    return
+                continue
+            if not await self._sleep((due - utcnow()).total_seconds()):
+                return
+            try:
+                acquired = await asyncio.to_thread(self._acquire, job)
+            except Exception:
+                logging.exception(f"Could not take the lease for job {job.name}")
+                continue
+            if acquired:
+                await self._run(job)
+            else:
+                event_metrics.record_job_skipped(job.name)
+
+    def start(self) -> None:
+        self._stopping = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._loop(job), name=f"scheduler|{job.name}")
+            for job in self.jobs.values()
+        ]
+        logging.info(f"Scheduler {self.holder} started: {', '.join(self.jobs)}")
+
+    async def stop(self) -> None:
+        """Stop waiting for new runs and give running ones time to finish."""
+        if self._stopping is None:
+            return
+        self._stopping.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=self.shutdown_seconds)
+        for task in pending:
+            logging.warning(f"Cancelling {task.get_name()} at shutdown")
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks, self._stopping = [], None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        """Run the scheduler for as long as the app; register with Reflex."""
+        self.start()
+        try:
+            yield
+        finally:
+            await self.stop()
+
+
+scheduler: Optional[Scheduler] = None
+if SCHEDULER_ENABLED:
+    scheduler = Scheduler(
+        SCHEDULER_JITTER_SECONDS, SCHEDULER_RETRY_SECONDS, SCHEDULER_SHUTDOWN_SECONDS
+    )
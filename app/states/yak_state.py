@@ -1,171 +1,517 @@
 import reflex as rx
+from reflex.experimental import ClientStateVar
+from reflex.experimental.client_state import _client_state_ref
 from typing import TypedDict, Optional
-import datetime
+import asyncio
+import json
+import time
 import uuid
-from sqlmodel import Session, select, delete
-from app.db.database import get_db_session
+from sqlmodel import delete, update
+from reflex.utils import prerequisites
+from app.db.database import get_async_db_session
 from app.db import models
+from app.db.archive import archived_comment_page, archived_post, load_archived_post
+from app.db.ranking import hot_score
+from app.db.feed import (
+    FEED_PAGE_SIZE,
+    FEED_RECONCILE_SECONDS,
+    format_comment,
+    format_feed_post,
+    format_post_detail,
+    format_shared_feed_post,
+    load_comment_page,
+    load_feed_page,
+    load_post,
+    load_user_votes,
+    personalize_feed_post,
+)
+from app.db.feed_cache import feed_cache
+from app.db.geo import (
+    DEFAULT_GEOHASH,
+    LOCATION_REFRESH_SECONDS,
+    encode,
+    neighbors,
+    parse_location,
+)
+from app.db.peek import (
+    PEEK_BASE_SCORE,
+    PEEK_POST_POINTS,
+    add_points,
+    load_score,
+    remove_post_points,
+)
+from app.db.search import SEARCH_PAGE_SIZE, search_posts
+from app.db.votes import VoteResult, set_votes
+from app.db.vote_buffer import vote_buffer
+from app.metrics import instrumented
+from app.broadcast import (
+    BROADCAST_IDLE_SECONDS,
+    Change,
+    apply_counts,
+    apply_shown_changes,
+    broadcaster,
+    publish,
+)
+
+POST_MAX_LENGTH = 200
+COMMENT_MAX_LENGTH = 150
+# Drafts are typed into browser state, so keystrokes send no events; the text
+# reaches the server once, on submit, and is checked again there.
+post_draft = ClientStateVar.create("post_draft", "")
+comment_draft = ClientStateVar.create("comment_draft", "")
+# Votes are shown the moment they are clicked: the browser keeps
+# ``{post_id: [votes, user_vote]}`` for clicks the server hasn't settled, and
+# cards prefer it while its vote differs from the server's ``user_vote``.
+vote_overrides = ClientStateVar.create("vote_overrides", {})
+# Clicks on a post within this long of each other are written as one vote.
+VOTE_COALESCE_SECONDS = 0.3
+# A writer that hasn't checked in for this long is presumed gone (its worker
+# died), and the next vote starts another.
+VOTE_WRITER_STALE_SECONDS = 30
+
+# Resolves to [latitude, longitude], or null if the browser can't or won't say.
+GEOLOCATION_SCRIPT = """new Promise((resolve) => navigator.geolocation
+    ? navigator.geolocation.getCurrentPosition(
+        (p) => resolve([p.coords.latitude, p.coords.longitude]),
+        () => resolve(null),
+        {maximumAge: 600000, timeout: 10000},
+      )
+    : resolve(null))"""
 
 
 class Comment(TypedDict):
     id: str
     content: str
-    created_at: str
+    created_at: int
 
 
-class Post(TypedDict):
+class FeedPost(TypedDict):
     id: str
     content: str
     votes: int
-    created_at: str
+    created_at: int
     user_vote: int
-    comments: list[Comment]
+    comment_count: int
     is_owner: bool
+    geohash: str
 
 
-def time_since(dt: datetime.datetime) -> str:
-    now = datetime.datetime.utcnow()
-    diff = now - dt
-    seconds = diff.total_seconds()
-    if seconds < 60:
-        return "Just now"
-    elif seconds < 3600:
-        minutes = int(seconds / 60)
-        return f"{minutes} minute{('s' if minutes > 1 else '')} ago"
-    elif seconds < 86400:
-        hours = int(seconds / 3600)
-        return f"{hours} hour{('s' if hours > 1 else '')} ago"
-    else:
-        days = int(seconds / 86400)
-        return f"{days} day{('s' if days > 1 else '')} ago"
+class Post(FeedPost):
+    comments: list[Comment]
+    is_archived: bool
 
 
 class YakState(rx.State):
-    peek_score: int = 137
-    posts: list[Post] = []
+    # Who owns posts, votes and the Peek Score. Kept in the browser so every
+    # tab, reconnect and server restart shares it, unlike the socket session.
+    user_id: str = rx.LocalStorage("", name="yak_user_id", sync=True)
+    peek_score: int = PEEK_BASE_SCORE
+    posts: list[FeedPost] = []
+    has_more_posts: bool = False
+    _feed_cursor: str = ""
+    _user_votes: dict[str, int] = {}
+    _vote_intents: dict[str, int] = {}
+    _vote_writer_at: float = 0.0
+    _feed_loaded_at: float = 0.0
     show_create_dialog: bool = False
-    new_post_content: str = ""
-    new_comment_content: str = ""
     sort_by: str = "hot"
+    geohash: str = DEFAULT_GEOHASH
+    _located_at: float = 0.0
     post_detail: Post | None = None
+    has_more_comments: bool = False
+    _comment_cursor: str = ""
+    search_query: str = ""
+    search_results: list[FeedPost] = []
+    has_more_results: bool = False
+    _search_offset: int = 0
 
     def _get_session_id(self) -> str:
-        return self.router.session.session_id
+        if not self.user_id:
+            self.user_id = str(uuid.uuid4())
+        return self.user_id
+
+    async def _fill_user_votes(self, post_ids: list[str]):
+        missing = [post_id for post_id in post_ids if post_id not in self._user_votes]
+        if missing:
+            async with get_async_db_session(
+                readonly=True, user_session_id=self._get_session_id()
+            ) as session:
+                self._user_votes.update(
+                    await session.run_sync(
+                        load_user_votes, self._get_session_id(), missing
+                    )
+                )
 
-    def _format_post_for_frontend(
-        self, post_model: models.Post, session: Session
-    ) -> Post:
+    async def _load_page(
+        self, cursor: str | None, limit: int = FEED_PAGE_SIZE
+    ) -> tuple[list[FeedPost], str | None]:
+        sort_by, cell = self.sort_by, self.geohash
+
+        async def load():
+            async with get_async_db_session(
+                readonly=True, user_session_id=self._get_session_id()
+            ) as session:
+                post_models, next_cursor = await session.run_sync(
+                    load_feed_page, sort_by, cursor, limit, neighbors(cell)
+                )
+                return [
+                    (format_shared_feed_post(p), p.owner_session_id)
+                    for p in post_models
+                ], next_cursor
+
+        entries, next_cursor = await feed_cache.get(
+            (sort_by, cell, cursor, limit), load
+        )
+        await self._fill_user_votes([item["id"] for item, _ in entries])
         session_id = self._get_session_id()
-        user_vote_model = session.exec(
-            select(models.UserVote).where(
-                models.UserVote.post_id == post_model.id,
-                models.UserVote.user_session_id == session_id,
+        posts = [
+            self._with_pending_votes(
+                personalize_feed_post(
+                    item, owner_session_id, self._user_votes[item["id"]], session_id
+                )
             )
-        ).first()
-        user_vote = user_vote_model.vote_value if user_vote_model else 0
-        comments = sorted(post_model.comments, key=lambda c: c.created_at, reverse=True)
-        return {
-            "id": post_model.id,
-            "content": post_model.content,
-            "votes": post_model.votes,
-            "created_at": time_since(post_model.created_at),
-            "user_vote": user_vote,
-            "comments": [
-                {
-                    "id": c.id,
-                    "content": c.content,
-                    "created_at": time_since(c.created_at),
-                }
-                for c in comments
-            ],
-            "is_owner": post_model.owner_session_id == session_id,
-        }
+            for item, owner_session_id in entries
+        ]
+        return posts, next_cursor
 
-    @rx.event
-    def load_posts(self):
-        with get_db_session() as session:
-            posts_query = select(models.Post)
-            if self.sort_by == "new":
-                posts_query = posts_query.order_by(models.Post.created_at.desc())
+    def _with_pending_votes(self, post: dict) -> dict:
+        """Overlay votes still waiting in the vote buffer onto a fresh post."""
+        if vote_buffer is not None:
+            post["votes"] += vote_buffer.pending_delta(post["id"])
+            post["user_vote"] = self._user_votes.get(post["id"], post["user_vote"])
+        return post
+
+    async def _load_first_page(self, limit: int = FEED_PAGE_SIZE):
+        self.posts, cursor = await self._load_page(None, limit)
+        self._feed_cursor = cursor or ""
+        self.has_more_posts = cursor is not None
+        self._feed_loaded_at = time.time()
+
+    def _patch_post(self, post_id: str, **changes):
+        """Apply ``changes`` to the post wherever it is on screen."""
+        for posts in (self.posts, self.search_results):
+            for post in posts:
+                if post["id"] == post_id:
+                    post.update(changes)
+                    break
+        if self.post_detail and self.post_detail["id"] == post_id:
+            self.post_detail.update(changes)
+
+    def _apply_changes(self, changes: list[Change]):
+        """Apply changes broadcast by other sessions to what is on screen.
+
+        One pass over ``posts`` and ``search_results``, and counts are only
+        written when they differ, so count changes for posts this tab isn't
+        showing send no delta.
+        """
+        session_id = self._get_session_id()
+        by_id = {change["id"]: change for change in changes}
+        shown = apply_shown_changes(self.posts, by_id)
+        # Search results get the same counts and deletions, but no new posts.
+        apply_shown_changes(self.search_results, by_id)
+        nearby = set(neighbors(self.geohash))
+        for change in changes:
+            if (
+                "post" in change
+                and change["id"] not in shown
+                and change["post"]["geohash"] in nearby
+            ):
+                user_vote = self._user_votes.get(change["id"], 0)
+                self.posts.insert(
+                    0,
+                    apply_counts(
+                        personalize_feed_post(
+                            change["post"], change["owner"], user_vote, session_id
+                        ),
+                        change,
+                    ),
+                )
+        if self.post_detail and self.post_detail["id"] in by_id:
+            change = by_id[self.post_detail["id"]]
+            if change.get("deleted"):
+                self.post_detail = None
             else:
-                posts_query = posts_query.order_by(models.Post.votes.desc())
-            post_models = session.exec(posts_query).all()
-            self.posts = [
-                self._format_post_for_frontend(p, session) for p in post_models
-            ]
+                apply_counts(self.post_detail, change)
+
+    def _is_connected(self) -> bool:
+        namespace = prerequisites.get_and_validate_app().app.event_namespace
+        return (
+            namespace is not None
+            and self.router.session.client_token in namespace.token_to_sid
+        )
+
+    async def _load_peek_score(self):
+        """Read the stored score, plus points still waiting in the vote buffer.
+
+        This tab adjusts the score for its own writes; reading it again on
+        every feed load picks up points earned in the browser's other tabs.
+        """
+        session_id = self._get_session_id()
+        async with get_async_db_session(
+            readonly=True, user_session_id=session_id
+        ) as session:
+            score = await session.run_sync(load_score, session_id)
+        if vote_buffer is not None:
+            score += vote_buffer.pending_points(session_id)
+        self.peek_score = score
+
+    @rx.event
+    @instrumented
+    async def load_posts(self):
+        await self._load_peek_score()
+        await self._load_first_page()
+
+    @rx.event
+    @instrumented
+    def locate(self):
+        """Ask the browser where this tab is, at most every few minutes."""
+        if time.time() - self._located_at < LOCATION_REFRESH_SECONDS:
+            return
+        return rx.call_script(GEOLOCATION_SCRIPT, callback=YakState.set_location)
+
+    @rx.event
+    @instrumented
+    def set_location(self, coords: list[float] | None):
+        """Move the feed to the cell around ``coords``; keep it if none came."""
+        self._located_at = time.time()
+        location = parse_location(coords)
+        if location is None:
+            return
+        cell = encode(*location)
+        if cell != self.geohash:
+            self.geohash = cell
+            return YakState.load_posts
 
-    @rx.var
-    def char_count(self) -> int:
-        return len(self.new_post_content)
+    @rx.event(background=True)
+    async def listen_for_changes(self):
+        """Keep the feed live until this tab disconnects; one per tab."""
+        if broadcaster is None:
+            return
+        subscription = broadcaster.subscribe(self.router.session.client_token)
+        if subscription is None:
+            return
+        try:
+            while self._is_connected():
+                changes = await subscription.next(BROADCAST_IDLE_SECONDS)
+                if changes:
+                    async with self:
+                        self._apply_changes(changes)
+        finally:
+            subscription.close()
 
-    @rx.var
-    def is_post_invalid(self) -> bool:
-        return self.char_count == 0 or self.char_count > 200
+    @rx.event
+    @instrumented
+    async def refresh_posts(self):
+        """Reload the feed without shrinking what has already been scrolled."""
+        await self._load_peek_score()
+        await self._load_first_page(max(len(self.posts), FEED_PAGE_SIZE))
 
-    @rx.var
-    def comment_char_count(self) -> int:
-        return len(self.new_comment_content)
+    @rx.event
+    @instrumented
+    async def load_more(self):
+        if not self._feed_cursor:
+            return
+        page, cursor = await self._load_page(self._feed_cursor)
+        seen = {post["id"] for post in self.posts}
+        self.posts.extend(post for post in page if post["id"] not in seen)
+        self._feed_cursor = cursor or ""
+        self.has_more_posts = cursor is not None
 
-    @rx.var
-    def is_comment_invalid(self) -> bool:
-        return self.comment_char_count == 0 or self.comment_char_count > 150
+    async def _search_page(self, offset: int) -> tuple[list[FeedPost], bool]:
+        query = self.search_query
+        async with get_async_db_session(
+            readonly=True, user_session_id=self._get_session_id()
+        ) as session:
+            post_models, has_more = await session.run_sync(search_posts, query, offset)
+        await self._fill_user_votes([p.id for p in post_models])
+        posts = [
+            self._with_pending_votes(
+                format_feed_post(p, self._user_votes[p.id], self._get_session_id())
+            )
+            for p in post_models
+        ]
+        return posts, has_more
 
     @rx.event
-    def get_post_by_id(self):
+    @instrumented
+    async def search(self, form_data: dict):
+        self.search_query = form_data.get("query", "").strip()
+        self.search_results = []
+        self._search_offset = 0
+        self.has_more_results = False
+        if not self.search_query:
+            return
+        self.search_results, self.has_more_results = await self._search_page(0)
+        self._search_offset = SEARCH_PAGE_SIZE
+
+    @rx.event
+    @instrumented
+    async def load_more_results(self):
+        if not self.search_query or not self.has_more_results:
+            return
+        page, self.has_more_results = await self._search_page(self._search_offset)
+        seen = {post["id"] for post in self.search_results}
+        self.search_results.extend(post for post in page if post["id"] not in seen)
+        self._search_offset += SEARCH_PAGE_SIZE
+
+    @rx.event
+    @instrumented
+    def clear_search(self):
+        self.search_query = ""
+        self.search_results = []
+        self.has_more_results = False
+        self._search_offset = 0
+
+    @rx.event
+    @instrumented
+    async def get_post_by_id(self):
         post_id = self.router.page.params.get("post_id")
+        self.has_more_comments = False
+        self._comment_cursor = ""
         if not post_id:
             self.post_detail = None
             return
-        with get_db_session() as session:
-            post_model = session.get(models.Post, post_id)
-            if post_model:
-                self.post_detail = self._format_post_for_frontend(post_model, session)
+        async with get_async_db_session(
+            readonly=True, user_session_id=self._get_session_id()
+        ) as session:
+            row = await session.run_sync(load_post, self._get_session_id(), post_id)
+            if row:
+                comments, cursor = await session.run_sync(load_comment_page, post_id)
+                self.post_detail = self._with_pending_votes(
+                    format_post_detail(*row, self._get_session_id(), comments)
+                )
+                self._comment_cursor = cursor or ""
+                self.has_more_comments = cursor is not None
+                return
+            document = await session.run_sync(load_archived_post, post_id)
+        if document is None:
+            self.post_detail = None
+            return
+        comments, cursor = archived_comment_page(document)
+        self.post_detail = {
+            **format_post_detail(
+                *archived_post(document, self._get_session_id()),
+                self._get_session_id(),
+                comments,
+            ),
+            "is_archived": True,
+        }
+        self._comment_cursor = cursor or ""
+        self.has_more_comments = cursor is not None
+
+    @rx.event
+    @instrumented
+    async def load_more_comments(self):
+        if not self.post_detail or not self._comment_cursor:
+            return
+        post_id = self.post_detail["id"]
+        async with get_async_db_session(
+            readonly=True, user_session_id=self._get_session_id()
+        ) as session:
+            if self.post_detail["is_archived"]:
+                document = await session.run_sync(load_archived_post, post_id)
+                comments, cursor = archived_comment_page(document, self._comment_cursor)
             else:
-                self.post_detail = None
+                comments, cursor = await session.run_sync(
+                    load_comment_page, post_id, self._comment_cursor
+                )
+        if not self.post_detail or self.post_detail["id"] != post_id:
+            return
+        self.post_detail["comments"].extend(format_comment(c) for c in comments)
+        self._comment_cursor = cursor or ""
+        self.has_more_comments = cursor is not None
 
     @rx.event
+    @instrumented
     def clear_post_detail(self):
         self.post_detail = None
+        self.has_more_comments = False
+        self._comment_cursor = ""
 
     @rx.event
-    def create_post(self):
-        if self.is_post_invalid:
+    @instrumented
+    async def create_post(self, content: str):
+        if not 0 < len(content) <= POST_MAX_LENGTH:
             return
-        with get_db_session() as session:
-            session_id = self._get_session_id()
+        session_id = self._get_session_id()
+        async with get_async_db_session(user_session_id=session_id) as session:
             new_post_model = models.Post(
-                content=self.new_post_content, owner_session_id=session_id
+                content=content,
+                owner_session_id=session_id,
+                geohash=self.geohash,
+            )
+            new_post_model.hot_score = hot_score(
+                new_post_model.votes, new_post_model.created_at
             )
             session.add(new_post_model)
-            session.flush()
+            await session.flush()
             new_vote = models.UserVote(
                 post_id=new_post_model.id, user_session_id=session_id, vote_value=1
             )
             session.add(new_vote)
-            session.commit()
+            session.add(
+                models.SearchDocument(
+                    post_id=new_post_model.id, content=new_post_model.content
+                )
+            )
+            await session.run_sync(add_points, {session_id: PEEK_POST_POINTS})
+            shared_post = format_shared_feed_post(new_post_model)
+            await session.commit()
+            self._user_votes[new_post_model.id] = 1
+        feed_cache.invalidate()
+        publish({"id": shared_post["id"], "post": shared_post, "owner": session_id})
+        new_post = personalize_feed_post(shared_post, session_id, 1, session_id)
+        self.posts.insert(0, new_post)
         self.show_create_dialog = False
-        self.new_post_content = ""
-        self.peek_score += 10
-        yield YakState.load_posts
-        return rx.toast(
-            title="Yak Posted!", description="+10 to your Peek Score!", duration=3000
-        )
+        self.peek_score += PEEK_POST_POINTS
+        return [
+            post_draft.push(""),
+            rx.toast(
+                title="Yak Posted!",
+                description=f"+{PEEK_POST_POINTS} to your Peek Score!",
+                duration=3000,
+            ),
+        ]
 
     @rx.event
-    async def add_comment(self, post_id: str):
-        if self.is_comment_invalid:
+    @instrumented
+    async def add_comment(self, content: str):
+        """Reply to the post open in the detail view."""
+        if not self.post_detail or not 0 < len(content) <= COMMENT_MAX_LENGTH:
             return
-        with get_db_session() as session:
-            session_id = self._get_session_id()
+        post_id = self.post_detail["id"]
+        session_id = self._get_session_id()
+        async with get_async_db_session(user_session_id=session_id) as session:
             new_comment_model = models.Comment(
                 post_id=post_id,
-                content=self.new_comment_content,
+                content=content,
                 owner_session_id=session_id,
             )
             session.add(new_comment_model)
-            session.commit()
-        self.new_comment_content = ""
-        yield YakState.get_post_by_id()
+            session.add(
+                models.SearchDocument(
+                    post_id=post_id, content=new_comment_model.content
+                )
+            )
+            comment_count = (
+                await session.exec(
+                    update(models.Post)
+                    .where(models.Post.id == post_id)
+                    .values(comment_count=models.Post.comment_count + 1)
+                    .returning(models.Post.comment_count)
+                )
+            ).scalar_one_or_none()
+            if comment_count is None:
+                await session.rollback()
+                return
+            new_comment = format_comment(new_comment_model)
+            await session.commit()
+        feed_cache.invalidate()
+        publish({"id": post_id, "comment_count": comment_count})
+        self._patch_post(post_id, comment_count=comment_count)
+        if self.post_detail and self.post_detail["id"] == post_id:
+            self.post_detail["comments"].insert(0, new_comment)
+        yield comment_draft.push("")
         yield rx.toast(
             title="Comment Added",
             description="Someone will see your reply.",
@@ -174,47 +520,95 @@ class YakState(rx.State):
         return
 
     @rx.event
-    def handle_vote(self, post_id: str, vote_value: int):
-        with get_db_session() as session:
-            session_id = self._get_session_id()
-            post_model = session.get(models.Post, post_id)
-            if not post_model:
-                return
-            existing_vote = session.exec(
-                select(models.UserVote).where(
-                    models.UserVote.post_id == post_id,
-                    models.UserVote.user_session_id == session_id,
-                )
-            ).first()
-            if existing_vote:
-                if existing_vote.vote_value == vote_value:
-                    post_model.votes -= vote_value
-                    self.peek_score += -vote_value
-                    session.delete(existing_vote)
-                else:
-                    post_model.votes -= existing_vote.vote_value
-                    post_model.votes += vote_value
-                    self.peek_score += 2 * vote_value
-                    existing_vote.vote_value = vote_value
-                    session.add(existing_vote)
+    @instrumented
+    def set_vote(self, post_id: str, vote_value: int):
+        """Record this tab's final vote on a post: 1, -1, or 0 for none.
+
+        The browser has already shown it. Nothing is written here; a writer
+        picks intents up after a short pause, so a burst of toggles on a post
+        is written once, with the last value.
+        """
+        if vote_value not in (1, 0, -1):
+            return
+        self._vote_intents[post_id] = vote_value
+        if time.time() - self._vote_writer_at > VOTE_WRITER_STALE_SECONDS:
+            self._vote_writer_at = time.time()
+            return YakState.write_votes
+
+    @rx.event(background=True)
+    @instrumented
+    async def write_votes(self):
+        """Write pending vote intents until none are left; one per tab."""
+        while True:
+            await asyncio.sleep(VOTE_COALESCE_SECONDS)
+            async with self:
+                intents, self._vote_intents = dict(self._vote_intents), {}
+                if not intents:
+                    self._vote_writer_at = 0.0
+                    return
+                self._vote_writer_at = time.time()
+                session_id = self._get_session_id()
+            results = await self._write_votes(session_id, intents)
+            async with self:
+                rollback = self._settle_votes(intents, results)
+                is_stale = time.time() - self._feed_loaded_at > FEED_RECONCILE_SECONDS
+            if rollback is not None:
+                yield rollback
+            if is_stale:
+                yield YakState.refresh_posts
+
+    async def _write_votes(
+        self, session_id: str, intents: dict[str, int]
+    ) -> dict[str, VoteResult]:
+        try:
+            if vote_buffer is not None:
+                results = await vote_buffer.set_votes(session_id, intents)
             else:
-                post_model.votes += vote_value
-                self.peek_score += vote_value
-                new_vote = models.UserVote(
-                    post_id=post_id, user_session_id=session_id, vote_value=vote_value
-                )
-                session.add(new_vote)
-            session.commit()
-        if self.post_detail and self.post_detail["id"] == post_id:
-            yield YakState.get_post_by_id()
-        yield YakState.load_posts
+                async with get_async_db_session(user_session_id=session_id) as session:
+                    results = await session.run_sync(set_votes, session_id, intents)
+                feed_cache.invalidate()
+        except Exception:
+            # Already logged by the session; the votes are rolled back below.
+            return {}
+        for post_id, result in results.items():
+            publish({"id": post_id, "votes": result.votes})
+        return results
+
+    def _settle_votes(
+        self, intents: dict[str, int], results: dict[str, VoteResult]
+    ) -> Optional[rx.event.EventSpec]:
+        """Show written votes with the server's counts; undo the rest.
+
+        Returns the script that drops the browser's overrides for votes that
+        were not written, leaving any the voter has clicked since.
+        """
+        for post_id, result in results.items():
+            self.peek_score += result.points
+            self._user_votes[post_id] = result.user_vote
+            self._patch_post(post_id, votes=result.votes, user_vote=result.user_vote)
+        failed = {
+            post_id: vote_value
+            for post_id, vote_value in intents.items()
+            if post_id not in results
+        }
+        if not failed:
+            return None
+        overrides = _client_state_ref(vote_overrides._getter_name)
+        return vote_overrides.push(
+            rx.Var(
+                f"Object.fromEntries(Object.entries({overrides}).filter("
+                f"([id, [, vote]]) => ({json.dumps(failed)})[id] !== vote))"
+            )
+        )
 
     @rx.event
+    @instrumented
     def set_sort_by(self, sort_type: str):
         self.sort_by = sort_type
         return YakState.load_posts
 
     @rx.event
+    @instrumented
     def report_post(self, post_id: str):
         return rx.toast(
             title="Post Reported",
@@ -223,22 +617,34 @@ class YakState(rx.State):
         )
 
     @rx.event
+    @instrumented
     async def delete_post(self, post_id: str):
-        with get_db_session() as session:
-            session_id = self._get_session_id()
-            post_to_delete = session.get(models.Post, post_id)
+        session_id = self._get_session_id()
+        async with get_async_db_session(user_session_id=session_id) as session:
+            post_to_delete = await session.get(models.Post, post_id)
             if post_to_delete and post_to_delete.owner_session_id == session_id:
-                session.exec(
+                await session.run_sync(remove_post_points, post_id, session_id)
+                await session.exec(
                     delete(models.Comment).where(models.Comment.post_id == post_id)
                 )
-                session.exec(
+                await session.exec(
                     delete(models.UserVote).where(models.UserVote.post_id == post_id)
                 )
-                session.delete(post_to_delete)
-                session.commit()
-                self.peek_score -= 10
+                await session.exec(
+                    delete(models.SearchDocument).where(
+                        models.SearchDocument.post_id == post_id
+                    )
+                )
+                await session.delete(post_to_delete)
+                await session.commit()
+                feed_cache.invalidate()
+                publish({"id": post_id, "deleted": True})
+                self.peek_score -= PEEK_POST_POINTS
                 is_detail_view = self.post_detail and self.post_detail["id"] == post_id
-                yield YakState.load_posts
+                self.posts = [post for post in self.posts if post["id"] != post_id]
+                self.search_results = [
+                    post for post in self.search_results if post["id"] != post_id
+                ]
                 if is_detail_view:
                     yield rx.redirect("/")
                 yield rx.toast(
@@ -0,0 +1,22 @@
+"""Point the app at the database a benchmark runs against."""
+
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import os
+import tempfile
+
+
+@contextmanager
+def app_database(db_url: Optional[str], name: str) -> Iterator[None]:
+    """Set ``REFLEX_DB_URL`` to ``db_url``, or to a new SQLite file ``name``.
+
+    The app creates its engines when it is first imported, so import it inside
+    the block. A new file lives in a temporary directory removed on exit.
+    """
+    if db_url:
+        os.environ["REFLEX_DB_URL"] = db_url
+        yield
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["REFLEX_DB_URL"] = f"sqlite:///{os.path.join(directory, name)}"
+        yield
@@ -0,0 +1,189 @@
+"""Time moving old posts to the archive while the feed is being read.
+
+Run with ``python -m benchmarks.archive [--posts 100000 --days 15]``;
+``--db-url`` reuses a database already filled by ``benchmarks.datagen``
+(whose posts span 30 days, so the default cutoff archives about half).
+Posts older than ``--days`` are archived in batches of ``--batch-size`` with
+``--pause-ms`` between them, the way ``archive_cold_posts`` runs, while a
+second thread keeps loading the first feed page. Reports each batch's
+transaction time, feed page latency with and without the archiver running,
+row counts before and after, and the time to open an archived post. Checks
+that stored Peek Scores still match a rebuild. ``--output FILE`` saves the
+JSON report.
+"""
+
+from benchmarks.app_db import app_database
+from benchmarks.stats import summarize
+import argparse
+import json
+import sys
+import threading
+import time
+
+
+def run(args) -> dict:
+    from sqlmodel import Session, func, select
+    from app.db import models
+    from app.db.archive import (
+        archive_batch,
+        archived_comment_page,
+        archived_post,
+        load_archived_post,
+    )
+    from app.db.database import engine
+    from app.db.feed import load_comment_page, load_feed_page, load_post
+    from app.db.migrations import migrate
+    from app.db.peek import PEEK_BASE_SCORE, rebuild_scores
+    from benchmarks.datagen import VIEWER_SESSION_ID, generate
+    import datetime
+
+    migrate(engine)
+    report = {"posts": args.posts}
+    if not args.db_url:
+        started = time.perf_counter()
+        report["rows"] = generate(engine, args.posts, args.seed)
+        report["generate_seconds"] = round(time.perf_counter() - started, 1)
+
+    tables = (models.Post, models.Comment, models.UserVote, models.ArchivedPost)
+
+    def count_rows() -> dict[str, int]:
+        with Session(engine) as session:
+            return {
+                model.__tablename__: session.exec(
+                    select(func.count()).select_from(model)
+                ).one()
+                for model in tables
+            }
+
+    def read_feed(samples: list[float], stop: threading.Event) -> None:
+        with Session(engine) as session:
+            while not stop.is_set():
+                started = time.perf_counter()
+                load_feed_page(session, "new")
+                samples.append(time.perf_counter() - started)
+                session.rollback()
+                time.sleep(0.005)
+
+    def with_reader(work) -> list[float]:
+        samples, stop = [], threading.Event()
+        reader = threading.Thread(target=read_feed, args=(samples, stop))
+        reader.start()
+        try:
+            work()
+        finally:
+            stop.set()
+            reader.join()
+        return samples
+
+    report["before"] = count_rows()
+    report["feed_idle"] = summarize(with_reader(lambda: time.sleep(args.idle)))
+
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=args.days)
+    batches, moved = [], []
+
+    def archive() -> None:
+        while True:
+            started = time.perf_counter()
+            with Session(engine) as session:
+                count = archive_batch(session, cutoff, args.batch_size)
+                session.commit()
+            if not count:
+                break
+            batches.append(time.perf_counter() - started)
+            moved.append(count)
+            time.sleep(args.pause_ms / 1000)
+
+    started = time.perf_counter()
+    report["feed_archiving"] = summarize(with_reader(archive))
+    seconds = time.perf_counter() - started
+    report["archived"] = sum(moved)
+    report["batches"] = summarize(batches) if batches else {}
+    report["posts_per_second"] = round(sum(moved) / seconds) if moved else 0
+    report["after"] = count_rows()
+
+    with Session(engine) as session:
+        archived_ids = session.exec(
+            select(models.ArchivedPost.id)
+            .order_by(models.ArchivedPost.created_at.desc())
+            .limit(args.repeat)
+        ).all()
+        live_ids = session.exec(
+            select(models.Post.id).order_by(models.Post.created_at).limit(args.repeat)
+        ).all()
+        opened = {"live": [], "archived": []}
+        for post_id in live_ids:
+            started = time.perf_counter()
+            load_post(session, VIEWER_SESSION_ID, post_id)
+            load_comment_page(session, post_id)
+            opened["live"].append(time.perf_counter() - started)
+        for post_id in archived_ids:
+            started = time.perf_counter()
+            document = load_archived_post(session, post_id)
+            archived_post(document, VIEWER_SESSION_ID)
+            archived_comment_page(document)
+            opened["archived"].append(time.perf_counter() - started)
+        report["open_post"] = {
+            name: summarize(samples) for name, samples in opened.items() if samples
+        }
+        report["archive_bytes"] = session.exec(
+            select(func.sum(func.length(models.ArchivedPost.document)))
+        ).one()
+        score_query = select(models.PeekScore.session_id, models.PeekScore.score)
+        stored = dict(session.exec(score_query).all())
+        rebuild_scores(session)
+        rebuilt = dict(session.exec(score_query).all())
+        session.rollback()
+        # A session without a row reads as the base score.
+        report["score_mismatches"] = sum(
+            stored.get(session_id, PEEK_BASE_SCORE)
+            != rebuilt.get(session_id, PEEK_BASE_SCORE)
+            for session_id in stored.keys() | rebuilt.keys()
+        )
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=15)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--pause-ms", type=int, default=200)
+    parser.add_argument("--idle", type=float, default=5.0)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db-url", help="use a database already filled by datagen")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    with app_database(args.db_url, "archive.db"):
+        report = run(args)
+    print(f"{'table':<16}{'before':>10}{'after':>10}")
+    for table, before in report["before"].items():
+        print(f"{table:<16}{before:>10}{report['after'][table]:>10}")
+    batches = report["batches"]
+    if batches:
+        print(
+            f"archived {report['archived']} posts in {batches['n']} batches, "
+            f"{report['posts_per_second']} posts/s; batch p50 "
+            f"{batches['p50_ms']} ms, p95 {batches['p95_ms']} ms, "
+            f"max {batches['max_ms']} ms"
+        )
+        print(f"archive: {report['archive_bytes'] / report['archived']:.0f} B/post")
+    for name in ("feed_idle", "feed_archiving"):
+        stats = report[name]
+        print(
+            f"{name:<16}p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, "
+            f"max {stats['max_ms']} ms"
+        )
+    for name, stats in report["open_post"].items():
+        print(f"open {name:<11}p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if report["score_mismatches"]:
+        print(f"MISMATCH {report['score_mismatches']} stored scores differ")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
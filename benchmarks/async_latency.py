@@ -0,0 +1,99 @@
+"""Compare event latency under concurrent sessions for sync vs async DB access.
+
+Run with ``python -m benchmarks.async_latency [--sessions N] [--events M]``.
+Each simulated session runs a mix of feed loads and trivial "ping" events on
+one event loop, like a Reflex worker. In sync mode the feed query blocks the
+loop, so pings queue behind other sessions' queries; in async mode the query
+runs on the async engine and the loop stays free.
+"""
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import models
+from app.db.database import async_db_url
+from app.db.feed import load_feed_page
+from benchmarks.stats import percentiles
+import argparse
+import asyncio
+import datetime
+import random
+import tempfile
+import time
+
+
+def seed(engine, n_posts: int) -> None:
+    now = datetime.datetime.utcnow()
+    with Session(engine) as session:
+        session.add_all(
+            models.Post(
+                content=f"post {i}",
+                owner_session_id="owner",
+                created_at=now - datetime.timedelta(seconds=i),
+            )
+            for i in range(n_posts)
+        )
+        session.commit()
+
+
+async def run_mode(mode: str, sync_engine, async_engine, args) -> dict:
+    latencies: dict[str, list[float]] = {"feed": [], "ping": []}
+
+    async def feed_event():
+        if mode == "sync":
+            with Session(sync_engine) as session:
+                load_feed_page(session, "new")
+        else:
+            async with AsyncSession(async_engine) as session:
+                await session.run_sync(load_feed_page, "new")
+
+    async def session_loop(seed_value: int):
+        rng = random.Random(seed_value)
+        for _ in range(args.events):
+            kind = "feed" if rng.random() < args.feed_ratio else "ping"
+            start = time.perf_counter()
+            # Yield first, as a handler only starts once the loop picks up its
+            # websocket message; the wait for that is part of event latency.
+            await asyncio.sleep(0)
+            if kind == "feed":
+                await feed_event()
+            latencies[kind].append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session_loop(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    return {
+        "events_per_second": args.sessions * args.events / elapsed,
+        **{
+            kind: percentiles([latency * 1000 for latency in samples])
+            for kind, samples in latencies.items()
+        },
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--feed-ratio", type=float, default=0.5)
+    args = parser.parse_args()
+
+    db_url = f"sqlite:///{tempfile.mkdtemp()}/async_latency.db"
+    sync_engine = create_engine(db_url, pool_size=args.sessions)
+    async_engine = create_async_engine(async_db_url(db_url), pool_size=args.sessions)
+    SQLModel.metadata.create_all(sync_engine)
+    seed(sync_engine, args.posts)
+
+    print(f"{args.sessions} sessions x {args.events} events, {args.posts} posts")
+    for mode in ("sync", "async"):
+        result = await run_mode(mode, sync_engine, async_engine, args)
+        print(f"{mode:>5}: {result['events_per_second']:.0f} events/s")
+        for kind in ("feed", "ping"):
+            cuts = "  ".join(f"{k}={v:8.2f}ms" for k, v in result[kind].items())
+            print(f"       {kind:<4} {cuts}")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
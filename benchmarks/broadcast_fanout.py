@@ -0,0 +1,137 @@
+"""Measure coalescing and delivery lag of the broadcaster across two workers.
+
+Run with ``python -m benchmarks.broadcast_fanout [--subscribers 500]``. Two
+``Broadcaster`` instances share one ``LocalBackend``, standing in for two
+backend workers behind a broker. Both publish a burst of vote changes on a
+handful of hot posts plus some new and deleted posts while every subscriber
+drains its ``Subscription`` like ``YakState.listen_for_changes`` does.
+
+Prints the published-to-delivered coalescing ratio, deliveries per
+subscriber and delivery lag. tests/test_broadcast.py checks what the
+subscribers end up seeing.
+"""
+
+from app.broadcast import Broadcaster, LocalBackend, apply_counts
+from benchmarks.stats import percentiles
+import argparse
+import asyncio
+import random
+import time
+
+INTERVAL_MS = 100
+CLIENT_INTERVAL_MS = 250
+
+
+async def run(args) -> None:
+    rng = random.Random(args.seed)
+    backend = LocalBackend()
+    workers = [
+        Broadcaster(backend, INTERVAL_MS, CLIENT_INTERVAL_MS, args.max_changes)
+        for _ in range(2)
+    ]
+    # Each post is only changed through one worker, as its author's and
+    # voters' sessions would be, so its final state is well defined; across
+    # workers there is no ordering to rely on.
+    hot_ids = [f"hot-{i}" for i in range(args.posts)]
+    truth = {post_id: 0 for post_id in hot_ids}
+    created, deleted = [], []
+    views = [dict() for _ in range(args.subscribers)]
+    reads: list[list[float]] = [[] for _ in range(args.subscribers)]
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def subscriber(index: int) -> None:
+        worker = workers[index % 2]
+        subscription = worker.subscribe(f"tab-{index}")
+        view = views[index]
+        try:
+            while not done.is_set() or subscription._pending:
+                changes = await subscription.next(0.05)
+                if not changes:
+                    continue
+                now = time.monotonic()
+                reads[index].append(now)
+                for change in changes:
+                    lags.append(now - change["sent"])
+                    if change.get("deleted"):
+                        view.pop(change["id"], None)
+                    elif "post" in change:
+                        view[change["id"]] = apply_counts(dict(change["post"]), change)
+                    elif change["id"] in view:
+                        apply_counts(view[change["id"]], change)
+        finally:
+            subscription.close()
+
+    for index in range(args.subscribers):
+        views[index].update(
+            {post_id: {"votes": 0, "comment_count": 0} for post_id in hot_ids}
+        )
+    tasks = [asyncio.create_task(subscriber(i)) for i in range(args.subscribers)]
+    await asyncio.sleep(0)
+    published = 0
+    started = time.monotonic()
+    deadline = started + args.seconds
+    while time.monotonic() < deadline:
+        for _ in range(args.burst):
+            post_id = rng.choice(hot_ids)
+            truth[post_id] += rng.choice([1, 1, 1, -1])
+            workers[hot_ids.index(post_id) % 2].publish(
+                {"id": post_id, "votes": truth[post_id], "sent": time.monotonic()}
+            )
+            published += 1
+        if rng.random() < 0.2:
+            post_id = f"new-{len(created)}"
+            created.append(post_id)
+            workers[len(created) % 2].publish(
+                {
+                    "id": post_id,
+                    "post": {"id": post_id, "votes": 1, "comment_count": 0},
+                    "owner": "author",
+                    "sent": time.monotonic(),
+                }
+            )
+            published += 1
+            if len(created) % 5 == 0:
+                deleted.append(created[-2])
+                workers[(len(created) - 1) % 2].publish(
+                    {"id": created[-2], "deleted": True, "sent": time.monotonic()}
+                )
+                published += 1
+        await asyncio.sleep(args.tick_ms / 1000)
+    # Let the last batches go out and every subscriber drain them.
+    await asyncio.sleep(2 * (INTERVAL_MS + CLIENT_INTERVAL_MS) / 1000)
+    done.set()
+    await asyncio.gather(*tasks)
+
+    dropped = sum(worker.dropped for worker in workers)
+    deliveries = sum(len(r) for r in reads)
+    batches = sum(worker.batches for worker in workers)
+    sent = sum(worker.changes for worker in workers)
+    lag = percentiles([seconds * 1000 for seconds in lags])
+    print(
+        f"{args.subscribers} subscribers, 2 workers, {args.seconds:.0f} s: "
+        f"{published} changes published -> {sent} sent in {batches} batches "
+        f"({published / max(sent, 1):.1f}x coalesced)"
+    )
+    print(
+        f"per subscriber: {deliveries / args.subscribers:.1f} deliveries "
+        f"({deliveries / args.subscribers / args.seconds:.1f}/s), "
+        f"lag p50 {lag['p50']:.0f} ms, p99 {lag['p99']:.0f} ms, "
+        f"dropped {dropped}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--tick-ms", type=float, default=10)
+    parser.add_argument("--max-changes", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
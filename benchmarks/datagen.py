@@ -0,0 +1,213 @@
+"""Seeded synthetic data for benchmarks.
+
+Run with ``REFLEX_DB_URL=... python -m benchmarks.datagen --posts N`` to fill
+a database, or call ``generate`` from a benchmark. Posts are spread over the
+last ``days`` days; votes and comments follow a Zipf law over a random
+popularity rank, so a few posts are viral and the long tail has almost
+nothing. Posts are filed in a ``REGION_SIZE`` square of geohash cells around
+the default location, busiest in the middle. Post and comment text is drawn
+from a synthetic vocabulary whose word frequencies are Zipf too, so search
+terms range from near-universal to rare, and every text gets its search
+document. Peek Scores are rebuilt from the generated rows at the end. The
+same seed always produces the same rows.
+"""
+
+from sqlalchemy import insert
+from sqlmodel import Session
+from app.db import models
+from app.db.geo import DEFAULT_GEOHASH, bounds, encode
+from app.db.peek import rebuild_scores
+from app.db.ranking import hot_score
+import argparse
+import datetime
+import itertools
+import random
+import uuid
+
+BATCH_SIZE = 10000
+VIEWER_SESSION_ID = "bench-viewer"
+VOCABULARY_SIZE = 20000
+SYLLABLES = [c + v for c in "bdfgklmnprstvz" for v in "aeiou"]
+REGION_SIZE = 15
+
+
+def zipf_counts(
+    rng: random.Random, n: int, mean: float, s: float, cap: int
+) -> list[int]:
+    """Draw per-item counts averaging about ``mean`` with a Zipf(``s``) shape.
+
+    Each item gets a random popularity rank; its expected count is proportional
+    to ``rank ** -s``, rounded stochastically and capped at ``cap``.
+    """
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    scale = mean * n / sum(rank**-s for rank in range(1, n + 1))
+    counts = []
+    for rank in ranks:
+        expected = scale * rank**-s
+        whole = int(expected)
+        counts.append(min(cap, whole + (rng.random() < expected - whole)))
+    return counts
+
+
+def vocabulary(seed: int = 0, size: int = VOCABULARY_SIZE) -> list[str]:
+    """Distinct made-up words, most frequent first."""
+    rng = random.Random(seed)
+    words: dict[str, None] = {}
+    while len(words) < size:
+        words["".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))] = None
+    return list(words)
+
+
+def region_cells(size: int = REGION_SIZE) -> list[str]:
+    """A ``size`` x ``size`` block of cells around the default one, nearest first."""
+    south, north, west, east = bounds(DEFAULT_GEOHASH)
+    latitude, longitude = (south + north) / 2, (west + east) / 2
+    offsets = range(-(size // 2), size - size // 2)
+    steps = sorted(
+        ((row, column) for row in offsets for column in offsets),
+        key=lambda step: step[0] ** 2 + step[1] ** 2,
+    )
+    return [
+        encode(
+            latitude + row * (north - south),
+            longitude + column * (east - west),
+            len(DEFAULT_GEOHASH),
+        )
+        for row, column in steps
+    ]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generate(
+    engine,
+    n_posts: int,
+    seed: int = 0,
+    s: float = 1.1,
+    days: int = 30,
+    mean_votes: float = 3,
+    mean_comments: float = 2,
+    max_votes: int = 5000,
+    max_comments: int = 2000,
+) -> dict[str, int]:
+    """Insert ``n_posts`` posts with their votes and comments; return row counts.
+
+    Every post keeps its owner's upvote, as ``create_post`` does, and the
+    ``VIEWER_SESSION_ID`` session has voted on about one post in ten, so feed
+    loads for that viewer exercise the vote lookup.
+    """
+    rng = random.Random(seed)
+    now = datetime.datetime.utcnow()
+    words = vocabulary(seed)
+    cum_weights = list(
+        itertools.accumulate(rank**-s for rank in range(1, len(words) + 1))
+    )
+    cells = region_cells()
+    cell_weights = list(
+        itertools.accumulate(rank**-s for rank in range(1, len(cells) + 1))
+    )
+
+    def text(low: int, high: int) -> str:
+        return " ".join(
+            rng.choices(words, cum_weights=cum_weights, k=rng.randint(low, high))
+        )
+
+    votes = zipf_counts(rng, n_posts, mean_votes, s, max_votes)
+    comments = zipf_counts(rng, n_posts, mean_comments, s, max_comments)
+    counts = {"posts": 0, "votes": 0, "comments": 0, "search_documents": 0}
+    with engine.begin() as connection:
+        for start in range(0, n_posts, BATCH_SIZE):
+            post_rows, vote_rows, comment_rows, document_rows = [], [], [], []
+            for i in range(start, min(start + BATCH_SIZE, n_posts)):
+                post_id = _uuid(rng)
+                owner = f"owner-{rng.randrange(max(n_posts // 10, 1))}"
+                created_at = now - datetime.timedelta(
+                    seconds=rng.uniform(0, days * 86400)
+                )
+                voters = [(owner, 1)] + [
+                    (f"voter-{j}", 1 if rng.random() < 0.8 else -1)
+                    for j in range(votes[i])
+                ]
+                if rng.random() < 0.1:
+                    voters.append((VIEWER_SESSION_ID, 1))
+                total = sum(value for _, value in voters)
+                post_rows.append(
+                    {
+                        "id": post_id,
+                        "content": text(3, 25),
+                        "votes": total,
+                        "hot_score": hot_score(total, created_at),
+                        "comment_count": comments[i],
+                        "created_at": created_at,
+                        "owner_session_id": owner,
+                        "geohash": rng.choices(cells, cum_weights=cell_weights)[0],
+                    }
+                )
+                vote_rows.extend(
+                    {
+                        "id": _uuid(rng),
+                        "post_id": post_id,
+                        "user_session_id": voter,
+                        "vote_value": value,
+                    }
+                    for voter, value in voters
+                )
+                comment_rows.extend(
+                    {
+                        "id": _uuid(rng),
+                        "content": text(2, 15),
+                        "created_at": created_at
+                        + datetime.timedelta(seconds=rng.uniform(0, 3600 * (j + 1))),
+                        "post_id": post_id,
+                        "owner_session_id": f"commenter-{rng.randrange(1000)}",
+                    }
+                    for j in range(comments[i])
+                )
+            document_rows.extend(
+                {"post_id": row["id"], "content": row["content"]} for row in post_rows
+            )
+            document_rows.extend(
+                {"post_id": row["post_id"], "content": row["content"]}
+                for row in comment_rows
+            )
+            connection.execute(insert(models.Post.__table__), post_rows)
+            for rows_start in range(0, len(vote_rows), BATCH_SIZE):
+                connection.execute(
+                    insert(models.UserVote.__table__),
+                    vote_rows[rows_start : rows_start + BATCH_SIZE],
+                )
+            for rows_start in range(0, len(comment_rows), BATCH_SIZE):
+                connection.execute(
+                    insert(models.Comment.__table__),
+                    comment_rows[rows_start : rows_start + BATCH_SIZE],
+                )
+            counts["posts"] += len(post_rows)
+            counts["votes"] += len(vote_rows)
+            for rows_start in range(0, len(document_rows), BATCH_SIZE):
+                connection.execute(
+                    insert(models.SearchDocument.__table__),
+                    document_rows[rows_start : rows_start + BATCH_SIZE],
+                )
+            counts["comments"] += len(comment_rows)
+            counts["search_documents"] += len(document_rows)
+        counts["peek_scores"] = rebuild_scores(Session(bind=connection))
+    return counts
+
+
+def main() -> None:
+    from app.db.database import engine
+    from app.db.migrations import migrate
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    migrate(engine)
+    print(generate(engine, args.posts, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare the serialized size of the feed state with and without comments.
+
+Run with ``python -m benchmarks.feed_payload [--posts N] [--comments M]``.
+"Legacy" is the pre-pagination payload: every post with every comment. The
+other rows serialize one feed page either with embedded comments or as the
+slim items the feed ships today.
+"""
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, SQLModel, create_engine, select
+from reflex.utils.format import json_dumps
+from app.db import models
+from app.db.feed import format_feed_post, format_post_detail, load_feed_page
+import argparse
+import random
+
+SESSION_ID = "viewer"
+
+
+def seed(engine, n_posts: int, comments_per_post: int) -> None:
+    rng = random.Random(0)
+    with Session(engine) as session:
+        for i in range(n_posts):
+            post = models.Post(
+                content="x" * rng.randint(20, 200),
+                owner_session_id=f"owner-{i}",
+                comment_count=comments_per_post,
+            )
+            session.add(post)
+            session.flush()
+            session.add_all(
+                models.Comment(
+                    post_id=post.id,
+                    content="y" * rng.randint(10, 150),
+                    owner_session_id="x",
+                )
+                for _ in range(comments_per_post)
+            )
+        session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--comments", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    seed(engine, args.posts, args.comments)
+    with Session(engine) as session:
+        every_post = session.exec(
+            select(models.Post).options(selectinload(models.Post.comments))
+        ).all()
+        legacy = [format_post_detail(p, 0, SESSION_ID, p.comments) for p in every_post]
+        posts, _ = load_feed_page(session, "hot")
+        page_ids = {post.id for post in posts}
+        page_with_comments = [p for p in legacy if p["id"] in page_ids]
+        slim_page = [format_feed_post(p, 0, SESSION_ID) for p in posts]
+
+    results = {
+        "legacy (all posts, comments)": legacy,
+        "one page, comments": page_with_comments,
+        "one page, slim": slim_page,
+    }
+    print(f"{args.posts} posts x {args.comments} comments")
+    for label, payload in results.items():
+        print(f"{label:>30}: {len(json_dumps(payload).encode()):>12,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Time location-scoped feed pages against the global feed.
+
+Run with ``python -m benchmarks.geo_feed [--posts 1000000]``; ``--db-url``
+reuses a database already filled by ``benchmarks.datagen``. Pages are
+loaded through ``load_feed_page`` for the whole table, for the default
+viewer's neighborhood (the busiest cells) and for a corner of the region
+(the quietest), following the cursor ``--pages`` deep. For comparison the
+first page is also read with a single ``geohash IN (...)`` query, which has
+to sort every post in the neighborhood. ``--output FILE`` saves the JSON
+report.
+"""
+
+from benchmarks.app_db import app_database
+from benchmarks.stats import summarize
+import argparse
+import json
+import sys
+import time
+
+
+def run(args) -> dict:
+    from sqlmodel import Session, func, select
+    from app.db import models
+    from app.db.database import engine
+    from app.db.feed import FEED_PAGE_SIZE, _sort_columns, load_feed_page
+    from app.db.geo import DEFAULT_GEOHASH, neighbors
+    from app.db.migrations import migrate
+    from benchmarks.datagen import generate, region_cells
+
+    migrate(engine)
+    report = {"posts": args.posts}
+    if not args.db_url:
+        started = time.perf_counter()
+        report["rows"] = generate(engine, args.posts, args.seed)
+        report["generate_seconds"] = round(time.perf_counter() - started, 1)
+    feeds = {
+        "global": None,
+        "nearby": neighbors(DEFAULT_GEOHASH),
+        "edge": neighbors(region_cells()[-1]),
+    }
+    report["feeds"] = {}
+    with Session(engine) as session:
+        for name, cells in feeds.items():
+            query = select(func.count()).select_from(models.Post)
+            if cells:
+                query = query.where(models.Post.geohash.in_(cells))
+            report["feeds"][name] = {"posts": session.exec(query).one()}
+        for name, cells in feeds.items():
+            for sort_by in ("hot", "new"):
+                first, deep = [], []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    _, cursor = load_feed_page(session, sort_by, cells=cells)
+                    first.append(time.perf_counter() - started)
+                    started = time.perf_counter()
+                    for _ in range(args.pages - 1):
+                        if cursor:
+                            _, cursor = load_feed_page(
+                                session, sort_by, cursor, cells=cells
+                            )
+                    deep.append((time.perf_counter() - started) / (args.pages - 1))
+                report["feeds"][name][sort_by] = {
+                    "page_1": summarize(first),
+                    "later_pages": summarize(deep),
+                }
+        for sort_by in ("hot", "new"):
+            sort_column, id_column = _sort_columns(sort_by)
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                session.exec(
+                    select(models.Post)
+                    .where(models.Post.geohash.in_(feeds["nearby"]))
+                    .order_by(sort_column.desc(), id_column.desc())
+                    .limit(FEED_PAGE_SIZE + 1)
+                ).all()
+                samples.append(time.perf_counter() - started)
+            report["feeds"]["nearby"][f"{sort_by}_in_list"] = summarize(samples)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db-url", help="use a database already filled by datagen")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    with app_database(args.db_url, "geo_feed.db"):
+        report = run(args)
+    print(f"{report['posts']} posts")
+    print(
+        f"{'feed':<8}{'posts':>9}{'sort':>6}{'page 1 p50':>12}{'p95':>8}"
+        f"{'later p50':>11}{'IN p50':>9}"
+    )
+    for name, stats in report["feeds"].items():
+        for sort_by in ("hot", "new"):
+            in_list = stats.get(f"{sort_by}_in_list", {}).get("p50_ms", "")
+            print(
+                f"{name:<8}{stats['posts']:>9}{sort_by:>6}"
+                f"{stats[sort_by]['page_1']['p50_ms']:>12.2f}"
+                f"{stats[sort_by]['page_1']['p95_ms']:>8.2f}"
+                f"{stats[sort_by]['later_pages']['p50_ms']:>11.2f}{in_list:>9}"
+            )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""Time the YakState event handlers against fresh SQLite databases.
+
+Run with ``python -m benchmarks.handlers [--sizes 1000,10000,100000]``. Each
+size runs in its own process on a new database filled by
+``benchmarks.datagen``, calling handlers directly on a state instance with no
+browser or websocket. Prints a scaling table of p50 latencies per handler and
+size; ``--output FILE`` saves the full JSON report and ``--baseline FILE``
+compares against a saved one, exiting non-zero when any handler's p50 got
+slower by more than ``--threshold``.
+"""
+
+from benchmarks.stats import summarize
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = "1000,10000,100000"
+NOISE_FLOOR_MS = 0.5
+
+
+def run_worker(n_posts: int, repeat: int, seed: int) -> dict:
+    # Imported here so the app binds its engines to the REFLEX_DB_URL the
+    # parent process chose for this size.
+    from reflex.istate.data import RouterData
+    from sqlmodel import Session, func, select
+    from app.db import models
+    from app.db.database import engine
+    from app.db.feed_cache import feed_cache
+    from app.db.migrations import migrate
+    from app.states.yak_state import YakState
+    from benchmarks.datagen import VIEWER_SESSION_ID, generate
+    import asyncio
+    import inspect
+    import random
+    import reflex as rx
+
+    loop = asyncio.new_event_loop()
+    rng = random.Random(seed)
+
+    def make_state(session_id: str, post_id: str = "") -> YakState:
+        root = rx.State(_reflex_internal_init=True)
+        state = root.get_substate(YakState.get_full_name().split(".")[1:])
+        state.router = RouterData.from_router_data(
+            {
+                "sid": session_id,
+                "token": session_id,
+                "pathname": f"/post/{post_id}" if post_id else "/",
+                "query": {"post_id": post_id} if post_id else {},
+                "headers": {},
+            }
+        )
+        return state
+
+    def call(state: YakState, name: str, *args) -> float:
+        started = time.perf_counter()
+        result = getattr(YakState, name).fn(state, *args)
+        if inspect.isasyncgen(result):
+
+            async def drain():
+                async for _ in result:
+                    pass
+
+            loop.run_until_complete(drain())
+        elif inspect.iscoroutine(result):
+            loop.run_until_complete(result)
+        return time.perf_counter() - started
+
+    migrate(engine)
+    rows = generate(engine, n_posts, seed)
+    with Session(engine) as session:
+        post_ids = list(
+            session.exec(
+                select(models.Post.id).order_by(func.random()).limit(repeat)
+            ).all()
+        )
+        viral_id = session.exec(
+            select(models.Post.id).order_by(models.Post.comment_count.desc())
+        ).first()
+
+    timings: dict[str, list[float]] = {}
+
+    def record(name: str, seconds: float) -> None:
+        timings.setdefault(name, []).append(seconds)
+
+    for sort_by in ("hot", "new"):
+        for _ in range(repeat):
+            state = make_state(VIEWER_SESSION_ID)
+            state.sort_by = sort_by
+            feed_cache.invalidate()
+            record(f"load_posts[{sort_by}]", call(state, "load_posts"))
+            state = make_state(VIEWER_SESSION_ID)
+            state.sort_by = sort_by
+            record(f"load_posts[{sort_by},cached]", call(state, "load_posts"))
+    for _ in range(repeat):
+        record(
+            "get_post_by_id[viral]",
+            call(make_state(VIEWER_SESSION_ID, viral_id), "get_post_by_id"),
+        )
+    for post_id in post_ids:
+        record(
+            "get_post_by_id[random]",
+            call(make_state(VIEWER_SESSION_ID, post_id), "get_post_by_id"),
+        )
+    for post_id in post_ids:
+        state = make_state(f"bench-voter-{rng.randrange(100)}")
+        intents = {post_id: rng.choice([1, -1])}
+        record("set_vote", call(state, "set_vote", post_id, intents[post_id]))
+        # What write_votes does after its pause, without the background task.
+        started = time.perf_counter()
+        results = loop.run_until_complete(
+            state._write_votes(state._get_session_id(), intents)
+        )
+        state._settle_votes(intents, results)
+        record("write_votes", time.perf_counter() - started)
+    author = make_state("bench-author")
+    for i in range(repeat):
+        record("create_post", call(author, "create_post", f"benchmark post {i}"))
+    for post_id in post_ids:
+        state = make_state("bench-commenter", post_id)
+        call(state, "get_post_by_id")
+        record("add_comment", call(state, "add_comment", "benchmark comment"))
+    for post in list(author.posts[:repeat]):
+        record("delete_post", call(author, "delete_post", post["id"]))
+    loop.close()
+    return {
+        "rows": rows,
+        "handlers": {name: summarize(samples) for name, samples in timings.items()},
+    }
+
+
+def run_size(n_posts: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "REFLEX_DB_URL": f"sqlite:///{os.path.join(directory, 'bench.db')}",
+            "VOTE_BUFFER_ENABLED": "",
+            "DB_REPLICA_URLS": "",
+        }
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.handlers",
+                "--worker",
+                "--posts",
+                str(n_posts),
+                "--repeat",
+                str(args.repeat),
+                "--seed",
+                str(args.seed),
+            ],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if completed.returncode:
+        sys.stderr.write(completed.stderr)
+        raise SystemExit(f"benchmark worker for {n_posts} posts failed")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_table(report: dict) -> None:
+    sizes = list(report["sizes"])
+    names = list(next(iter(report["sizes"].values()))["handlers"])
+    print("p50 ms".ljust(28) + "".join(f"{size:>12}" for size in sizes))
+    for name in names:
+        cells = "".join(
+            f"{report['sizes'][size]['handlers'][name]['p50_ms']:>12.2f}"
+            for size in sizes
+        )
+        print(name.ljust(28) + cells)
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for size, result in report["sizes"].items():
+        base_result = baseline["sizes"].get(size)
+        if base_result is None:
+            continue
+        for name, stats in result["handlers"].items():
+            base_stats = base_result["handlers"].get(name)
+            if base_stats is None:
+                continue
+            before, after = base_stats["p50_ms"], stats["p50_ms"]
+            change = (after - before) / before if before else 0.0
+            marker = ""
+            if change > threshold and after - before > NOISE_FLOOR_MS:
+                marker = "  REGRESSION"
+                regressions.append(f"{name} @ {size}")
+            print(
+                f"{name:<28}{size:>9}  {before:9.2f} -> {after:9.2f} ms "
+                f"({change:+.0%}){marker}"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--worker", action="store_true")
+    parser.add_argument("--posts", type=int)
+    args = parser.parse_args()
+    if args.worker:
+        print(json.dumps(run_worker(args.posts, args.repeat, args.seed)))
+        return 0
+
+    report = {
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+    for size in args.sizes.split(","):
+        report["sizes"][size] = run_size(int(size), args)
+    print_table(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        if regressions:
+            print(f"FAIL: slower than baseline: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""Drive many concurrent simulated sessions through the Reflex event pipeline.
+
+Run with ``python -m benchmarks.load_harness [--sessions 200] [--actions 20]``.
+Every session is an asyncio task on one event loop, like a single backend
+worker, and sends the events a browser would through ``reflex.app.process``
+against the real ``app.app``: hydrate and on_load on page loads, navigation,
+sort switches, infinite scroll, votes, comments and posts, plus every
+follow-up event the handlers return. State manager round trips, delta
+computation and update serialization are all measured; only the websocket
+transport is skipped, so the run needs no browser or network.
+
+With ``--live`` every session also registers its token the way the websocket
+connect handler does, so its ``listen_for_changes`` task stays subscribed and
+applies broadcast changes for the whole run; the pushed updates are emitted to
+sockets that do not exist.
+
+Reports throughput, p50/p95/p99 latency per user action and the size of the
+serialized state update for every event. ``--output FILE`` saves the report.
+"""
+
+from benchmarks.app_db import app_database
+from benchmarks.stats import percentiles
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+ACTION_WEIGHTS = {
+    "page_load": 5,
+    "open_post": 10,
+    "back_to_feed": 10,
+    "sort": 5,
+    "load_more": 10,
+    "vote": 40,
+    "comment": 10,
+    "post": 5,
+    "delete": 2,
+}
+HOT_POSTS = 200
+
+
+async def run(args) -> dict:
+    from reflex.app import process
+    from reflex.constants import CompileVars
+    from reflex.event import Event, get_hydrate_event
+    from reflex.state import State
+    from sqlmodel import Session, select
+    from app.app import app
+    from app.broadcast import broadcaster
+    from app.db import models
+    from app.db.database import engine
+    from app.db.migrations import migrate
+    from app.states.yak_state import YakState
+    from benchmarks.datagen import generate
+    import asyncio
+
+    migrate(engine)
+    if args.posts:
+        generate(engine, args.posts, args.seed)
+    with Session(engine) as session:
+        hot_ids = list(
+            session.exec(
+                select(models.Post.id)
+                .order_by(models.Post.hot_score.desc())
+                .limit(HOT_POSTS)
+            ).all()
+        )
+    # Readers pick the top of the feed far more often than the tail.
+    hot_weights = [1 / rank for rank in range(1, len(hot_ids) + 1)]
+    yak = YakState.get_full_name()
+    hydrate = get_hydrate_event(State)
+    on_load = f"{State.get_name()}.{CompileVars.ON_LOAD_INTERNAL}"
+    latencies: dict[str, list[float]] = {}
+    event_bytes: dict[str, list[int]] = {}
+    errors: dict[str, int] = {}
+
+    def page(post_id: str = "") -> dict:
+        if post_id:
+            return {
+                "pathname": "/post/[post_id]",
+                "query": {"post_id": post_id},
+                "asPath": f"/post/{post_id}",
+            }
+        return {"pathname": "/", "query": {}, "asPath": "/"}
+
+    async def session_loop(index: int) -> None:
+        rng = random.Random(args.seed * 100003 + index)
+        token = str(uuid.uuid4())
+        sid = f"sid-{index}"
+        router_data = page()
+        own_posts: list[str] = []
+        if args.live:
+            app.event_namespace.token_to_sid[token] = sid
+
+        async def send(name: str, **payload) -> None:
+            queue = [(name, payload)]
+            while queue:
+                name, payload = queue.pop(0)
+                event = Event(
+                    token=token,
+                    name=name,
+                    router_data=dict(router_data),
+                    payload=payload,
+                )
+                async for update in process(app, event, sid, {}, "127.0.0.1"):
+                    short_name = name.rpartition(".")[2]
+                    event_bytes.setdefault(short_name, []).append(
+                        len(update.json().encode())
+                    )
+                    queue.extend(
+                        (follow_up.name, follow_up.payload)
+                        for follow_up in update.events
+                        if not follow_up.name.startswith("_")
+                    )
+
+        def pick_post() -> str:
+            return rng.choices(hot_ids, hot_weights)[0]
+
+        actions = ["page_load"] + rng.choices(
+            list(ACTION_WEIGHTS), list(ACTION_WEIGHTS.values()), k=args.actions - 1
+        )
+        for action in actions:
+            on_detail = router_data["pathname"] != "/"
+            if action == "comment" and not on_detail:
+                action = "open_post"
+            if action == "delete" and not own_posts:
+                action = "post"
+            started = time.perf_counter()
+            # Yield first so time spent waiting for the loop counts as latency.
+            await asyncio.sleep(0)
+            try:
+                if action == "page_load":
+                    router_data = page()
+                    await send(hydrate)
+                    await send(on_load)
+                elif action == "open_post":
+                    router_data = page(pick_post())
+                    await send(on_load)
+                elif action == "back_to_feed":
+                    router_data = page()
+                    await send(on_load)
+                elif action == "sort":
+                    await send(
+                        f"{yak}.set_sort_by", sort_type=rng.choice(["hot", "new"])
+                    )
+                elif action == "load_more":
+                    await send(f"{yak}.load_more")
+                elif action == "vote":
+                    await send(
+                        f"{yak}.set_vote",
+                        post_id=router_data["query"].get("post_id") or pick_post(),
+                        vote_value=rng.choice([1, 1, 1, -1, 0]),
+                    )
+                elif action == "comment":
+                    await send(f"{yak}.add_comment", content="load test reply")
+                elif action == "post":
+                    await send(f"{yak}.create_post", content="load test yak")
+                    own_posts.append(await newest_own_post(token))
+                elif action == "delete":
+                    await send(f"{yak}.delete_post", post_id=own_posts.pop())
+            except Exception:
+                errors[action] = errors.get(action, 0) + 1
+                continue
+            latencies.setdefault(action, []).append(
+                (time.perf_counter() - started) * 1000
+            )
+            if args.think_ms:
+                await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+
+    async def newest_own_post(token: str) -> str:
+        state = await app.state_manager.get_state(f"{token}_{yak}")
+        return state.get_substate(yak.split(".")[1:]).posts[0]["id"]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session_loop(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    all_bytes = [size for sizes in event_bytes.values() for size in sizes]
+    return {
+        "sessions": args.sessions,
+        "actions_per_session": args.actions,
+        "state_manager": type(app.state_manager).__name__,
+        "seconds": round(elapsed, 3),
+        "actions_per_second": round(sum(map(len, latencies.values())) / elapsed, 1),
+        "events_per_second": round(len(all_bytes) / elapsed, 1),
+        "errors": errors,
+        "broadcast": broadcaster.stats() if broadcaster is not None else None,
+        "latency_ms": {
+            action: {"count": len(samples), **percentiles(samples)}
+            for action, samples in sorted(latencies.items())
+        },
+        "delta_bytes": {
+            "all": percentiles([float(size) for size in all_bytes]),
+            **{
+                name: {
+                    "count": len(sizes),
+                    **percentiles([float(size) for size in sizes]),
+                }
+                for name, sizes in sorted(event_bytes.items())
+            },
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--actions", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--think-ms", type=float, default=0)
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument(
+        "--db-url", help="use an existing database instead of seeding a new one"
+    )
+    parser.add_argument("--state-manager", choices=["memory", "disk", "redis"])
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    if args.db_url:
+        args.posts = 0
+    if args.state_manager:
+        os.environ["REFLEX_STATE_MANAGER_MODE"] = args.state_manager
+
+    import asyncio
+
+    with app_database(args.db_url, "load.db"):
+        report = asyncio.run(run(args))
+    print(
+        f"{report['sessions']} sessions x {report['actions_per_session']} actions "
+        f"({report['state_manager']}): {report['actions_per_second']} actions/s, "
+        f"{report['events_per_second']} events/s, errors={report['errors']}"
+    )
+    if report["broadcast"]:
+        print(f"broadcast: {report['broadcast']}")
+    print(f"{'latency ms':<14}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for action, stats in report["latency_ms"].items():
+        print(
+            f"{action:<14}{stats['count']:>7}{stats['p50']:>10.1f}"
+            f"{stats['p95']:>10.1f}{stats['p99']:>10.1f}"
+        )
+    print(f"{'delta bytes':<28}{'count':>7}{'mean':>10}{'p95':>10}{'max':>10}")
+    for name, stats in report["delta_bytes"].items():
+        print(
+            f"{name:<28}{stats.get('count', ''):>7}{stats['mean']:>10.0f}"
+            f"{stats['p95']:>10.0f}{stats['max']:>10.0f}"
+        )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Time reading and rebuilding stored Peek Scores on a large database.
+
+Run with ``python -m benchmarks.peek_scores [--posts 1000000]``; ``--db-url``
+reuses a database already filled by ``benchmarks.datagen``. Times
+``load_score`` for busy and idle sessions against computing the same score
+on read from the session's posts and votes, and the ``rebuild_scores`` pass
+over the whole database. Also checks that the two ways agree. ``--output
+FILE`` saves the JSON report.
+"""
+
+from benchmarks.app_db import app_database
+from benchmarks.stats import summarize
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+
+def run(args) -> dict:
+    from sqlalchemy import text
+    from sqlmodel import Session, func, select
+    from app.db import models
+    from app.db.database import engine
+    from app.db.migrations import migrate
+    from app.db.peek import (
+        PEEK_BASE_SCORE,
+        PEEK_POST_POINTS,
+        load_score,
+        rebuild_scores,
+    )
+    from benchmarks.datagen import VIEWER_SESSION_ID, generate
+
+    migrate(engine)
+    report = {"posts": args.posts}
+    if not args.db_url:
+        started = time.perf_counter()
+        report["rows"] = generate(engine, args.posts, args.seed)
+        report["generate_seconds"] = round(time.perf_counter() - started, 1)
+    scan = text(
+        "SELECT :base + COALESCE((SELECT COUNT(*) FROM post "
+        "WHERE owner_session_id = :session_id), 0) * :post_points "
+        "+ COALESCE((SELECT SUM(v.vote_value) FROM uservote AS v "
+        "JOIN post AS p ON p.id = v.post_id WHERE v.user_session_id = :session_id "
+        "AND p.owner_session_id != :session_id), 0)"
+    )
+    rng = random.Random(args.seed)
+    with Session(engine) as session:
+        busiest = session.exec(
+            select(models.UserVote.user_session_id)
+            .group_by(models.UserVote.user_session_id)
+            .order_by(func.count().desc())
+            .limit(args.repeat)
+        ).all()
+        owners = session.exec(
+            select(models.Post.owner_session_id).distinct().limit(10000)
+        ).all()
+        sessions = {
+            "viewer": [VIEWER_SESSION_ID] * args.repeat,
+            "busiest_voters": list(busiest),
+            "owners": rng.sample(owners, min(args.repeat, len(owners))),
+        }
+        report["reads"], mismatches = {}, 0
+        for name, session_ids in sessions.items():
+            stored, scanned = [], []
+            for session_id in session_ids:
+                started = time.perf_counter()
+                score = load_score(session, session_id)
+                stored.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                expected = (
+                    session.connection()
+                    .execute(
+                        scan,
+                        {
+                            "base": PEEK_BASE_SCORE,
+                            "post_points": PEEK_POST_POINTS,
+                            "session_id": session_id,
+                        },
+                    )
+                    .scalar()
+                )
+                scanned.append(time.perf_counter() - started)
+                mismatches += score != expected
+            report["reads"][name] = {
+                "stored": summarize(stored),
+                "scan": summarize(scanned),
+            }
+        report["mismatches"] = mismatches
+    samples = []
+    for _ in range(args.rebuilds):
+        started = time.perf_counter()
+        with Session(engine) as session:
+            report["sessions"] = rebuild_scores(session)
+            session.commit()
+        samples.append(time.perf_counter() - started)
+    report["rebuild_seconds"] = round(statistics.median(samples), 2)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--rebuilds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db-url", help="use a database already filled by datagen")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    with app_database(args.db_url, "peek_scores.db"):
+        report = run(args)
+    print(f"{report['posts']} posts, {report['sessions']} sessions with a score")
+    print(f"{'sessions':<16}{'stored p50':>12}{'p95':>8}{'scan p50':>10}{'p95':>9}")
+    for name, stats in report["reads"].items():
+        print(
+            f"{name:<16}{stats['stored']['p50_ms']:>12.3f}"
+            f"{stats['stored']['p95_ms']:>8.3f}{stats['scan']['p50_ms']:>10.3f}"
+            f"{stats['scan']['p95_ms']:>9.3f}"
+        )
+    print(f"rebuild: {report['rebuild_seconds']} s")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if report["mismatches"]:
+        print(f"MISMATCH {report['mismatches']} stored scores differ from a scan")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
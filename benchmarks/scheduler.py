@@ -0,0 +1,144 @@
+"""Check that scheduled jobs run once per deployment, not once per worker.
+
+Run with ``python -m benchmarks.scheduler [--workers 8 --seconds 30]``.
+Starts ``--workers`` schedulers in one process, each standing in for an app
+worker, on a temporary SQLite database. They share one job that runs every
+``--interval`` seconds and takes ``--job-ms``. Afterwards one worker takes
+the lease and vanishes without letting it go, and the time until another
+worker picks the job up is measured. Then every scheduler is stopped in the
+middle of a run. Reports runs, overlapping runs, lease round trips, takeover
+time and shutdown time.
+"""
+
+from benchmarks.app_db import app_database
+import argparse
+import statistics
+import sys
+import time
+
+
+def run(args) -> dict:
+    from app.db.database import engine
+    from app.db.migrations import migrate
+    from app.scheduler import Interval, Scheduler
+    import asyncio
+
+    migrate(engine)
+    runs: list[tuple[str, float, float]] = []
+    starts: list[float] = []
+    lease_calls: list[float] = []
+
+    def make_job(holder: str):
+        def job() -> None:
+            started = time.monotonic()
+            starts.append(started)
+            time.sleep(args.job_ms / 1000)
+            runs.append((holder, started, time.monotonic()))
+
+        return job
+
+    def make_workers(count: int, lease_seconds: float) -> list[Scheduler]:
+        workers = []
+        for _ in range(count):
+            worker = Scheduler(args.jitter, 1, args.shutdown)
+            worker.add(
+                "bench",
+                Interval(args.interval),
+                make_job(worker.holder),
+                lease_seconds,
+            )
+            acquire = worker._acquire
+
+            def timed_acquire(job, acquire=acquire):
+                started = time.perf_counter()
+                try:
+                    return acquire(job)
+                finally:
+                    lease_calls.append(time.perf_counter() - started)
+
+            worker._acquire = timed_acquire
+            workers.append(worker)
+        return workers
+
+    async def scenario() -> dict:
+        report = {"workers": args.workers, "seconds": args.seconds}
+        workers = make_workers(args.workers, args.lease)
+        for worker in workers:
+            worker.start()
+        await asyncio.sleep(args.seconds)
+        await asyncio.gather(*(worker.stop() for worker in workers))
+        ordered = sorted(runs, key=lambda run: run[1])
+        report["runs"] = len(ordered)
+        report["expected_runs"] = round(
+            args.seconds / (args.interval + args.job_ms / 1000 + args.jitter / 2)
+        )
+        report["overlaps"] = sum(
+            later[1] < earlier[2] for earlier, later in zip(ordered, ordered[1:])
+        )
+        report["distinct_runners"] = len({holder for holder, _, _ in ordered})
+        ms = sorted(call * 1000 for call in lease_calls)
+        report["lease_calls"] = len(ms)
+        report["lease_p50_ms"] = round(statistics.median(ms), 2)
+        report["lease_max_ms"] = round(ms[-1], 2)
+
+        # A worker that dies holding the lease: the others wait it out.
+        runs.clear()
+        workers = make_workers(args.workers, args.lease)
+        vanished = workers.pop()
+        await asyncio.sleep(args.interval + 0.5)
+        while not await asyncio.to_thread(vanished._acquire, vanished.jobs["bench"]):
+            await asyncio.sleep(0.1)
+        taken = time.monotonic()
+        for worker in workers:
+            worker.start()
+        while not runs:
+            await asyncio.sleep(0.05)
+        report["takeover_seconds"] = round(runs[0][1] - taken, 2)
+        report["lease_seconds"] = args.lease
+
+        # Stop while a run is in progress: it finishes and hands the lease back.
+        started = len(starts)
+        while len(starts) == started:
+            await asyncio.sleep(0.01)
+        started = time.monotonic()
+        await asyncio.gather(*(worker.stop() for worker in workers))
+        report["shutdown_seconds"] = round(time.monotonic() - started, 2)
+        return report
+
+    return asyncio.run(scenario())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--job-ms", type=float, default=200)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--lease", type=float, default=3.0)
+    parser.add_argument("--shutdown", type=float, default=5.0)
+    args = parser.parse_args()
+    with app_database(None, "scheduler.db"):
+        report = run(args)
+    print(
+        f"{report['workers']} workers, {report['seconds']:.0f} s: "
+        f"{report['runs']} runs (about {report['expected_runs']} expected) by "
+        f"{report['distinct_runners']} workers, {report['overlaps']} overlapping"
+    )
+    print(
+        f"lease attempts: {report['lease_calls']}, p50 "
+        f"{report['lease_p50_ms']} ms, max {report['lease_max_ms']} ms"
+    )
+    print(
+        f"takeover after a worker died holding a {report['lease_seconds']} s "
+        f"lease: {report['takeover_seconds']} s"
+    )
+    print(f"shutdown: {report['shutdown_seconds']} s")
+    if report["overlaps"]:
+        print(f"MISMATCH {report['overlaps']} runs overlapped")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
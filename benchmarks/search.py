@@ -0,0 +1,173 @@
+"""Time full-text search against a naive LIKE scan on a large database.
+
+Run with ``python -m benchmarks.search [--posts 1000000]``; ``--db-url``
+reuses a database already filled by ``benchmarks.datagen`` (same seed).
+Queries are drawn from the generator's vocabulary by frequency: common words
+match a large share of all posts, rare ones a handful, plus two-word and
+prefix queries. Each is timed through ``search_posts`` for the first page
+and a deep page, and a few through ``LIKE '%word%'`` over posts and comments
+for comparison. Also times the extra write work of keeping the index in
+sync: one search document per new post and the delete of a post's
+documents. ``--output FILE`` saves the JSON report.
+"""
+
+from benchmarks.app_db import app_database
+from benchmarks.stats import summarize
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+DEEP_OFFSET = 100
+
+
+def run(args) -> dict:
+    from sqlalchemy import text
+    from sqlmodel import Session, delete, func, select
+    from app.db import models
+    from app.db.database import engine
+    from app.db.migrations import migrate
+    from app.db.search import search_posts
+    from benchmarks.datagen import generate, vocabulary
+
+    migrate(engine)
+    report = {"posts": args.posts}
+    if not args.db_url:
+        started = time.perf_counter()
+        report["rows"] = generate(engine, args.posts, args.seed)
+        report["generate_seconds"] = round(time.perf_counter() - started, 1)
+    with Session(engine) as session:
+        report["documents"] = session.exec(
+            select(func.count()).select_from(models.SearchDocument)
+        ).one()
+        if engine.dialect.name == "sqlite":
+            report["fts_mb"] = round(
+                session.connection()
+                .execute(
+                    text(
+                        "SELECT SUM(pgsize) FROM dbstat "
+                        "WHERE name LIKE 'searchdocument_fts%'"
+                    )
+                )
+                .scalar()
+                / 2**20,
+                1,
+            )
+
+    rng = random.Random(args.seed)
+    words = vocabulary(args.seed)
+    queries = {
+        "common": words[:10],
+        "mid": words[100:1000],
+        "rare": words[5000:],
+        "two_words": [f"{a} {b}" for a, b in zip(words[10:100], words[100:190])],
+        "prefix": [word[:4] for word in words[100:1000] if len(word) > 4],
+    }
+    timings: dict[str, dict] = {}
+    with Session(engine) as session:
+        for tier, pool in queries.items():
+            samples = {"page_1": [], f"offset_{DEEP_OFFSET}": [], "results": []}
+            for _ in range(args.repeat):
+                query = rng.choice(pool)
+                started = time.perf_counter()
+                posts, _ = search_posts(session, query)
+                samples["page_1"].append(time.perf_counter() - started)
+                samples["results"].append(len(posts))
+                started = time.perf_counter()
+                search_posts(session, query, DEEP_OFFSET)
+                samples[f"offset_{DEEP_OFFSET}"].append(time.perf_counter() - started)
+            like = []
+            for _ in range(args.like_repeat):
+                pattern = f"%{rng.choice(pool).split()[0]}%"
+                started = time.perf_counter()
+                session.exec(
+                    select(models.Post.id)
+                    .where(
+                        models.Post.content.like(pattern)
+                        | models.Post.id.in_(
+                            select(models.Comment.post_id).where(
+                                models.Comment.content.like(pattern)
+                            )
+                        )
+                    )
+                    .limit(20)
+                ).all()
+                like.append(time.perf_counter() - started)
+            timings[tier] = {
+                "page_1": summarize(samples["page_1"]),
+                f"offset_{DEEP_OFFSET}": summarize(samples[f"offset_{DEEP_OFFSET}"]),
+                "like": summarize(like),
+                "mean_results": round(statistics.fmean(samples["results"]), 1),
+            }
+    report["queries"] = timings
+
+    writes = {"post": [], "post_with_document": [], "delete_documents": []}
+    for i in range(args.repeat):
+        for kind in ("post", "post_with_document"):
+            started = time.perf_counter()
+            with Session(engine) as session:
+                post = models.Post(
+                    content=" ".join(words[i : i + 12]), owner_session_id="b"
+                )
+                session.add(post)
+                if kind == "post_with_document":
+                    session.flush()
+                    session.add(
+                        models.SearchDocument(post_id=post.id, content=post.content)
+                    )
+                session.commit()
+                post_id = post.id
+            writes[kind].append(time.perf_counter() - started)
+        started = time.perf_counter()
+        with Session(engine) as session:
+            session.exec(
+                delete(models.SearchDocument).where(
+                    models.SearchDocument.post_id == post_id
+                )
+            )
+            session.commit()
+        writes["delete_documents"].append(time.perf_counter() - started)
+    report["writes"] = {kind: summarize(samples) for kind, samples in writes.items()}
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--like-repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db-url", help="use a database already filled by datagen")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    with app_database(args.db_url, "search.db"):
+        report = run(args)
+    print(
+        f"{report['posts']} posts, {report['documents']} search documents"
+        + (f", FTS index {report['fts_mb']} MB" if "fts_mb" in report else "")
+    )
+    print(
+        f"{'query':<12}{'results':>9}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'deep p50':>10}{'LIKE p50':>10}"
+    )
+    for tier, stats in report["queries"].items():
+        print(
+            f"{tier:<12}{stats['mean_results']:>9}{stats['page_1']['p50_ms']:>10.2f}"
+            f"{stats['page_1']['p95_ms']:>10.2f}"
+            f"{stats[f'offset_{DEEP_OFFSET}']['p50_ms']:>10.2f}"
+            f"{stats['like']['p50_ms']:>10.1f}"
+        )
+    for kind, stats in report["writes"].items():
+        print(
+            f"{kind:<22}p50 {stats['p50_ms']:>8.2f} ms  p95 {stats['p95_ms']:>8.2f} ms"
+        )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
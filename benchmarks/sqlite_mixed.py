@@ -0,0 +1,135 @@
+"""Mixed read/write throughput on a SQLite file, before and after the profile.
+
+Run with ``python -m benchmarks.sqlite_mixed [--readers N] [--writers M]``.
+Reader threads load feed pages and writer threads cast votes for a fixed time,
+first on one shared engine with driver defaults (the old setup), then on the
+WAL writer/reader pair from ``create_db_engine``. Reports operations per
+second, latency percentiles and how many operations failed.
+"""
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, create_engine, select
+from app.db import models
+from app.db.database import create_db_engine, create_read_engine
+from app.db.feed import load_feed_page, load_user_votes
+from app.db.migrations import migrate
+from app.db.votes import cast_vote
+from benchmarks.async_latency import seed
+from benchmarks.stats import percentiles
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+
+def shared_engines(db_url: str):
+    engine = create_engine(
+        db_url,
+        connect_args={"check_same_thread": False},
+        pool_size=20,
+        max_overflow=10,
+    )
+    return engine, engine
+
+
+def split_engines(db_url: str):
+    engine = create_db_engine(db_url)
+    return engine, create_read_engine(db_url, engine)
+
+
+def run_profile(make_engines, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        db_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        write_engine, read_engine = make_engines(db_url)
+        migrate(write_engine)
+        seed(write_engine, args.posts)
+        with Session(read_engine) as session:
+            post_ids = list(session.exec(select(models.Post.id)).all())
+        latencies: dict[str, list[float]] = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+        stop = threading.Event()
+
+        def read_loop(worker: int):
+            rng = random.Random(worker)
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    with Session(read_engine) as session:
+                        posts, _ = load_feed_page(session, rng.choice(["hot", "new"]))
+                        load_user_votes(
+                            session, f"viewer-{worker}", [post.id for post in posts]
+                        )
+                except OperationalError:
+                    errors["read"] += 1
+                    continue
+                latencies["read"].append(time.perf_counter() - started)
+
+        def write_loop(worker: int):
+            rng = random.Random(1000 + worker)
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    with Session(write_engine) as session:
+                        cast_vote(
+                            session,
+                            rng.choice(post_ids),
+                            f"voter-{rng.randrange(1000)}",
+                            rng.choice([1, -1]),
+                        )
+                        session.commit()
+                except OperationalError:
+                    errors["write"] += 1
+                    continue
+                latencies["write"].append(time.perf_counter() - started)
+
+        threads = [
+            threading.Thread(target=read_loop, args=(i,)) for i in range(args.readers)
+        ] + [
+            threading.Thread(target=write_loop, args=(i,)) for i in range(args.writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        write_engine.dispose()
+        read_engine.dispose()
+    return {
+        kind: {
+            "ops_per_second": len(samples) / args.seconds,
+            "errors": errors[kind],
+            **(
+                percentiles([sample * 1000 for sample in samples])
+                if len(samples) > 1
+                else {}
+            ),
+        }
+        for kind, samples in latencies.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    for name, make_engines in (("shared", shared_engines), ("split", split_engines)):
+        for kind, result in run_profile(make_engines, args).items():
+            timings = " ".join(
+                f"{cut}={result[cut]:.1f}ms"
+                for cut in ("p50", "p95", "p99")
+                if cut in result
+            )
+            print(
+                f"{name:>6} {kind:>5}: {result['ops_per_second']:8.1f} ops/s "
+                f"errors={result['errors']} {timings}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Latency and size summaries shared by the benchmarks."""
+
+import statistics
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """Mean, p50, p95, p99 and max of ``values``, in their own unit.
+
+    Uses the inclusive method, so percentiles stay between the smallest and
+    largest value however few samples there are.
+    """
+    if len(values) < 2:
+        values = values * 2 or [0.0, 0.0]
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "mean": round(statistics.fmean(values), 3),
+        "p50": round(cuts[49], 3),
+        "p95": round(cuts[94], 3),
+        "p99": round(cuts[98], 3),
+        "max": round(max(values), 3),
+    }
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """The count and ``percentiles`` of timings in seconds, reported in ms."""
+    summary = percentiles([sample * 1000 for sample in samples])
+    return {"n": len(samples), **{f"{key}_ms": value for key, value in summary.items()}}
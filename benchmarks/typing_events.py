@@ -0,0 +1,66 @@
+"""Count the websocket events it takes to write and submit a post or comment.
+
+Run with ``python -m benchmarks.typing_events [--chars 200]``. Renders the
+create-post dialog and the comment form, finds the textarea's ``onChange``
+and the submit button's ``onClick``, and counts how many backend events each
+dispatches. A draft of ``--chars`` characters typed one keystroke at a time
+costs ``chars`` change triggers plus one click. Events handled in the
+browser, like reading a ``ClientStateVar``, are not counted; their callback
+to a backend handler is.
+"""
+
+from app.components.create_post_dialog import create_post_dialog
+from app.pages.post_detail import create_comment_form
+import argparse
+import re
+import sys
+
+BACKEND_EVENT = re.compile(r'ReflexEvent\(\\*"reflex___state')
+
+
+def triggers(rendered: dict, tag: str) -> dict[str, list[str]]:
+    """Collect the rendered ``tag`` elements' event props, by prop name."""
+    found: dict[str, list[str]] = {}
+    if rendered.get("name") == f'"{tag}"':
+        for prop in rendered.get("props", []):
+            name, _, value = prop.partition(":")
+            if name.startswith("on"):
+                found.setdefault(name, []).append(value)
+    for child in rendered.get("children", []):
+        for name, values in triggers(child, tag).items():
+            found.setdefault(name, []).extend(values)
+    return found
+
+
+def backend_events(handlers: list[str]) -> int:
+    return sum(len(BACKEND_EVENT.findall(handler)) for handler in handlers)
+
+
+def measure(component, chars: int) -> dict[str, int]:
+    rendered = component.render()
+    per_keystroke = backend_events(triggers(rendered, "textarea").get("onChange", []))
+    per_submit = backend_events(triggers(rendered, "button").get("onClick", []))
+    return {
+        "per_keystroke": per_keystroke,
+        "per_submit": per_submit,
+        "per_draft": chars * per_keystroke + per_submit,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, default=200)
+    args = parser.parse_args()
+    forms = {"post": create_post_dialog(), "comment": create_comment_form()}
+    print(f"backend events for a {args.chars}-character draft")
+    for name, component in forms.items():
+        counts = measure(component, args.chars)
+        print(
+            f"{name:<8} {counts['per_keystroke']} per keystroke, "
+            f"{counts['per_submit']} on submit: {counts['per_draft']} in all"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
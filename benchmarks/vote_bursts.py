@@ -0,0 +1,172 @@
+"""Count the database writes it takes to store a burst of vote clicks.
+
+Run with ``python -m benchmarks.vote_bursts [--clicks 1,2,3,5,10]``. For each
+burst length a voter clicks the up arrow that many times in a row on a post
+they had not voted on, so the vote flips on and off. Each burst is stored two
+ways on a temporary SQLite database:
+
+* per click: one ``cast_vote`` toggle transaction per click, as every vote
+  was written before clicks were coalesced;
+* coalesced: each click goes to ``YakState.set_vote`` as the vote the browser
+  now shows, then pending intents are written and settled the way
+  ``write_votes`` does after its pause.
+
+Reports write statements and transactions per burst, and checks that both
+ways leave the same vote and that every post's counter matches its vote rows.
+"""
+
+from benchmarks.app_db import app_database
+import argparse
+import statistics
+import sys
+import time
+
+
+def run(args) -> dict:
+    from reflex.istate.data import RouterData
+    from sqlalchemy import event, func
+    from sqlmodel import Session, select
+    from app.db import models
+    from app.db.database import async_engine, engine
+    from app.db.migrations import migrate
+    from app.db.votes import cast_vote
+    from app.states.yak_state import YakState
+    import asyncio
+    import reflex as rx
+
+    migrate(engine)
+    loop = asyncio.new_event_loop()
+    counts = {"writes": 0, "commits": 0}
+
+    def count_write(conn, cursor, statement, parameters, context, many):
+        if statement.lstrip().split(None, 1)[0].upper() in (
+            "INSERT",
+            "UPDATE",
+            "DELETE",
+        ):
+            counts["writes"] += 1
+
+    def count_commit(conn):
+        counts["commits"] += 1
+
+    for bind in (engine, async_engine.sync_engine):
+        event.listen(bind, "before_cursor_execute", count_write)
+        event.listen(bind, "commit", count_commit)
+
+    def make_state(session_id: str) -> YakState:
+        root = rx.State(_reflex_internal_init=True)
+        state = root.get_substate(YakState.get_full_name().split(".")[1:])
+        state.router = RouterData.from_router_data(
+            {"sid": session_id, "token": session_id, "pathname": "/", "headers": {}}
+        )
+        return state
+
+    def new_post() -> str:
+        with Session(engine) as session:
+            post = models.Post(content="burst", owner_session_id="owner", votes=0)
+            session.add(post)
+            session.commit()
+            return post.id
+
+    def per_click(post_id: str, session_id: str, clicks: int) -> None:
+        for _ in range(clicks):
+            with Session(engine) as session:
+                cast_vote(session, post_id, session_id, 1)
+                session.commit()
+
+    def coalesced(post_id: str, session_id: str, clicks: int) -> None:
+        state = make_state(session_id)
+        for click in range(clicks):
+            YakState.set_vote.fn(state, post_id, 1 - click % 2)
+        intents, state._vote_intents = dict(state._vote_intents), {}
+        results = loop.run_until_complete(state._write_votes(session_id, intents))
+        state._settle_votes(intents, results)
+
+    def final_vote(post_id: str, session_id: str) -> int:
+        with Session(engine) as session:
+            return (
+                session.exec(
+                    select(models.UserVote.vote_value).where(
+                        models.UserVote.post_id == post_id,
+                        models.UserVote.user_session_id == session_id,
+                    )
+                ).first()
+                or 0
+            )
+
+    report = {"bursts": args.bursts, "clicks": {}}
+    for clicks in args.clicks:
+        report["clicks"][clicks] = {}
+        finals = {}
+        for name, store in (("per_click", per_click), ("coalesced", coalesced)):
+            writes, commits, seconds = [], [], []
+            for burst in range(args.bursts):
+                post_id, session_id = new_post(), f"voter-{name}-{clicks}-{burst}"
+                counts.update(writes=0, commits=0)
+                started = time.perf_counter()
+                store(post_id, session_id, clicks)
+                seconds.append(time.perf_counter() - started)
+                writes.append(counts["writes"])
+                commits.append(counts["commits"])
+                finals.setdefault(name, set()).add(final_vote(post_id, session_id))
+            report["clicks"][clicks][name] = {
+                "writes": statistics.fmean(writes),
+                "transactions": statistics.fmean(commits),
+                "ms": round(statistics.median(seconds) * 1000, 2),
+            }
+        report["clicks"][clicks]["same_final_vote"] = (
+            finals["per_click"] == finals["coalesced"] and len(finals["coalesced"]) == 1
+        )
+
+    with Session(engine) as session:
+        vote_sums = dict(
+            session.exec(
+                select(
+                    models.UserVote.post_id, func.sum(models.UserVote.vote_value)
+                ).group_by(models.UserVote.post_id)
+            ).all()
+        )
+        report["counter_mismatches"] = sum(
+            post.votes != vote_sums.get(post.id, 0)
+            for post in session.exec(select(models.Post)).all()
+        )
+    loop.close()
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--clicks",
+        type=lambda value: [int(n) for n in value.split(",")],
+        default=[1, 2, 3, 5, 10],
+    )
+    parser.add_argument("--bursts", type=int, default=50)
+    args = parser.parse_args()
+    with app_database(None, "vote_bursts.db"):
+        report = run(args)
+    print(f"{'clicks':>6}{'way':>11}{'writes':>8}{'txns':>6}{'p50 ms':>8}")
+    for clicks, ways in report["clicks"].items():
+        for name in ("per_click", "coalesced"):
+            stats = ways[name]
+            print(
+                f"{clicks:>6}{name:>11}{stats['writes']:>8.1f}"
+                f"{stats['transactions']:>6.1f}{stats['ms']:>8.2f}"
+            )
+    failed = [
+        clicks
+        for clicks, ways in report["clicks"].items()
+        if not ways["same_final_vote"]
+    ]
+    for clicks in failed:
+        print(f"MISMATCH final vote differs after {clicks} clicks")
+    if report["counter_mismatches"]:
+        print(f"MISMATCH {report['counter_mismatches']} post counters")
+    if failed or report["counter_mismatches"]:
+        return 1
+    print("OK: same final votes, counters match vote rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
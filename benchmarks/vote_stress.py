@@ -0,0 +1,145 @@
+"""Hammer the vote writers from many threads; check counters stay consistent.
+
+Run with ``python -m benchmarks.vote_stress [--db-url URL]``. Defaults to a
+temporary SQLite file; pass a Postgres URL to exercise row locking there.
+Each worker has its own engine, standing in for an app worker, and votes as
+one of a few shared sessions, so the same vote row is written concurrently
+the way two tabs or a taken-over vote writer do. Half the workers write
+through ``set_votes`` one vote at a time, the other half write batches of
+intents through ``apply_vote_intents`` as ``VoteBuffer.flush`` does.
+Exits non-zero if any post's ``votes`` differs from the sum of its vote rows,
+a session ends up with more than one vote row on a post, or an incrementally
+kept Peek Score differs from what ``rebuild_scores`` computes.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.db import models
+from app.db.peek import PEEK_BASE_SCORE, PEEK_POST_POINTS, add_points, rebuild_scores
+from app.db.votes import apply_vote_intents, set_votes
+import argparse
+import random
+import sys
+import tempfile
+
+VOTE_VALUES = (1, 0, -1)
+FLUSH_BATCH_SIZE = 8
+
+
+def vote_worker(db_url: str, worker: int, post_ids: list[str], args) -> None:
+    engine = make_engine(db_url, 1)
+    rng = random.Random(worker)
+    session_ids = [f"voter-{i}" for i in range(args.sessions)]
+    for _ in range(args.votes_per_worker):
+        with Session(engine) as session:
+            if worker % 2:
+                apply_vote_intents(
+                    session,
+                    {
+                        (rng.choice(post_ids), rng.choice(session_ids)): rng.choice(
+                            VOTE_VALUES
+                        )
+                        for _ in range(FLUSH_BATCH_SIZE)
+                    },
+                )
+            else:
+                set_votes(
+                    session,
+                    rng.choice(session_ids),
+                    {rng.choice(post_ids): rng.choice(VOTE_VALUES)},
+                )
+            session.commit()
+    engine.dispose()
+
+
+def make_engine(db_url: str, pool_size: int):
+    connect_args = {"timeout": 30} if db_url.startswith("sqlite") else {}
+    return create_engine(db_url, connect_args=connect_args, pool_size=pool_size)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url")
+    parser.add_argument("--posts", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--votes-per-worker", type=int, default=200)
+    args = parser.parse_args()
+
+    db_url = args.db_url
+    if db_url is None:
+        db_url = f"sqlite:///{tempfile.mkdtemp()}/vote_stress.db"
+    engine = make_engine(db_url, 1)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        posts = [
+            models.Post(content=f"post {i}", owner_session_id="owner", votes=0)
+            for i in range(args.posts)
+        ]
+        session.add_all(posts)
+        add_points(session, {"owner": PEEK_POST_POINTS * args.posts})
+        session.commit()
+        post_ids = [post.id for post in posts]
+
+    with ThreadPoolExecutor(args.workers) as pool:
+        futures = [
+            pool.submit(vote_worker, db_url, worker, post_ids, args)
+            for worker in range(args.workers)
+        ]
+        for future in futures:
+            future.result()
+
+    with Session(engine) as session:
+        vote_sums = dict(
+            session.exec(
+                select(
+                    models.UserVote.post_id, func.sum(models.UserVote.vote_value)
+                ).group_by(models.UserVote.post_id)
+            ).all()
+        )
+        duplicates = session.exec(
+            select(models.UserVote.post_id, models.UserVote.user_session_id)
+            .group_by(models.UserVote.post_id, models.UserVote.user_session_id)
+            .having(func.count() > 1)
+        ).all()
+        mismatches = [
+            (post.id, post.votes, vote_sums.get(post.id, 0))
+            for post in session.exec(select(models.Post)).all()
+            if post.votes != vote_sums.get(post.id, 0)
+        ]
+        score_query = select(models.PeekScore.session_id, models.PeekScore.score)
+        scores = dict(session.exec(score_query).all())
+        rebuild_scores(session)
+        rebuilt = dict(session.exec(score_query).all())
+        session.rollback()
+        # A session without a row reads as the base score.
+        score_mismatches = [
+            (
+                session_id,
+                scores.get(session_id, PEEK_BASE_SCORE),
+                rebuilt.get(session_id, PEEK_BASE_SCORE),
+            )
+            for session_id in sorted(scores.keys() | rebuilt.keys())
+            if scores.get(session_id, PEEK_BASE_SCORE)
+            != rebuilt.get(session_id, PEEK_BASE_SCORE)
+        ]
+
+    total = args.workers * args.votes_per_worker
+    print(f"{total} writes from {args.workers} workers on {args.posts} posts")
+    for post_id, votes, expected in mismatches:
+        print(f"MISMATCH {post_id}: votes={votes} sum(vote rows)={expected}")
+    for post_id, session_id in duplicates:
+        print(f"DUPLICATE vote rows for {session_id} on {post_id}")
+    for session_id, score, expected in score_mismatches:
+        print(f"MISMATCH Peek Score of {session_id}: {score} rebuilt={expected}")
+    if mismatches or duplicates or score_mismatches:
+        return 1
+    print("OK: every post's votes equals the sum of its vote rows")
+    print("OK: every Peek Score equals its rebuilt value")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+from sqlmodel import create_engine
+import os
+import pytest
+import tempfile
+
+# The app creates its engines on import, so point it at a scratch database
+# before any test module imports it.
+os.environ["REFLEX_DB_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+
+
+@pytest.fixture
+def db_url(tmp_path) -> str:
+    """A fresh SQLite file that several engines can share."""
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture
+def engine(db_url):
+    engine = create_engine(db_url, connect_args={"timeout": 30})
+    yield engine
+    engine.dispose()
@@ -0,0 +1,78 @@
+"""Archiving never loses a reply or vote written while a batch is running."""
+
+from sqlalchemy import event
+from sqlmodel import Session, create_engine, select, update
+from app.db import models
+from app.db.archive import archive_batch, load_archived_post
+from app.db.migrations import migrate
+import datetime
+import threading
+
+
+def add_comment(db_url: str, post_id: str, outcome: list[str]) -> None:
+    """Write a reply the way ``YakState.add_comment`` does."""
+    engine = create_engine(db_url, connect_args={"timeout": 30})
+    with Session(engine) as session:
+        session.add(
+            models.Comment(post_id=post_id, content="late", owner_session_id="x")
+        )
+        comment_count = session.exec(
+            update(models.Post)
+            .where(models.Post.id == post_id)
+            .values(comment_count=models.Post.comment_count + 1)
+            .returning(models.Post.comment_count)
+        ).scalar_one_or_none()
+        if comment_count is None:
+            session.rollback()
+            outcome.append("post gone")
+        else:
+            session.commit()
+            outcome.append("committed")
+    engine.dispose()
+
+
+def test_reply_during_archive_batch_is_kept(db_url, engine):
+    migrate(engine)
+    with Session(engine) as session:
+        post = models.Post(
+            content="old",
+            owner_session_id="owner",
+            created_at=datetime.datetime.utcnow() - datetime.timedelta(days=30),
+        )
+        session.add(post)
+        session.commit()
+        post_id = post.id
+
+    outcome, writers = [], []
+
+    def after_cursor_execute(conn, cursor, statement, *args):
+        # Right after the batch has read the comments it will archive.
+        if not writers and statement.lstrip().startswith("SELECT comment."):
+            writer = threading.Thread(
+                target=add_comment, args=(db_url, post_id, outcome)
+            )
+            writer.start()
+            writer.join(timeout=1)
+            writers.append(writer)
+
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        with Session(engine) as session:
+            assert archive_batch(session, datetime.datetime.utcnow(), 10) == 1
+            session.commit()
+    finally:
+        event.remove(engine, "after_cursor_execute", after_cursor_execute)
+        for writer in writers:
+            writer.join()
+
+    assert writers and outcome
+    with Session(engine) as session:
+        live = session.exec(select(models.Comment.content)).all()
+        archived = [
+            comment["content"]
+            for comment in load_archived_post(session, post_id)["comments"]
+        ]
+    if outcome == ["committed"]:
+        assert live + archived == ["late"]
+    else:
+        assert outcome == ["post gone"] and live + archived == []
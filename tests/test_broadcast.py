@@ -0,0 +1,137 @@
+from app.broadcast import (
+    BroadcastBackend,
+    Broadcaster,
+    LocalBackend,
+    apply_counts,
+    apply_shown_changes,
+    take,
+)
+import asyncio
+import pytest
+import time
+
+INTERVAL_MS = 10
+CLIENT_INTERVAL_MS = 50
+# Sleep overshoot tolerated when checking the per-subscriber interval.
+SLACK_SECONDS = 0.02
+
+
+def test_backend_must_implement_start_and_publish():
+    class StartOnly(BroadcastBackend):
+        def start(self, deliver):
+            pass
+
+    with pytest.raises(TypeError):
+        StartOnly()
+
+
+def test_apply_shown_changes_updates_counts_and_drops_deleted_posts():
+    posts = [
+        {"id": "a", "votes": 1, "comment_count": 0},
+        {"id": "b", "votes": 2, "comment_count": 0},
+        {"id": "c", "votes": 3, "comment_count": 0},
+    ]
+    shown = apply_shown_changes(
+        posts,
+        {
+            "a": {"id": "a", "votes": 5},
+            "b": {"id": "b", "deleted": True},
+            "new": {"id": "new", "post": {}},
+        },
+    )
+    assert shown == {"a", "b"}
+    assert posts == [
+        {"id": "a", "votes": 5, "comment_count": 0},
+        {"id": "c", "votes": 3, "comment_count": 0},
+    ]
+
+
+def test_take_keeps_new_and_deleted_posts_over_the_limit():
+    pending = {
+        "a": {"id": "a", "votes": 1},
+        "new": {"id": "new", "post": {}},
+        "b": {"id": "b", "votes": 2},
+        "gone": {"id": "gone", "deleted": True},
+        "c": {"id": "c", "votes": 3},
+    }
+    changes, dropped = take(pending, 3)
+    assert [change["id"] for change in changes] == ["new", "gone", "c"]
+    assert dropped == 2
+
+
+async def fan_out(n_subscribers: int, rounds: int):
+    """Publish votes, new and deleted posts through two workers sharing a backend.
+
+    Each post is only changed through one worker, as its author's and voters'
+    sessions would be, so its final state is well defined.
+    """
+    backend = LocalBackend()
+    workers = [
+        Broadcaster(backend, INTERVAL_MS, CLIENT_INTERVAL_MS, max_changes=1000)
+        for _ in range(2)
+    ]
+    hot_ids = ["hot-0", "hot-1", "hot-2"]
+    truth = dict.fromkeys(hot_ids, 0)
+    created, deleted = [], []
+    published = 0
+    views = [
+        {post_id: {"votes": 0, "comment_count": 0} for post_id in hot_ids}
+        for _ in range(n_subscribers)
+    ]
+    reads = [[] for _ in range(n_subscribers)]
+    done = asyncio.Event()
+
+    async def subscriber(index: int) -> None:
+        subscription = workers[index % 2].subscribe(f"tab-{index}")
+        view = views[index]
+        try:
+            while not done.is_set() or subscription._pending:
+                changes = await subscription.next(0.01)
+                if changes:
+                    reads[index].append(time.monotonic())
+                for change in changes:
+                    if change.get("deleted"):
+                        view.pop(change["id"], None)
+                    elif "post" in change:
+                        view[change["id"]] = apply_counts(dict(change["post"]), change)
+                    elif change["id"] in view:
+                        apply_counts(view[change["id"]], change)
+        finally:
+            subscription.close()
+
+    tasks = [asyncio.create_task(subscriber(i)) for i in range(n_subscribers)]
+    await asyncio.sleep(0)
+    for step in range(rounds):
+        for index, post_id in enumerate(hot_ids):
+            for _ in range(index + 1):
+                truth[post_id] += 1
+                workers[index % 2].publish({"id": post_id, "votes": truth[post_id]})
+                published += 1
+        post_id = f"new-{step}"
+        created.append(post_id)
+        workers[step % 2].publish(
+            {"id": post_id, "post": {"id": post_id, "votes": 1, "comment_count": 0}}
+        )
+        published += 1
+        if step % 5 == 4:
+            deleted.append(created[-2])
+            workers[(step - 1) % 2].publish({"id": created[-2], "deleted": True})
+            published += 1
+        await asyncio.sleep(0.005)
+    await asyncio.sleep(2 * (INTERVAL_MS + CLIENT_INTERVAL_MS) / 1000)
+    done.set()
+    await asyncio.gather(*tasks)
+    alive = set(created) - set(deleted)
+    return workers, published, truth, alive, views, reads
+
+
+def test_two_workers_deliver_every_change_at_most_once_per_interval():
+    workers, published, truth, alive, views, reads = asyncio.run(fan_out(10, rounds=20))
+    assert sum(worker.dropped for worker in workers) == 0
+    # Votes on the same post between two batches go out as one change.
+    assert sum(worker.changes for worker in workers) < published
+    for view, read_at in zip(views, reads):
+        assert {post_id: view[post_id]["votes"] for post_id in truth} == truth
+        assert set(view) - set(truth) == alive
+        gaps = [b - a for a, b in zip(read_at, read_at[1:])]
+        assert gaps and min(gaps) >= CLIENT_INTERVAL_MS / 1000 - SLACK_SECONDS
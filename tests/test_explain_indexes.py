@@ -0,0 +1,80 @@
+"""The feed and detail queries are served by indexes.
+
+The schema is built by the migration runner, the real loaders run against a
+seeded SQLite database, and every statement they issue is replayed under
+``EXPLAIN QUERY PLAN``. No plan may scan a whole table or sort into a
+temporary b-tree, except where a location feed merges its per-cell pages:
+that sort is bounded by the number of cells times the page size.
+"""
+
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlmodel import Session
+from app.db.feed import (
+    load_comment_page,
+    load_feed_page,
+    load_post,
+    load_user_votes,
+)
+from app.db.geo import DEFAULT_GEOHASH, neighbors
+from app.db.migrations import migrate
+from tests.test_feed_queries import SESSION_ID, seed
+import re
+
+N_POSTS = 2000
+FULL_SCAN = re.compile(r"\bSCAN (post|comment|uservote)$")
+TEMP_SORT = "USE TEMP B-TREE"
+CELL_MERGE = "UNION ALL"
+
+
+@contextmanager
+def record_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def run_loaders(engine, post_id: str) -> list[tuple[str, list]]:
+    with Session(engine) as session, record_statements(engine) as statements:
+        for sort_by in ("hot", "new"):
+            posts, cursor = load_feed_page(session, sort_by)
+            load_user_votes(session, SESSION_ID, [post.id for post in posts])
+            load_feed_page(session, sort_by, cursor)
+            cells = neighbors(DEFAULT_GEOHASH)
+            _, cursor = load_feed_page(session, sort_by, cells=cells)
+            load_feed_page(session, sort_by, cursor, cells=cells)
+        load_post(session, SESSION_ID, post_id)
+        _, cursor = load_comment_page(session, post_id, limit=1)
+        load_comment_page(session, post_id, cursor, limit=1)
+    return statements
+
+
+def test_loaders_use_indexes(engine):
+    migrate(engine)
+    post_id = seed(engine, N_POSTS)
+    bad = {}
+    with engine.connect() as connection:
+        for statement, parameters in run_loaders(engine, post_id):
+            plan = [
+                row[-1]
+                for row in connection.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                )
+            ]
+            steps = [
+                step
+                for step in plan
+                if FULL_SCAN.search(step)
+                or (TEMP_SORT in step and CELL_MERGE not in plan)
+            ]
+            if steps:
+                bad[" ".join(statement.split())] = steps
+    assert not bad
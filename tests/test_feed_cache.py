@@ -0,0 +1,19 @@
+from app.db.feed_cache import FeedCache
+import asyncio
+import pytest
+
+
+def test_failed_load_releases_the_key():
+    cache = FeedCache(ttl_seconds=60, max_entries=8)
+
+    async def failing_load():
+        raise RuntimeError("database is locked")
+
+    async def load():
+        return "page"
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get("feed", failing_load))
+    assert cache._key_locks == {}
+    assert asyncio.run(cache.get("feed", load)) == "page"
+    assert asyncio.run(cache.get("feed", failing_load)) == "page"
@@ -0,0 +1,76 @@
+"""The feed loaders issue a constant number of SQL statements."""
+
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlmodel import Session
+from app.db import models
+from app.db.feed import (
+    format_feed_post,
+    format_post_detail,
+    load_comment_page,
+    load_feed_page,
+    load_post,
+    load_user_votes,
+)
+from app.db.migrations import migrate
+from app.db.votes import set_votes
+import pytest
+
+SESSION_ID = "viewer"
+FEED_SIZES = (1, 10, 100, 1000)
+MAX_FEED_STATEMENTS = 2
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed(engine, n_posts: int) -> str:
+    """Posts with three comments each; the viewer upvotes every other one.
+
+    Returns the id of the last post.
+    """
+    with Session(engine) as session:
+        posts = [
+            models.Post(content=f"post {i}", owner_session_id=f"owner-{i}")
+            for i in range(n_posts)
+        ]
+        session.add_all(posts)
+        session.flush()
+        session.add_all(
+            models.Comment(post_id=post.id, content=f"c{j}", owner_session_id="x")
+            for post in posts
+            for j in range(3)
+        )
+        set_votes(session, SESSION_ID, {post.id: 1 for post in posts[1::2]})
+        session.commit()
+        return posts[-1].id
+
+
+@pytest.mark.parametrize("n_posts", FEED_SIZES)
+def test_feed_and_detail_statements_do_not_grow(engine, n_posts):
+    migrate(engine)
+    post_id = seed(engine, n_posts)
+    for sort_by in ("hot", "new"):
+        with Session(engine) as session, count_statements(engine) as statements:
+            posts, _ = load_feed_page(session, sort_by)
+            votes = load_user_votes(session, SESSION_ID, [post.id for post in posts])
+            for post in posts:
+                format_feed_post(post, votes[post.id], SESSION_ID)
+        assert len(statements) <= MAX_FEED_STATEMENTS, sort_by
+    with Session(engine) as session, count_statements(engine) as statements:
+        comments, _ = load_comment_page(session, post_id)
+        format_post_detail(
+            *load_post(session, SESSION_ID, post_id), SESSION_ID, comments
+        )
+    assert len(statements) <= MAX_FEED_STATEMENTS
@@ -0,0 +1,54 @@
+"""Upgrading a database from before migrations gives the schema a fresh one has."""
+
+from sqlalchemy import create_engine, inspect
+from app.db.migrations import SCHEMA_VERSION, _create_indexes, migrate
+from app.db import models
+import pytest
+
+# The tables as the app created them before it had migrations.
+BASELINE_SCHEMA = (
+    "CREATE TABLE post (id VARCHAR NOT NULL, content VARCHAR NOT NULL, "
+    "votes INTEGER NOT NULL, created_at DATETIME NOT NULL, "
+    "owner_session_id VARCHAR NOT NULL, PRIMARY KEY (id))",
+    "CREATE INDEX ix_post_owner_session_id ON post (owner_session_id)",
+    "CREATE TABLE comment (id VARCHAR NOT NULL, content VARCHAR NOT NULL, "
+    "created_at DATETIME NOT NULL, post_id VARCHAR NOT NULL, "
+    "owner_session_id VARCHAR NOT NULL, PRIMARY KEY (id), "
+    "FOREIGN KEY(post_id) REFERENCES post (id))",
+    "CREATE INDEX ix_comment_owner_session_id ON comment (owner_session_id)",
+    "CREATE TABLE uservote (id VARCHAR NOT NULL, post_id VARCHAR NOT NULL, "
+    "user_session_id VARCHAR NOT NULL, vote_value INTEGER NOT NULL, "
+    "PRIMARY KEY (id), FOREIGN KEY(post_id) REFERENCES post (id))",
+    "CREATE INDEX ix_uservote_user_session_id ON uservote (user_session_id)",
+)
+
+
+def schema(engine) -> dict:
+    inspector = inspect(engine)
+    return {
+        table: (
+            sorted(column["name"] for column in inspector.get_columns(table)),
+            sorted(
+                (index["name"], tuple(index["column_names"]), bool(index["unique"]))
+                for index in inspector.get_indexes(table)
+            ),
+        )
+        for table in inspector.get_table_names()
+    }
+
+
+def test_baseline_database_upgrades_to_the_fresh_schema(tmp_path):
+    fresh = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    upgraded = create_engine(f"sqlite:///{tmp_path / 'upgraded.db'}")
+    with upgraded.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.exec_driver_sql(statement)
+    assert migrate(fresh) == SCHEMA_VERSION
+    assert migrate(upgraded) == SCHEMA_VERSION
+    assert schema(upgraded) == schema(fresh)
+    assert migrate(upgraded) == SCHEMA_VERSION
+
+
+def test_create_indexes_rejects_unknown_names(engine):
+    with engine.begin() as connection, pytest.raises(ValueError):
+        _create_indexes(connection, models.Post.__table__, "ix_post_votes")
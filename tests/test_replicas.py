@@ -0,0 +1,139 @@
+"""Read-only sessions go to healthy replicas unless the reader just wrote."""
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import select
+from app.db import database, models, replicas
+from app.db.database import async_db_url, create_db_engine
+from app.db.migrations import migrate
+from app.db.replicas import ReadRouter, ReadTarget
+import asyncio
+import pytest
+import sqlite3
+
+COUNT_POSTS = select(func.count()).select_from(models.Post)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(replicas.time, "monotonic", clock)
+    return clock
+
+
+def names(targets: list[ReadTarget]) -> list[str]:
+    return [target.name for target in targets]
+
+
+def test_replicas_round_robin_before_the_primary(clock):
+    router = ReadRouter(
+        ReadTarget("primary", None, None),
+        [ReadTarget("a", None, None), ReadTarget("b", None, None)],
+        sticky_seconds=5,
+        retry_seconds=30,
+    )
+    assert names(router.candidates()) == ["a", "b", "primary"]
+    assert names(router.candidates()) == ["b", "a", "primary"]
+    assert names(router.candidates()) == ["a", "b", "primary"]
+
+
+def test_down_replica_is_skipped_until_retry(clock):
+    primary, a, b = (ReadTarget(name, None, None) for name in ("primary", "a", "b"))
+    router = ReadRouter(primary, [a, b], sticky_seconds=5, retry_seconds=30)
+    router.mark_down(a)
+    router.mark_down(primary)
+    assert names(router.candidates()) == ["b", "primary"]
+    router.mark_down(b)
+    assert names(router.candidates()) == ["primary"]
+    clock.now += 30
+    assert sorted(names(router.candidates())) == ["a", "b", "primary"]
+
+
+def test_writer_sticks_to_the_primary(clock):
+    router = ReadRouter(
+        ReadTarget("primary", None, None),
+        [ReadTarget("a", None, None)],
+        sticky_seconds=5,
+        retry_seconds=30,
+    )
+    router.record_write("alice")
+    router.record_write(None)
+    assert names(router.candidates("alice")) == ["primary"]
+    assert names(router.candidates("bob")) == ["a", "primary"]
+    assert names(router.candidates()) == ["a", "primary"]
+    clock.now += 5
+    assert names(router.candidates("alice")) == ["a", "primary"]
+
+
+def read_target(name: str, db_url: str) -> ReadTarget:
+    return ReadTarget(
+        name,
+        create_db_engine(db_url, readonly=True),
+        create_db_engine(
+            async_db_url(db_url), readonly=True, create=create_async_engine
+        ),
+    )
+
+
+def test_sessions_route_reads(monkeypatch, tmp_path, clock):
+    primary_url = f"sqlite:///{tmp_path / 'primary.db'}"
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    write_engine = create_db_engine(primary_url)
+    migrate(write_engine)
+    router = ReadRouter(
+        read_target("primary", primary_url),
+        [
+            read_target("replica", replica_url),
+            read_target("broken", f"sqlite:///{tmp_path / 'missing' / 'x.db'}"),
+        ],
+        sticky_seconds=5,
+        retry_seconds=30,
+    )
+    monkeypatch.setattr(database, "engine", write_engine)
+    monkeypatch.setattr(database, "read_router", router)
+
+    def add_post(user_session_id: str) -> None:
+        with database.get_db_session(user_session_id=user_session_id) as session:
+            session.add(models.Post(content="hi", owner_session_id=user_session_id))
+
+    def read_count(user_session_id: str) -> int:
+        with database.get_db_session(
+            readonly=True, user_session_id=user_session_id
+        ) as session:
+            return session.exec(COUNT_POSTS).one()
+
+    async def async_read_count(user_session_id: str) -> int:
+        async with database.get_async_db_session(
+            readonly=True, user_session_id=user_session_id
+        ) as session:
+            return (await session.exec(COUNT_POSTS)).one()
+
+    try:
+        add_post("setup")
+        # A stale copy stands in for a lagging replica.
+        with sqlite3.connect(tmp_path / "primary.db") as source, sqlite3.connect(
+            tmp_path / "replica.db"
+        ) as target:
+            source.backup(target)
+        add_post("alice")
+
+        assert read_count("alice") == 2
+        assert asyncio.run(async_read_count("alice")) == 2
+        assert [read_count("bob") for _ in range(4)] == [1, 1, 1, 1]
+        assert asyncio.run(async_read_count("bob")) == 1
+        assert names(router.candidates()) == ["replica", "primary"]
+        clock.now += 5
+        assert read_count("alice") == 1
+    finally:
+        write_engine.dispose()
+        for target in [router.primary, *router.replicas]:
+            target.engine.dispose()
+            asyncio.run(target.async_engine.dispose())
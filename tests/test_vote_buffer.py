@@ -0,0 +1,80 @@
+"""Pending vote deltas stay visible until the flush that writes them commits."""
+
+from sqlmodel import Session
+from app.db import models, vote_buffer
+from app.db.database import engine
+from app.db.migrations import migrate
+from app.db.vote_buffer import VoteBuffer
+import asyncio
+import pytest
+import threading
+
+
+@pytest.fixture
+def post_id() -> str:
+    migrate(engine)
+    with Session(engine) as session:
+        post = models.Post(content="post", owner_session_id="owner")
+        session.add(post)
+        session.commit()
+        return post.id
+
+
+@pytest.fixture
+def buffer() -> VoteBuffer:
+    buffer = VoteBuffer(flush_interval_ms=60_000, max_events=1000)
+    # Flushed by hand; no background thread.
+    buffer._thread = threading.current_thread()
+    return buffer
+
+
+def test_deltas_count_until_the_flush_commits(monkeypatch, buffer, post_id):
+    written, resume = threading.Event(), threading.Event()
+    apply_vote_intents = vote_buffer.apply_vote_intents
+
+    def slow_apply(session, intents):
+        deltas = apply_vote_intents(session, intents)
+        written.set()
+        resume.wait()
+        return deltas
+
+    monkeypatch.setattr(vote_buffer, "apply_vote_intents", slow_apply)
+    asyncio.run(buffer.set_votes("a", {post_id: 1}))
+    flush = threading.Thread(target=buffer.flush)
+    flush.start()
+    try:
+        written.wait()
+        during = buffer.pending_delta(post_id), buffer.pending_points("a")
+        # Recorded while the first flush is still writing.
+        asyncio.run(buffer.set_votes("b", {post_id: 1}))
+    finally:
+        resume.set()
+        flush.join()
+    assert during == (1, 1)
+    assert buffer.pending_delta(post_id) == 1
+    assert buffer.pending_points("a") == 0
+    assert buffer.pending_points("b") == 1
+
+    monkeypatch.setattr(vote_buffer, "apply_vote_intents", apply_vote_intents)
+    assert buffer.flush() == 1
+    assert buffer.pending_delta(post_id) == 0
+    with Session(engine) as session:
+        assert session.get(models.Post, post_id).votes == 3
+
+
+def test_failed_flush_keeps_everything_pending(monkeypatch, buffer, post_id):
+    def failing_apply(session, intents):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(vote_buffer, "apply_vote_intents", failing_apply)
+    asyncio.run(buffer.set_votes("a", {post_id: -1}))
+    assert buffer.flush() == 0
+    assert buffer.pending_delta(post_id) == -1
+    assert buffer.pending_points("a") == -1
+
+    monkeypatch.undo()
+    assert buffer.flush() == 1
+    assert buffer.pending_delta(post_id) == 0
+    assert buffer.pending_points("a") == 0
+    with Session(engine) as session:
+        assert session.get(models.Post, post_id).votes == 0
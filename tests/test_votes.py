@@ -0,0 +1,128 @@
+"""Vote writes keep post counters and Peek Scores consistent under concurrency."""
+
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func
+from sqlmodel import Session, create_engine, select
+from app.db import models
+from app.db.migrations import migrate
+from app.db.peek import PEEK_BASE_SCORE, PEEK_POST_POINTS, add_points, rebuild_scores
+from app.db.votes import VoteResult, apply_vote_intents, set_votes
+import random
+
+VOTE_VALUES = (1, 0, -1)
+FLUSH_BATCH_SIZE = 8
+N_POSTS = 3
+N_SESSIONS = 4
+N_WORKERS = 8
+VOTES_PER_WORKER = 50
+
+
+def make_posts(engine, n_posts: int) -> list[str]:
+    with Session(engine) as session:
+        posts = [
+            models.Post(content=f"post {i}", owner_session_id="owner", votes=0)
+            for i in range(n_posts)
+        ]
+        session.add_all(posts)
+        add_points(session, {"owner": PEEK_POST_POINTS * n_posts})
+        session.commit()
+        return [post.id for post in posts]
+
+
+def vote_worker(db_url: str, worker: int, post_ids: list[str]) -> None:
+    """Vote as one of a few shared sessions from this worker's own engine.
+
+    Odd workers write batches as ``VoteBuffer.flush`` does, even ones single
+    votes through ``set_votes``, so the same vote row is written concurrently.
+    """
+    engine = create_engine(db_url, connect_args={"timeout": 30})
+    rng = random.Random(worker)
+    session_ids = [f"voter-{i}" for i in range(N_SESSIONS)]
+    for _ in range(VOTES_PER_WORKER):
+        with Session(engine) as session:
+            if worker % 2:
+                apply_vote_intents(
+                    session,
+                    {
+                        (rng.choice(post_ids), rng.choice(session_ids)): rng.choice(
+                            VOTE_VALUES
+                        )
+                        for _ in range(FLUSH_BATCH_SIZE)
+                    },
+                )
+            else:
+                set_votes(
+                    session,
+                    rng.choice(session_ids),
+                    {rng.choice(post_ids): rng.choice(VOTE_VALUES)},
+                )
+            session.commit()
+    engine.dispose()
+
+
+def test_set_votes_moves_counter_and_points(engine):
+    migrate(engine)
+    (post_id,) = make_posts(engine, 1)
+    with Session(engine) as session:
+        assert set_votes(session, "voter", {post_id: 1}) == {
+            post_id: VoteResult(1, 1, 1, 1)
+        }
+        assert set_votes(session, "voter", {post_id: -1}) == {
+            post_id: VoteResult(-1, -1, -2, -2)
+        }
+        assert set_votes(session, "voter", {post_id: -1}) == {
+            post_id: VoteResult(-1, -1, 0, 0)
+        }
+        assert set_votes(session, "owner", {post_id: 1}) == {
+            post_id: VoteResult(0, 1, 1, 0)
+        }
+        assert set_votes(session, "voter", {post_id: 0, "gone": 1}) == {
+            post_id: VoteResult(1, 0, 1, 1)
+        }
+        session.commit()
+        votes = session.exec(
+            select(models.UserVote.user_session_id, models.UserVote.vote_value)
+        ).all()
+        assert votes == [("owner", 1)]
+
+
+def test_concurrent_votes_match_vote_rows(db_url, engine):
+    migrate(engine)
+    post_ids = make_posts(engine, N_POSTS)
+    with ThreadPoolExecutor(N_WORKERS) as pool:
+        for future in [
+            pool.submit(vote_worker, db_url, worker, post_ids)
+            for worker in range(N_WORKERS)
+        ]:
+            future.result()
+
+    with Session(engine) as session:
+        vote_sums = dict(
+            session.exec(
+                select(
+                    models.UserVote.post_id, func.sum(models.UserVote.vote_value)
+                ).group_by(models.UserVote.post_id)
+            ).all()
+        )
+        counters = dict(session.exec(select(models.Post.id, models.Post.votes)).all())
+        assert counters == {post_id: vote_sums.get(post_id, 0) for post_id in post_ids}
+        duplicates = session.exec(
+            select(models.UserVote.post_id, models.UserVote.user_session_id)
+            .group_by(models.UserVote.post_id, models.UserVote.user_session_id)
+            .having(func.count() > 1)
+        ).all()
+        assert duplicates == []
+        assert 0 not in set(session.exec(select(models.UserVote.vote_value)).all())
+
+        score_query = select(models.PeekScore.session_id, models.PeekScore.score)
+        scores = dict(session.exec(score_query).all())
+        rebuild_scores(session)
+        rebuilt = dict(session.exec(score_query).all())
+        # A session without a row reads as the base score.
+        assert {
+            session_id: scores.get(session_id, PEEK_BASE_SCORE)
+            for session_id in scores.keys() | rebuilt.keys()
+        } == {
+            session_id: rebuilt.get(session_id, PEEK_BASE_SCORE)
+            for session_id in scores.keys() | rebuilt.keys()
+        }